@@ -0,0 +1,113 @@
+'''
+팔로우 관계
+
+* 팔로우 / 언팔로우 : Follow 테이블에 INSERT ... ON CONFLICT DO NOTHING / DELETE
+    - 실제로 추가/삭제된 row 수만큼 followers_cnt, followings_cnt 를 변경
+      (좋아요와 같은 방식, config/likes.py)
+* following_ids : N 명의 유저 중 내가 팔로우하는 유저를 쿼리 한 번으로 조회
+* mutual_follows : 서로 팔로우하는 유저 (EXISTS + (from_user, to_user) unique 인덱스)
+* suggestions : 내가 팔로우하는 유저들이 팔로우하는 유저 추천
+    - 팔로잉이 많아도 최근 팔로우한 SUGGESTION_SOURCE_NUM 명만 사용
+'''
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+from config.db import insert_ignore, update_counter, update_counters
+from config.likes import LIKE, TOGGLE, UNLIKE
+from shots import timeline
+from .models import Follow, User
+
+# 팔로우 / 언팔로우 / 토글 (좋아요와 같은 값 사용)
+FOLLOW, UNFOLLOW = LIKE, UNLIKE
+# 추천 후보를 찾을 때 사용하는 최근 팔로잉 수 / 추천 유저 수
+SUGGESTION_SOURCE_NUM = getattr(settings, 'FOLLOW_SUGGESTION_SOURCE_NUM', 200)
+SUGGESTION_NUM = 20
+
+
+def change_follow(me, user_id, action):
+    '''
+    return (팔로우 여부, 변경된 followers_cnt)
+    '''
+    values = {'from_user': me.pk, 'to_user': user_id}
+    with transaction.atomic():
+        added = 0
+        if action != UNFOLLOW:
+            added = insert_ignore(Follow, **values)
+        removed = 0
+        if action == UNFOLLOW or (action == TOGGLE and not added):
+            removed, _ = Follow.objects.filter(**values).delete()
+        followers_cnt = update_counter(User, user_id, 'followers_cnt', added - removed)
+        update_counters(User, me.pk, followings_cnt=added - removed)
+
+        # 팔로잉 timeline 갱신 (shots/timeline.py)
+        if timeline.enabled():
+            if added:
+                timeline.backfill(me.pk, user_id)
+            elif removed:
+                timeline.unfollow(me.pk, user_id)
+
+    is_follow = action == FOLLOW or bool(added)
+    return is_follow, followers_cnt
+
+
+def following_ids(user, user_ids):
+    '''
+    user_ids 중 user 가 팔로우하는 유저 id 의 set
+    '''
+    user_ids = list(user_ids)
+    if not user.is_authenticated or not user_ids:
+        return set()
+    return set(
+        Follow.objects.filter(from_user=user, to_user_id__in=user_ids)
+            .values_list('to_user_id', flat=True)
+    )
+
+
+def attach_is_follow(users, me):
+    '''
+    users 에 is_follow 속성 (me 가 팔로우하는지) 을 붙인다.
+    '''
+    followed = following_ids(me, [user.pk for user in users])
+    for user in users:
+        user.is_follow = user.pk in followed
+    return users
+
+
+def mutual_follows(user_id):
+    '''
+    user 와 서로 팔로우하는 관계 (Follow 쿼리셋, to_user 가 상대)
+    '''
+    followed_back = Follow.objects.filter(from_user=OuterRef('to_user'), to_user_id=user_id)
+    return Follow.objects.filter(from_user_id=user_id).filter(Exists(followed_back))
+
+
+def suggestions(user, num=SUGGESTION_NUM):
+    '''
+    user 가 팔로우하는 유저들이 많이 팔로우하는 유저 순으로 추천
+
+    같은 수면 팔로워가 많은 유저 순, 후보가 없으면 팔로워가 많은 유저
+    (각 유저에 mutual_cnt : 후보를 팔로우하는 내 팔로잉 수)
+    '''
+    sources = Follow.objects.filter(from_user=user).order_by('-pk')\
+        .values('to_user_id')[:SUGGESTION_SOURCE_NUM]
+    followed = Follow.objects.filter(from_user=user).values('to_user_id')
+    candidates = Follow.objects.filter(from_user__in=Subquery(sources))\
+        .exclude(to_user=user).exclude(to_user__in=Subquery(followed))\
+        .values('to_user_id').annotate(mutual_cnt=Count('pk'))\
+        .order_by('-mutual_cnt', '-to_user__followers_cnt', 'to_user_id')[:num]
+    counts = {row['to_user_id']: row['mutual_cnt'] for row in candidates}
+
+    users = User.objects.in_bulk(list(counts))
+    result = [users[pk] for pk in counts if pk in users]
+    for candidate in result:
+        candidate.mutual_cnt = counts[candidate.pk]
+    if len(result) < num:
+        # 추천 후보가 부족하면 팔로워가 많은 유저로 채우기 (followers_cnt 인덱스)
+        exclude = [user.pk, *counts]
+        popular = User.objects.exclude(pk__in=exclude).exclude(pk__in=Subquery(followed))\
+            .order_by('-followers_cnt', 'pk')[:num - len(result)]
+        for candidate in popular:
+            candidate.mutual_cnt = 0
+            result.append(candidate)
+    return result
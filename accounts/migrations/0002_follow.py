@@ -0,0 +1,75 @@
+# Generated by Django 3.2 on 2026-10-18 16:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(cnt=Count('pk')).values('cnt')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    # 팔로워/팔로잉 수 채우기
+    User = apps.get_model('accounts', 'User')
+    Follow = apps.get_model('accounts', 'Follow')
+    User.objects.update(
+        followers_cnt=count_of(Follow, 'to_user'),
+        followings_cnt=count_of(Follow, 'from_user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        # 자동 생성된 중간 테이블(accounts_user_followings)을 Follow 모델로 사용 (테이블 변경 없음)
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Follow',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('from_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                        ('to_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'accounts_user_followings',
+                        'unique_together': {('from_user', 'to_user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='followings',
+                    field=models.ManyToManyField(related_name='followers', through='accounts.Follow', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['to_user', '-id'], name='follow_to_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['from_user', '-id'], name='follow_from_user_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_cnt',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followings_cnt',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 16:15
+
+import config.dedup
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_profile_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_image',
+            field=models.ImageField(blank=True, storage=config.dedup.ContentAddressedStorage(), upload_to=''),
+        ),
+    ]
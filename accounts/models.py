@@ -1,17 +1,41 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.conf import settings
-import os
+from config.dedup import content_storage
 
 # Create your models here.
 class User(AbstractUser):
-    followings = models.ManyToManyField('self', symmetrical=False, related_name='followers')
-    profile_image = models.ImageField(blank=True)
+    followings = models.ManyToManyField(
+        'self', symmetrical=False, related_name='followers', through='Follow'
+    )
+    # 같은 내용의 이미지는 한 번만 저장 (config/dedup.py)
+    profile_image = models.ImageField(blank=True, storage=content_storage)
+    # 프로필 이미지 크기별 WebP/JPEG 파일 (저장 후 config/images.py 에서 변환)
+    profile_image_variants = models.JSONField(default=dict, blank=True)
+    # 팔로워/팔로잉 수 (팔로우/언팔로우 시 accounts/follows.py 에서 갱신, reconcile_counters 로 보정)
+    followers_cnt = models.PositiveIntegerField(default=0, db_index=True)
+    followings_cnt = models.PositiveIntegerField(default=0)
 
-    def delete(self, *args, **kargs): # DB 삭제하는 경우 저장한 이미지도 삭제하기 위해
-        if self.image:
-            os.remove(os.path.join(settings.MEDIA_ROOT, self.image.path))
-        super(User, self).delete(*args, **kargs)
+    def __str__(self):
+        return self.username
+
+
+class Follow(models.Model):
+    '''
+    팔로우 관계 (from_user 가 to_user 를 팔로우)
+
+    User.followings 의 중간 테이블 (기존 자동 생성 테이블을 그대로 사용)
+    pk 순서가 팔로우한 순서라서 목록은 (유저, -pk) 인덱스로 최신순 조회한다.
+    '''
+    from_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    to_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        db_table = 'accounts_user_followings'
+        unique_together = [('from_user', 'to_user')]
+        indexes = [
+            models.Index(fields=['to_user', '-id'], name='follow_to_user_id_idx'),
+            models.Index(fields=['from_user', '-id'], name='follow_from_user_id_idx'),
+        ]
 
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return f'{self.from_user_id} -> {self.to_user_id}'
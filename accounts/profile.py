@@ -0,0 +1,25 @@
+'''
+프로필 요약 정보
+
+프로필에는 개수만 포함하고, 좋아요한 영화/shot, 작성한 shot, 팔로워/팔로잉 목록은
+각각 페이지네이션 API 로 조회한다.
+'''
+from django.db.models import Count, Value
+
+from movies.models import Movie, related_aggregate
+from shots.models import Shot
+
+
+def with_profile_counts(users):
+    '''
+    users 쿼리셋에 좋아요한 영화/shot, 작성한 shot 수를 subquery 로 붙인다.
+    (유저 한 명 조회가 쿼리 한 번, 팔로워/팔로잉 수는 User 의 개수 컬럼)
+    '''
+    def count(model, field):
+        return related_aggregate(model, Count('pk'), Value(0), field=field)
+
+    return users.annotate(
+        like_movies_cnt=count(Movie.like_users.through, 'user'),
+        like_shots_cnt=count(Shot.like_users.through, 'user'),
+        shot_cnt=count(Shot, 'user'),
+    )
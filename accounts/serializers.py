@@ -1,9 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from movies.serailizers import MovieSerializer
+from config.images import ImageVariantsField
 from .models import User
-from shots.serializers.shot import ShotSerializer
-from movies.serailizers import StarSerializer, MovieSerializer
+from movies.serailizers import StarSerializer
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -12,6 +11,24 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('pk', 'username')
 
 
+class FollowUserSerializer(serializers.ModelSerializer):
+    # follows.attach_is_follow() 로 is_follow 를 붙인 유저를 직렬화
+    is_follow = serializers.BooleanField(read_only=True)
+    profile_image_variants = ImageVariantsField(image_field='profile_image')
+    class Meta:
+        model = User
+        fields = ('pk', 'username', 'profile_image', 'profile_image_variants', 'followers_cnt', 'is_follow')
+
+
+class SuggestionSerializer(serializers.ModelSerializer):
+    # follows.suggestions() 의 결과 (mutual_cnt : 이 유저를 팔로우하는 내 팔로잉 수)
+    mutual_cnt = serializers.IntegerField(read_only=True)
+    profile_image_variants = ImageVariantsField(image_field='profile_image')
+    class Meta:
+        model = User
+        fields = ('pk', 'username', 'profile_image', 'profile_image_variants', 'followers_cnt', 'mutual_cnt')
+
+
 class UserStarSerializer(serializers.ModelSerializer):
     starrating_set = StarSerializer(read_only=True, many=True)
     class Meta:
@@ -20,16 +37,13 @@ class UserStarSerializer(serializers.ModelSerializer):
 
 
 class ProfileSerializer(serializers.ModelSerializer):
-    like_movies = MovieSerializer(read_only=True, many=True)
-    like_movies_cnt = serializers.IntegerField(source='like_movies.count', read_only=True)
-    followers = UserSerializer(read_only=True, many=True)
-    followers_cnt = serializers.IntegerField(source='followers.count', read_only=True)
-    followings = UserSerializer(read_only=True, many=True)
-    followings_cnt = serializers.IntegerField(source='followings.count', read_only=True)
-    like_shots = ShotSerializer(read_only=True, many=True)
-    like_shots_cnt = serializers.IntegerField(source='like_shots.count', read_only=True)
-    shot_set = ShotSerializer(read_only=True, many=True)
-    shot_cnt = serializers.IntegerField(source='shot_set.count', read_only=True)
+    # profile.with_profile_counts() 로 개수를 붙인 유저를 직렬화
+    like_movies_cnt = serializers.IntegerField(read_only=True)
+    like_shots_cnt = serializers.IntegerField(read_only=True)
+    shot_cnt = serializers.IntegerField(read_only=True)
+    profile_image_variants = ImageVariantsField(image_field='profile_image')
     class Meta:
         model = get_user_model()
-        fields = '__all__'
\ No newline at end of file
+        fields = ('id', 'username', 'profile_image', 'profile_image_variants', 'date_joined',
+                  'like_movies_cnt', 'followers_cnt', 'followings_cnt',
+                  'like_shots_cnt', 'shot_cnt')
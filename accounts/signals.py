@@ -0,0 +1,70 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from config import dedup, images
+from config.db import update_counters
+from .models import Follow, User
+
+
+@receiver(post_save, sender=User)
+def process_profile_image(sender, instance, **kwargs):
+    # 프로필 이미지가 새로 저장되면 크기별 variant 생성 (config/images.py)
+    images.schedule_processing(instance, 'profile_image', 'profile_image_variants')
+
+
+@receiver(pre_save, sender=User)
+def remember_profile_image(sender, instance, update_fields, **kwargs):
+    dedup.before_save(instance, 'profile_image', 'profile_image_variants', update_fields)
+
+
+@receiver(post_save, sender=User)
+def count_profile_image(sender, instance, update_fields, **kwargs):
+    # 바뀐 이미지 파일의 참조 수 변경 (config/dedup.py)
+    dedup.after_save(instance, 'profile_image', 'profile_image_variants', update_fields)
+
+
+@receiver(post_delete, sender=User)
+def release_profile_image(sender, instance, **kwargs):
+    # 탈퇴하면 프로필 이미지 참조 수를 줄인다. (작성한 shot 은 CASCADE 로 각각 처리)
+    dedup.after_delete(instance, 'profile_image', 'profile_image_variants')
+
+
+def add_to_counter(user_ids, field, delta):
+    User.objects.filter(pk__in=user_ids).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+@receiver(m2m_changed, sender=Follow)
+def count_follows(sender, instance, action, reverse, pk_set, **kwargs):
+    # followings / followers 의 add(), remove(), clear() 도 개수 컬럼을 맞춘다.
+    # (accounts/follows.py 의 change_follow 는 직접 INSERT / DELETE 해서 signal 이 없음)
+    # reverse : you.followers.add(me) 처럼 팔로우 당하는 쪽에서 호출
+    own, other = ('to_user_id', 'from_user_id') if reverse else ('from_user_id', 'to_user_id')
+    own_field, other_field = ('followers_cnt', 'followings_cnt') if reverse\
+        else ('followings_cnt', 'followers_cnt')
+    if action in ('pre_remove', 'pre_clear'):
+        # post_remove 의 pk_set 에는 없던 관계도 들어있어서 실제로 삭제될 관계를 미리 조회
+        follows = Follow.objects.filter(**{own: instance.pk})
+        if pk_set is not None:
+            follows = follows.filter(**{f'{other}__in': pk_set})
+        instance._removed_follow_ids = list(follows.values_list(other, flat=True))
+        return
+    if action == 'post_add':
+        # add() 의 pk_set 은 새로 추가된 관계만
+        user_ids, delta = list(pk_set), 1
+    elif action in ('post_remove', 'post_clear'):
+        user_ids, delta = instance.__dict__.pop('_removed_follow_ids', []), -1
+    else:
+        return
+    update_counters(User, instance.pk, **{own_field: delta * len(user_ids)})
+    add_to_counter(user_ids, other_field, delta)
+
+
+@receiver(pre_delete, sender=User)
+def release_follow_counts(sender, instance, **kwargs):
+    # 탈퇴하면 Follow row 가 CASCADE 로 삭제되므로 상대방의 개수 컬럼을 줄인다.
+    followings = Follow.objects.filter(from_user=instance).exclude(to_user=instance)
+    followers = Follow.objects.filter(to_user=instance).exclude(from_user=instance)
+    add_to_counter(followings.values('to_user'), 'followers_cnt', -1)
+    add_to_counter(followers.values('from_user'), 'followings_cnt', -1)
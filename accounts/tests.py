@@ -1,3 +1,180 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from movies.models import Movie
+from shots.models import Shot
+from .models import User
+
+
+class ProfileTest(TestCase):
+    '''
+    프로필 요약과 목록 API 의 쿼리 수가 데이터 양과 무관한지 확인
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.me = User.objects.create_user(username='me', password='pw')
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.me)
+
+    def create_data(self, n):
+        start = Movie.objects.count()
+        for i in range(start, start + n):
+            movie = Movie.objects.create(
+                title=f'movie{i}', release_date='2022-05-20', overview='overview',
+                adult=False, popularity=i, backdrop_path='', poster_path='',
+                vote_average=7.0, vote_count=100,
+            )
+            movie.like_users.add(self.user)
+            shot = Shot.objects.create(user=self.user, movie=movie, title=f'shot{i}', content='c')
+            shot.like_users.add(self.user)
+            follower = User.objects.create_user(username=f'user{i}', password='pw')
+            follower.followings.add(self.user)
+            self.user.followings.add(follower)
+        call_command('reconcile_counters', stdout=StringIO())
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        urls = [
+            '/api/v1/accounts/profile/tester/',
+            '/api/v1/accounts/profile/tester/like_movies/0/',
+            '/api/v1/accounts/profile/tester/like_shots/0/',
+            '/api/v1/accounts/profile/tester/shots/0/',
+            '/api/v1/accounts/profile/tester/followers/0/',
+            '/api/v1/accounts/profile/tester/followings/0/',
+        ]
+        self.create_data(2)
+        small = [self.count_queries(url)[0] for url in urls]
+        self.create_data(8)
+        large = [self.count_queries(url)[0] for url in urls]
+        self.assertEqual(small, large)
+
+        _, response = self.count_queries(urls[0])
+        profile = response.data['profile']
+        self.assertFalse(response.data['is_follow'])
+        self.assertNotIn('password', profile)
+        self.assertEqual(
+            [profile[key] for key in ('like_movies_cnt', 'like_shots_cnt', 'shot_cnt',
+                                      'followers_cnt', 'followings_cnt')],
+            [10, 10, 10, 10, 10],
+        )
+        _, response = self.count_queries(urls[3])
+        self.assertEqual(len(response.data['shots']), 10)
+        self.assertEqual(response.data['shots'][0]['title'], 'shot9')
+        _, response = self.count_queries(urls[4])
+        self.assertEqual(response.data['users'][0]['username'], 'user9')
+
+    def test_follow_returns_summary(self):
+        response = self.client.post(f'/api/v1/accounts/{self.user.pk}/follow/')
+        self.assertEqual(response.data, {'is_follow': True, 'followers_cnt': 1})
+        response = self.client.get('/api/v1/accounts/profile/tester/')
+        self.assertTrue(response.data['is_follow'])
+        response = self.client.post(f'/api/v1/accounts/{self.user.pk}/follow/')
+        self.assertEqual(response.data, {'is_follow': False, 'followers_cnt': 0})
+        # PUT 은 여러 번 보내도 한 번만 팔로우
+        self.client.put(f'/api/v1/accounts/{self.user.pk}/follow/')
+        response = self.client.put(f'/api/v1/accounts/{self.user.pk}/follow/')
+        self.assertEqual(response.data, {'is_follow': True, 'followers_cnt': 1})
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.followings_cnt, 1)
+
+
+class FollowGraphTest(TestCase):
+    '''
+    팔로우 여부 일괄 조회, 맞팔로우, 팔로우 추천
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [User.objects.create_user(username=f'user{i}', password='pw') for i in range(6)]
+        self.me = self.users[0]
+        self.client.force_authenticate(self.me)
+        u = self.users
+        for from_user, to_user in [
+            (0, 1), (0, 2), (1, 0),          # 0 <-> 1 맞팔로우
+            (1, 3), (2, 3), (2, 4), (3, 5),  # 3 은 내 팔로잉 2명, 4 는 내 팔로잉 1명이 팔로우
+            (5, 4), (3, 4),
+        ]:
+            self.client.force_authenticate(u[from_user])
+            self.client.put(f'/api/v1/accounts/{u[to_user].pk}/follow/')
+        self.client.force_authenticate(self.me)
+
+    def test_follow_check(self):
+        ids = ','.join(str(user.pk) for user in self.users)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/accounts/follow/check/?ids={ids}')
+        self.assertEqual(response.data['following_ids'], [self.users[1].pk, self.users[2].pk])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self.client.get('/api/v1/accounts/follow/check/?ids=a').status_code, 400)
+
+        response = self.client.get('/api/v1/accounts/profile/user3/followers/0/')
+        self.assertEqual(
+            [(user['username'], user['is_follow']) for user in response.data['users']],
+            [('user2', True), ('user1', True)],
+        )
+
+    def test_mutual_and_suggestions(self):
+        response = self.client.get('/api/v1/accounts/profile/user0/mutual_follows/0/')
+        self.assertEqual([user['username'] for user in response.data['users']], ['user1'])
+
+        response = self.client.get('/api/v1/accounts/follow/suggestions/')
+        users = [(user['username'], user['mutual_cnt']) for user in response.data['users']]
+        self.assertEqual(users, [('user3', 2), ('user4', 1), ('user5', 0)])
+        self.assertEqual(response.data['users'][1]['followers_cnt'], 3)
+
+
+class FollowCounterTest(TestCase):
+    '''
+    API 밖에서 팔로우 관계가 바뀌어도 followers_cnt, followings_cnt 유지
+    '''
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}', password='pw') for i in range(4)]
+
+    def counts(self):
+        return [
+            (user.followers_cnt, user.followings_cnt)
+            for user in User.objects.filter(pk__in=[user.pk for user in self.users]).order_by('pk')
+        ]
+
+    def assertCountsReconciled(self):
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('User.followers_cnt: 0개', out.getvalue())
+        self.assertIn('User.followings_cnt: 0개', out.getvalue())
+
+    def test_m2m_changes(self):
+        u = self.users
+        u[0].followings.add(u[1], u[2])
+        u[0].followings.add(u[1])
+        u[3].followers.add(u[0], u[1])
+        self.assertEqual(self.counts(), [(0, 3), (1, 1), (1, 0), (2, 0)])
+
+        # 팔로우하지 않은 유저를 remove 해도 개수는 그대로
+        u[1].followings.remove(u[2], u[3])
+        u[3].followers.clear()
+        self.assertEqual(self.counts(), [(0, 2), (1, 0), (1, 0), (0, 0)])
+        u[0].followings.clear()
+        self.assertEqual(self.counts(), [(0, 0)] * 4)
+        self.assertCountsReconciled()
+
+    def test_delete_user(self):
+        client = APIClient()
+        u = self.users
+        for from_user, to_user in [(0, 1), (1, 0), (2, 1), (1, 3), (3, 2)]:
+            client.force_authenticate(u[from_user])
+            client.put(f'/api/v1/accounts/{u[to_user].pk}/follow/')
 
-# Create your tests here.
+        u[1].delete()
+        self.users.remove(u[1])
+        self.assertEqual(self.counts(), [(0, 0), (1, 0), (0, 1)])
+        self.assertCountsReconciled()
@@ -3,5 +3,13 @@ from . import views
 
 urlpatterns = [
     path('profile/<username>/', views.profile),
+    path('profile/<username>/like_movies/<int:page>/', views.profile_like_movies),
+    path('profile/<username>/like_shots/<int:page>/', views.profile_like_shots),
+    path('profile/<username>/shots/<int:page>/', views.profile_shots),
+    path('profile/<username>/followers/<int:page>/', views.profile_followers),
+    path('profile/<username>/followings/<int:page>/', views.profile_followings),
+    path('profile/<username>/mutual_follows/<int:page>/', views.profile_mutual_follows),
     path('<int:user_id>/follow/', views.follow),
-]
\ No newline at end of file
+    path('follow/check/', views.follow_check),
+    path('follow/suggestions/', views.follow_suggestions),
+]
@@ -2,25 +2,49 @@ from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import ProfileSerializer
-from .models import User
+from config.likes import METHOD_ACTIONS
+from config.pagination import paginate
+from movies.models import Movie
+from movies.serailizers import MovieListSerializer
+from shots.feed import attach_feed_data
+from shots.models import Shot
+from shots.serializers.shot import ShotListSerializer
+from .serializers import FollowUserSerializer, ProfileSerializer, SuggestionSerializer
+from .follows import attach_is_follow, change_follow, following_ids, mutual_follows, suggestions
+from .profile import with_profile_counts
+from .models import Follow, User
 
 User = get_user_model()
+PAGE_NUM = 20
+# follow_check API 에서 한 번에 확인할 수 있는 최대 유저 수
+MAX_IDS_NUM = 100
+
+
+def get_user_id(username):
+    return get_object_or_404(User.objects.values_list('pk', flat=True), username=username)
+
 
 @api_view(['GET'])
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
+    '''
+    profile
+
+    ---
+    [GET] 프로필 요약 (좋아요한 영화/shot, 작성한 shot, 팔로워/팔로잉 수)
+
+    목록은 like_movies, like_shots, shots, followers, followings API 로 조회합니다.
+
+    '''
+    user = get_object_or_404(with_profile_counts(User.objects.all()), username=username)
 
     is_follow = False
     if request.user.id:
         me = request.user
         if me != user:
-            if user.followers.filter(pk=me.pk).exists():
-                is_follow = True
-            else:
-                is_follow = False
+            is_follow = Follow.objects.filter(from_user=me, to_user=user).exists()
     serializer = ProfileSerializer(user)
     data = {
         'is_follow' : is_follow,
@@ -29,29 +53,197 @@ def profile(request, username):
     return Response(data)
 
 
-@api_view(['POST'])
+@api_view(['GET'])
+def profile_like_movies(request, username, page):
+    '''
+    profile_like_movies
+
+    ---
+    [GET] 유저가 좋아요한 영화 목록 (좋아요한 순서 최신순, 페이지당 20개)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    '''
+    likes = Movie.like_users.through.objects.filter(user_id=get_user_id(username))\
+        .select_related('movie').order_by('-pk')
+    likes, max_page, next_cursor = paginate(request, likes, page, PAGE_NUM)
+    serializer = MovieListSerializer([like.movie for like in likes], many=True)
+    data = {
+        "max_page"  : max_page,
+        "next_cursor" : next_cursor,
+        "movies" : serializer.data,
+    }
+    return Response(data)
+
+
+def shot_page_data(request, shots, max_page, next_cursor):
+    # 좋아요 여부와 미리보기 댓글을 페이지 단위로 한 번에 조회
+    attach_feed_data(shots, request.user)
+    serializer = ShotListSerializer(shots, many=True)
+    return {
+        "max_page"  : max_page,
+        "next_cursor" : next_cursor,
+        "shots" : serializer.data,
+    }
+
+
+@api_view(['GET'])
+def profile_like_shots(request, username, page):
+    '''
+    profile_like_shots
+
+    ---
+    [GET] 유저가 좋아요한 shot 목록 (좋아요한 순서 최신순, 페이지당 20개)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    '''
+    likes = Shot.like_users.through.objects.filter(user_id=get_user_id(username))\
+        .select_related('shot__user', 'shot__movie').order_by('-pk')
+    likes, max_page, next_cursor = paginate(request, likes, page, PAGE_NUM)
+    shots = [like.shot for like in likes]
+    return Response(shot_page_data(request, shots, max_page, next_cursor))
+
+
+@api_view(['GET'])
+def profile_shots(request, username, page):
+    '''
+    profile_shots
+
+    ---
+    [GET] 유저가 작성한 shot 목록 (최신순, 페이지당 20개)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    '''
+    shots = Shot.objects.filter(user_id=get_user_id(username)).order_by('-pk')
+    shots, max_page, next_cursor = paginate(request, shots.for_feed(), page, PAGE_NUM)
+    return Response(shot_page_data(request, shots, max_page, next_cursor))
+
+
+def follow_page(request, follows, user_field, page):
+    follows, max_page, next_cursor = paginate(
+        request, follows.select_related(user_field).order_by('-pk'), page, PAGE_NUM
+    )
+    # 목록의 유저를 내가 팔로우하는지 한 번에 조회
+    users = attach_is_follow([getattr(follow, user_field) for follow in follows], request.user)
+    serializer = FollowUserSerializer(users, many=True)
+    return {
+        "max_page"  : max_page,
+        "next_cursor" : next_cursor,
+        "users" : serializer.data,
+    }
+
+
+@api_view(['GET'])
+def profile_followers(request, username, page):
+    '''
+    profile_followers
+
+    ---
+    [GET] 팔로워 목록 (팔로우한 순서 최신순, 페이지당 20개)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    '''
+    follows = Follow.objects.filter(to_user_id=get_user_id(username))
+    return Response(follow_page(request, follows, 'from_user', page))
+
+
+@api_view(['GET'])
+def profile_followings(request, username, page):
+    '''
+    profile_followings
+
+    ---
+    [GET] 팔로잉 목록 (팔로우한 순서 최신순, 페이지당 20개)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    '''
+    follows = Follow.objects.filter(from_user_id=get_user_id(username))
+    return Response(follow_page(request, follows, 'to_user', page))
+
+
+@api_view(['GET'])
+def profile_mutual_follows(request, username, page):
+    '''
+    profile_mutual_follows
+
+    ---
+    [GET] 서로 팔로우하는 유저 목록 (팔로우한 순서 최신순, 페이지당 20개)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    '''
+    follows = mutual_follows(get_user_id(username))
+    return Response(follow_page(request, follows, 'to_user', page))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def follow_suggestions(request):
+    '''
+    follow_suggestions
+
+    ---
+    [GET] 팔로우 추천 (내가 팔로우하는 유저들이 많이 팔로우하는 유저 순, 20명)
+
+    * mutual_cnt : 이 유저를 팔로우하는 내 팔로잉 수
+
+    '''
+    serializer = SuggestionSerializer(suggestions(request.user), many=True)
+    return Response({'users': serializer.data})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def follow_check(request):
+    '''
+    follow_check
+
+    ---
+    [GET] ?ids=1,2,3 유저 중 내가 팔로우하는 유저 id 목록 (최대 100명)
+
+    '''
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        raise ValidationError({'ids': '유저 id 를 쉼표로 구분해서 입력해주세요.'})
+    if len(ids) > MAX_IDS_NUM:
+        raise ValidationError({'ids': f'최대 {MAX_IDS_NUM}명까지 확인할 수 있습니다.'})
+    data = {
+        'following_ids': sorted(following_ids(request.user, ids)),
+    }
+    return Response(data)
+
+
+@api_view(['POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def follow(request, user_id):
-    you = get_object_or_404(get_user_model(), pk=user_id)
+    '''
+    follow
+
+    ---
+    [POST] 팔로우 / 언팔로우 토글
+    [PUT] 팔로우
+    [DELETE] 언팔로우
+
+    팔로우 여부와 팔로워 수만 반환합니다.
+
+    '''
+    you = get_object_or_404(User.objects.values_list('pk', flat=True), pk=user_id)
     me = request.user
 
-    if me != you:
-        if you.followers.filter(pk=me.pk).exists():
-            # 언팔로우
-            is_follow = False
-            you.followers.remove(me)
-        else:
-            # 팔로우
-            is_follow = True
-            you.followers.add(me)
-        user = ProfileSerializer(you)
+    if me.pk != you:
+        is_follow, followers_cnt = change_follow(me, you, METHOD_ACTIONS[request.method])
         data = {
             'is_follow' : is_follow,
-            'user' : user.data,
+            'followers_cnt' : followers_cnt,
         }
         return Response(data)
     else:
         data = {
             'detail': '자기 자신을 팔로우 할 수 없습니다.'
         }
-        return Response(data)
\ No newline at end of file
+        return Response(data)
@@ -0,0 +1,150 @@
+'''
+익명 사용자용 API 응답 캐시
+
+장르 목록, 인기 영화 같은 카탈로그 API 는 익명 사용자에게 항상 같은 응답을 주기 때문에
+응답 데이터를 캐시해두고 다음 요청부터는 DB 를 조회하지 않는다.
+
+* 캐시 키 : response_cache:<API 이름>:<의존하는 그룹의 버전>:<URL 인자 + 쿼리스트링 hash>
+    - 쿼리스트링은 key 순서, 값 순서를 정렬해서 같은 요청이 같은 키를 갖도록 한다.
+* 데이터 그룹(영화/장르/별점/shot)마다 버전이 따로 있다.
+    - 각 API 는 cache_response(depends_on=...) 로 응답이 의존하는 그룹을 지정하고,
+      그 그룹의 버전만 캐시 키에 넣는다.
+    - 데이터가 바뀌면 signal 에서 invalidate(그룹) 으로 그 그룹의 버전만 올린다.
+      (별점이 바뀌어도 장르 목록 캐시는 그대로 사용)
+    - 이전 버전의 캐시는 더 이상 사용되지 않고 RESPONSE_CACHE_TIMEOUT 후에 만료된다.
+    - 목록에 표시되는 개수/별점 평균은 RESPONSE_CACHE_TIMEOUT 동안 이전 값일 수 있다.
+      (정렬/필터가 그 값을 사용하는 API 만 해당 그룹에 의존)
+* API 별 hit/miss 횟수를 캐시에 기록한다. (cache_stats API 로 확인)
+* 캐시 backend 는 settings.CACHES 에서 설정 (CACHE_BACKEND 환경변수 : locmem / file / redis)
+'''
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'response_cache:version:{}'
+STATS_KEY = 'response_cache:stats:{}:{}'
+# 응답 캐시 유지 시간 (초)
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 5)
+
+# 응답이 의존하는 데이터 그룹
+MOVIES = 'movies'
+GENRES = 'genres'
+RATINGS = 'ratings'
+SHOTS = 'shots'
+GROUPS = (MOVIES, GENRES, RATINGS, SHOTS)
+
+# cache_response 를 사용하는 API 이름 (통계 조회용)
+endpoints = []
+
+
+def get_versions(groups):
+    '''
+    [그룹 버전, ...] (groups 순서)
+    '''
+    keys = [VERSION_KEY.format(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*groups):
+    '''
+    그룹의 버전을 올려서 그 그룹에 의존하는 캐시된 응답을 무효화 (그룹을 주지 않으면 전체)
+    '''
+    for group in groups or GROUPS:
+        key = VERSION_KEY.format(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def make_key(endpoint, groups, request, kwargs):
+    params = sorted(
+        (key, sorted(request.GET.getlist(key))) for key in request.GET
+    )
+    data = json.dumps([sorted(kwargs.items()), params], default=str)
+    digest = hashlib.md5(data.encode()).hexdigest()
+    version = '.'.join(str(version) for version in get_versions(groups))
+    return f'response_cache:{endpoint}:{version}:{digest}'
+
+
+def count(endpoint, result):
+    key = STATS_KEY.format(endpoint, result)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_stats():
+    '''
+    {API 이름: {'hits': , 'misses': , 'hit_rate': }, ...}
+    '''
+    keys = [STATS_KEY.format(endpoint, result)
+            for endpoint in endpoints for result in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    stats = {}
+    for endpoint in endpoints:
+        hits = values.get(STATS_KEY.format(endpoint, 'hits'), 0)
+        misses = values.get(STATS_KEY.format(endpoint, 'misses'), 0)
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_stats():
+    cache.delete_many([STATS_KEY.format(endpoint, result)
+                       for endpoint in endpoints for result in ('hits', 'misses')])
+
+
+def cache_response(view=None, timeout=None, depends_on=GROUPS):
+    '''
+    익명 사용자의 GET 응답을 캐시하는 데코레이터 (@api_view 아래에 사용)
+
+    * 로그인한 사용자의 요청은 캐시하지 않는다.
+    * status 200 응답만 캐시한다.
+    * depends_on : 응답이 의존하는 데이터 그룹 (기본 전체)
+
+    ex) @cache_response(depends_on=(GENRES,))
+    '''
+    groups = tuple(sorted(depends_on))
+
+    def decorator(view):
+        endpoint = view.__name__
+        endpoints.append(endpoint)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            key = make_key(endpoint, groups, request, kwargs)
+            data = cache.get(key)
+            if data is not None:
+                count(endpoint, 'hits')
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+            count(endpoint, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout or RESPONSE_CACHE_TIMEOUT)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+
+    if view is not None:
+        return decorator(view)
+    return decorator
@@ -0,0 +1,141 @@
+'''
+DB 공용 함수
+'''
+import sqlite3
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+def update_counters(model, pk, **deltas):
+    '''
+    pk 에 해당하는 row 의 개수 컬럼들을 delta 만큼 변경
+
+    ex) update_counters(Shot, 1, like_cnt=1)
+        UPDATE shots_shot SET like_cnt = MAX(like_cnt + 1, 0) WHERE id = 1
+
+    현재 값을 읽지 않고 DB 에서 바로 더하기 때문에 동시에 요청이 와도 값을 잃어버리지 않는다.
+    '''
+    if pk is None or not any(deltas.values()):
+        return
+    model.objects.filter(pk=pk).update(**{
+        field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()
+    })
+
+
+def insert_ignore(model, **values):
+    '''
+    row 하나를 INSERT 하고, unique 제약 조건에 걸리면 무시
+
+    INSERT INTO ... VALUES (...) ON CONFLICT DO NOTHING (SQLite 3.24+, PostgreSQL)
+    return 실제로 추가된 row 수 (0 또는 1)
+    '''
+    opts = model._meta
+    columns = [opts.get_field(name).column for name in values]
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT DO NOTHING'.format(
+        qn(opts.db_table),
+        ', '.join(qn(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(values.values()))
+        return cursor.rowcount
+
+
+def supports_update_returning():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35)
+    return False
+
+
+def update_counter(model, pk, field, delta):
+    '''
+    update_counters 와 같지만 변경된 값을 리턴 (row 가 없으면 None)
+
+    UPDATE ... RETURNING 을 지원하면 한 번의 쿼리로 처리한다.
+    '''
+    if not delta:
+        return model.objects.filter(pk=pk).values_list(field, flat=True).first()
+    if not supports_update_returning():
+        update_counters(model, pk, **{field: delta})
+        return model.objects.filter(pk=pk).values_list(field, flat=True).first()
+
+    opts = model._meta
+    qn = connection.ops.quote_name
+    column = qn(opts.get_field(field).column)
+    sql = (
+        'UPDATE {table} SET {column} = CASE WHEN {column} + %s < 0 THEN 0 ELSE {column} + %s END '
+        'WHERE {pk} = %s RETURNING {column}'
+    ).format(table=qn(opts.db_table), column=column, pk=qn(opts.pk.column))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [delta, delta, pk])
+        row = cursor.fetchone()
+    return row and row[0]
+
+
+def upsert(model, values, conflict_fields, update_fields):
+    '''
+    row 하나를 INSERT 하고, conflict_fields 가 같은 row 가 있으면 update_fields 만 UPDATE
+
+    * values : {필드 이름: 값} (auto_now 필드는 값을 넣지 않아도 현재 시각으로 채운다.)
+    * conflict_fields 에는 unique 제약 조건이 있어야 한다.
+    '''
+    upsert_many(model, [values], conflict_fields, update_fields)
+
+
+def upsert_many(model, rows, conflict_fields, update_fields, batch_size=500):
+    '''
+    여러 row 를 batch_size 개씩 한 번의 INSERT 로 upsert
+
+    INSERT INTO ... VALUES (...), (...) ON CONFLICT (conflict_fields)
+    DO UPDATE SET f = excluded.f (SQLite 3.24+, PostgreSQL)
+
+    Django 3.2 의 bulk_create 는 update_conflicts 를 지원하지 않아서 SQL 을 직접 만든다.
+    rows 는 모두 같은 필드를 가진 {필드 이름: 값} 이어야 한다.
+    (값이 없는 필드는 auto_now 면 현재 시각, default 가 있으면 default 로 채운다.)
+    return upsert 한 row 수
+    '''
+    rows = [dict(row) for row in rows]
+    if not rows:
+        return 0
+    opts = model._meta
+    now = timezone.now()
+    for field in opts.concrete_fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            for row in rows:
+                row.setdefault(field.name, now)
+        elif field.has_default():
+            for row in rows:
+                if field.name not in row:
+                    row[field.name] = field.get_default()
+
+    fields = [opts.get_field(name) for name in rows[0]]
+    qn = connection.ops.quote_name
+    placeholder = '(%s)' % ', '.join(['%s'] * len(fields))
+    if update_fields:
+        action = 'DO UPDATE SET ' + ', '.join(
+            '{0} = excluded.{0}'.format(qn(opts.get_field(name).column))
+            for name in update_fields
+        )
+    else:
+        action = 'DO NOTHING'
+    sql = 'INSERT INTO {} ({}) VALUES {{}} ON CONFLICT ({}) {}'.format(
+        qn(opts.db_table),
+        ', '.join(qn(field.column) for field in fields),
+        ', '.join(qn(opts.get_field(name).column) for name in conflict_fields),
+        action,
+    )
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i+batch_size]
+            params = [
+                field.get_db_prep_save(row[field.name], connection)
+                for row in batch for field in fields
+            ]
+            cursor.execute(sql.format(', '.join([placeholder] * len(batch))), params)
+    return len(rows)
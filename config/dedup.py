@@ -0,0 +1,216 @@
+'''
+업로드 이미지 중복 제거 (내용 hash 로 저장 + 참조 수)
+
+같은 영화 스틸컷을 여러 shot 에 올리면 같은 파일이 여러 번 저장/전송된다.
+
+* ContentAddressedStorage : 파일 이름을 내용의 hash 로 저장하는 storage
+    - images/<hash 앞 2자리>/<hash>.<확장자>
+    - 같은 이름이 이미 있으면 업로드하지 않고 그 이름을 사용
+    - 실제 저장은 DEFAULT_FILE_STORAGE (S3) 에 위임
+* StoredImage (shots/models.py) : 파일 이름별 참조 수
+    - shot / 유저 row 가 가리키는 원본과 variant 파일 이름을 row 단위로 센다.
+    - 저장할 때 바뀐 이름만 acquire / release, 삭제하면 release
+    - 참조 수가 0 이 되면 트랜잭션 commit 후 파일과 row 삭제
+* 파일을 저장하거나 이미 있는 파일을 재사용하기 전에 claim() 으로 이름을 선점한다.
+    - 참조 수가 0 인 파일을 지우는 사이에 같은 내용을 저장하면, 파일이 있어서 업로드를 건너뛰었는데
+      곧이어 파일이 삭제될 수 있다.
+    - delete_unreferenced 는 IMAGE_CLAIM_TIMEOUT 안에 선점된 파일을 지우지 않고,
+      row 를 지우는 트랜잭션 안에서 파일을 지워서 그 사이의 claim 은 commit 후에 처리된다.
+      (claim 이 기다린 뒤에는 파일이 없으므로 다시 업로드)
+    - acquire 하면 선점이 풀린다.
+* 참조 수가 어긋나거나 저장만 되고 참조되지 않은 파일은 reclaim_images 명령으로 정리
+'''
+import hashlib
+import os
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .db import upsert
+
+# 내용 hash 로 저장하는 파일의 디렉토리
+PREFIX = 'images'
+# 선점한 파일 이름을 참조하지 않아도 삭제하지 않는 시간 (초, 업로드부터 참조 수 증가까지)
+IMAGE_CLAIM_TIMEOUT = getattr(settings, 'IMAGE_CLAIM_TIMEOUT', 60 * 60)
+
+
+def hashed_name(digest, extension):
+    name = f'{PREFIX}/{digest[:2]}/{digest}'
+    return f'{name}.{extension}' if extension else name
+
+
+def file_digest(content):
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    '''
+    내용의 hash 를 파일 이름으로 저장하는 storage (backend 가 없으면 default_storage 사용)
+    '''
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or default_storage
+
+    def get_available_name(self, name, max_length=None):
+        # 같은 이름이면 같은 내용이라서 이름을 바꾸지 않는다.
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lstrip('.').lower()
+        name = hashed_name(file_digest(content), extension)
+        claim(name)
+        if self.backend.exists(name):
+            return name
+        return self.backend.save(name, content)
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def delete(self, name):
+        self.backend.delete(name)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def referenced_names(name, variants):
+    '''
+    row 가 가리키는 파일 이름의 set (원본 + variant 파일)
+
+    이미지가 바뀌어서 다른 원본으로 만든 variant 는 참조하지 않는 것으로 본다.
+    '''
+    if not name:
+        return set()
+    names = {name}
+    variants = variants or {}
+    if variants.get('source') != name:
+        return names
+    for variant in variants.values():
+        if isinstance(variant, dict):
+            names.update(value for value in variant.values() if isinstance(value, str))
+    return names
+
+
+def claim(name):
+    '''
+    파일을 저장(또는 재사용)하기 전에 이름을 선점 (delete_unreferenced 가 지우지 않음)
+
+    트랜잭션 밖에서 호출해야 다른 프로세스의 delete_unreferenced 가 바로 볼 수 있다.
+    '''
+    StoredImage = apps.get_model('shots', 'StoredImage')
+    upsert(StoredImage, {'name': name, 'claimed_at': timezone.now()}, ('name',), ('claimed_at',))
+
+
+def acquire(names):
+    names = sorted(names)
+    if not names:
+        return
+    StoredImage = apps.get_model('shots', 'StoredImage')
+    StoredImage.objects.bulk_create([StoredImage(name=name) for name in names], ignore_conflicts=True)
+    StoredImage.objects.filter(name__in=names).update(ref_cnt=F('ref_cnt') + 1, claimed_at=None)
+
+
+def release(storage, names):
+    '''
+    참조 수를 줄이고 commit 후 참조가 없는 파일 삭제
+    '''
+    names = sorted(names)
+    if not names:
+        return
+    StoredImage = apps.get_model('shots', 'StoredImage')
+    StoredImage.objects.filter(name__in=names, ref_cnt__gt=0).update(ref_cnt=F('ref_cnt') - 1)
+    transaction.on_commit(lambda: delete_unreferenced(storage, names))
+
+
+def delete_unreferenced(storage, names):
+    StoredImage = apps.get_model('shots', 'StoredImage')
+    unclaimed = Q(claimed_at=None) | Q(claimed_at__lt=timezone.now() - timedelta(seconds=IMAGE_CLAIM_TIMEOUT))
+    deleted = []
+    for name in StoredImage.objects.filter(name__in=names, ref_cnt=0).values_list('name', flat=True):
+        with transaction.atomic():
+            # 그 사이에 다시 참조되거나 선점되었으면 row 가 지워지지 않으므로 파일도 지우지 않는다.
+            # 파일은 row 를 지운 트랜잭션 안에서 지워서, 같은 이름의 claim 이 commit 까지 기다리게 한다.
+            count, _ = StoredImage.objects.filter(unclaimed, name=name, ref_cnt=0).delete()
+            if count:
+                storage.delete(name)
+                deleted.append(name)
+    return deleted
+
+
+def _refs_attr(field_name):
+    return f'_{field_name}_refs'
+
+
+def _is_tracked(instance, field_name, update_fields):
+    if update_fields is not None:
+        return field_name in update_fields
+    # 이미지 필드를 읽지 않은 (deferred) 객체는 save() 해도 이미지가 바뀌지 않는다.
+    return field_name in instance.__dict__
+
+
+def before_save(instance, field_name, variants_field, update_fields=None):
+    '''
+    pre_save : 저장하기 전의 참조 파일 이름 기억
+    '''
+    if not _is_tracked(instance, field_name, update_fields):
+        return
+    names = set()
+    if not instance._state.adding:
+        row = type(instance)._base_manager.filter(pk=instance.pk)\
+            .values(field_name, variants_field).first()
+        if row:
+            names = referenced_names(row[field_name], row[variants_field])
+    setattr(instance, _refs_attr(field_name), names)
+
+
+def after_save(instance, field_name, variants_field, update_fields=None):
+    '''
+    post_save : 바뀐 파일 이름만 참조 수 변경
+    '''
+    old = instance.__dict__.pop(_refs_attr(field_name), None)
+    if old is None:
+        return
+    field_file = getattr(instance, field_name)
+    new = referenced_names(field_file.name, getattr(instance, variants_field))
+    acquire(new - old)
+    release(field_file.storage, old - new)
+
+
+def after_delete(instance, field_name, variants_field):
+    '''
+    post_delete : 참조하던 파일의 참조 수를 줄인다.
+    '''
+    field_file = getattr(instance, field_name)
+    release(field_file.storage, referenced_names(field_file.name, getattr(instance, variants_field)))
@@ -0,0 +1,218 @@
+'''
+업로드 이미지 변환 (shot 이미지, 프로필 이미지 공용)
+
+원본(휴대폰 사진은 수 MB)을 그대로 내려주지 않고 크기별 WebP/JPEG 파일을 만들어서 사용한다.
+
+* 원본은 Pillow 로 한 번만 decode 하고, 큰 크기부터 차례로 줄여서 variant 를 만든다.
+    - JPEG 은 draft() 로 decode 단계에서 필요한 크기 근처까지 줄여서 읽는다.
+    - EXIF 회전 정보를 적용한 뒤 메타데이터(EXIF, GPS 등)는 저장하지 않는다.
+* 파일 이름은 내용의 hash (images/<hash 앞 2자리>/<hash>.<확장자>, config/dedup.py)
+    - 같은 내용이면 같은 이름이라서 이미 있으면 다시 저장하지 않는다.
+    - variant 파일도 원본과 같이 참조 수를 센다.
+* 변환은 트랜잭션 commit 후 thread pool 에서 실행 (IMAGE_PROCESSING_ASYNC = False 면 바로 실행)
+* 결과는 모델의 variants JSONField 에 저장
+    {'source': 원본 이름, 'thumb': {'webp': 이름, 'jpeg': 이름, 'width': , 'height': }, ...}
+'''
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from . import dedup
+
+logger = logging.getLogger(__name__)
+
+# variant 이름 : 긴 변의 최대 길이 (큰 크기부터)
+VARIANTS = getattr(settings, 'IMAGE_VARIANTS', {
+    'full': 1600,
+    'feed': 720,
+    'thumb': 200,
+})
+# 저장 형식 : (Pillow 형식, 확장자, 저장 옵션)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_WORKERS = getattr(settings, 'IMAGE_WORKERS', 2)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image')
+    return _executor
+
+
+def open_image(file):
+    '''
+    이미지를 decode 해서 EXIF 회전을 적용한 RGB(A) 이미지로 반환
+    '''
+    image = Image.open(file)
+    largest = max(VARIANTS.values())
+    # JPEG 은 decode 할 때 1/2, 1/4, 1/8 크기로 줄여서 읽을 수 있다.
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def encode(image, format_name):
+    pil_format, _, options = FORMATS[format_name]
+    if pil_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG 은 투명도가 없어서 흰 배경에 합성
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    # exif, icc_profile 등 메타데이터는 넘기지 않는다.
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def make_variants(file):
+    '''
+    return {variant 이름: {'width': , 'height': , 'webp': bytes, 'jpeg': bytes}}
+    '''
+    image = open_image(file)
+    variants = {}
+    for name, size in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+        if max(image.size) > size:
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+        variants[name] = {
+            'width': image.width,
+            'height': image.height,
+            **{format_name: encode(image, format_name) for format_name in FORMATS},
+        }
+    return variants
+
+
+def save_content(storage, content, extension):
+    '''
+    내용의 hash 를 이름으로 저장 (이미 있으면 저장하지 않음)
+    '''
+    name = dedup.hashed_name(hashlib.sha256(content).hexdigest(), extension)
+    # 이미 있는 파일을 재사용하기 전에 선점 (config/dedup.py)
+    dedup.claim(name)
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(content))
+    return name
+
+
+def store_variants(storage, file):
+    variants = {}
+    for name, variant in make_variants(file).items():
+        variants[name] = {'width': variant['width'], 'height': variant['height']}
+        for format_name, (_, extension, _) in FORMATS.items():
+            variants[name][format_name] = save_content(storage, variant[format_name], extension)
+    return variants
+
+
+def process(model_label, pk, field_name, variants_field):
+    '''
+    instance 의 이미지로 variant 를 만들어서 variants_field 에 저장
+    '''
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('pk', field_name, variants_field).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    with field_file.open('rb') as file:
+        variants = store_variants(field_file.storage, file)
+    variants['source'] = field_file.name
+    with transaction.atomic():
+        # 처리하는 동안 이미지가 바뀌었으면 저장하지 않는다. (저장한 파일은 reclaim_images 로 정리)
+        updated = model.objects.filter(pk=pk, **{field_name: field_file.name})\
+            .update(**{variants_field: variants})
+        if updated:
+            # 이전 원본의 variant 는 이미지를 바꿀 때 참조 수를 줄였다. (config/dedup.py)
+            old = dedup.referenced_names(field_file.name, getattr(instance, variants_field))
+            dedup.acquire(dedup.referenced_names(field_file.name, variants) - old)
+
+
+def _process_in_thread(*args):
+    try:
+        process(*args)
+    except Exception:
+        logger.exception('이미지 변환 실패 %s', args)
+    finally:
+        # thread 에서 연 DB 연결 정리
+        connection.close()
+
+
+def needs_processing(instance, field_name, variants_field):
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field) or {}
+    return bool(field_file) and variants.get('source') != field_file.name
+
+
+def schedule_processing(instance, field_name, variants_field):
+    '''
+    트랜잭션 commit 후 이미지 변환 실행 (IMAGE_PROCESSING_ASYNC 면 thread pool 에서)
+    '''
+    if not needs_processing(instance, field_name, variants_field):
+        return
+    args = (instance._meta.label, instance.pk, field_name, variants_field)
+
+    def run():
+        if getattr(settings, 'IMAGE_PROCESSING_ASYNC', True):
+            get_executor().submit(_process_in_thread, *args)
+        else:
+            process(*args)
+    transaction.on_commit(run)
+
+
+def variant_urls(storage, variants):
+    '''
+    variants JSON → {variant 이름: {'webp': url, 'jpeg': url, 'width': , 'height': }}
+
+    변환 전이면 빈 dict
+    '''
+    urls = {}
+    for name in VARIANTS:
+        variant = (variants or {}).get(name)
+        if variant:
+            urls[name] = {
+                'width': variant['width'],
+                'height': variant['height'],
+                **{format_name: storage.url(variant[format_name]) for format_name in FORMATS},
+            }
+    return urls
+
+
+class ImageVariantsField(serializers.Field):
+    '''
+    variants JSONField 를 variant URL 로 직렬화하는 serializer 필드
+
+    ex) image_variants = ImageVariantsField(image_field='image')
+    '''
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return getattr(instance, self.image_field).name, super().get_attribute(instance)
+
+    def to_representation(self, value):
+        name, variants = value
+        # 이미지가 바뀌고 아직 변환 전이면 이전 이미지의 variant 는 내려주지 않는다.
+        if not name or (variants or {}).get('source') != name:
+            return {}
+        storage = self.parent.Meta.model._meta.get_field(self.image_field).storage
+        return variant_urls(storage, variants)
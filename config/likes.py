@@ -0,0 +1,44 @@
+'''
+좋아요 추가/취소 (영화, shot 공용)
+
+model 은 like_users (ManyToManyField) 와 like_cnt (개수 컬럼) 를 가진 모델
+
+* 좋아요 : 중간 테이블에 INSERT ... ON CONFLICT DO NOTHING
+* 취소 : 중간 테이블에서 DELETE
+* 실제로 추가/삭제된 row 수만큼 like_cnt 를 변경하기 때문에
+  동시에 같은 요청이 여러 번 와도 IntegrityError 없이 개수가 맞는다.
+'''
+from django.db import transaction
+
+from .db import insert_ignore, update_counter
+
+LIKE = 'like'
+UNLIKE = 'unlike'
+TOGGLE = 'toggle'
+# 요청 method 별 동작 (PUT : 좋아요, DELETE : 취소, POST : 토글)
+METHOD_ACTIONS = {
+    'PUT': LIKE,
+    'DELETE': UNLIKE,
+    'POST': TOGGLE,
+}
+
+
+def change_like(model, pk, user, action):
+    '''
+    return (좋아요 여부, 변경된 like_cnt)
+    '''
+    field = model._meta.get_field('like_users')
+    through = field.remote_field.through
+    values = {field.m2m_field_name(): pk, field.m2m_reverse_field_name(): user.pk}
+
+    with transaction.atomic():
+        added = 0
+        if action != UNLIKE:
+            added = insert_ignore(through, **values)
+        removed = 0
+        if action == UNLIKE or (action == TOGGLE and not added):
+            removed, _ = through.objects.filter(**values).delete()
+        like_cnt = update_counter(model, pk, 'like_cnt', added - removed)
+
+    is_liked = action == LIKE or bool(added)
+    return is_liked, like_cnt
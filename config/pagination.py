@@ -0,0 +1,171 @@
+'''
+목록 API 공용 페이지네이션
+
+* offset 모드 : /page/<page>/ 처럼 페이지 번호로 조회
+    - max_page 계산에 필요한 전체 개수는 COUNT(*) 결과를 캐시해서 사용
+* cursor 모드 : ?cursor= 쿼리스트링을 주면 keyset 페이지네이션으로 조회
+    - 정렬 기준 값보다 뒤에 있는 row 만 가져오기 때문에
+      깊은 페이지도 첫 페이지와 같은 비용으로 조회된다.
+    - 첫 페이지는 ?cursor= (빈 값) 으로 요청
+'''
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+# COUNT(*) 결과를 캐시하는 시간 (초)
+COUNT_TIMEOUT = getattr(settings, 'PAGINATION_COUNT_TIMEOUT', 60)
+
+
+def cached_count(queryset):
+    '''
+    queryset 의 전체 개수를 COUNT(*) 로 구하고 캐시한다.
+    '''
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'pagination:count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_TIMEOUT)
+    return count
+
+
+def get_ordering(queryset):
+    '''
+    keyset 페이지네이션에 사용할 정렬 기준
+
+    정렬이 유일하도록 마지막에 pk 를 붙인다.
+    '''
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+        ordering.append('pk')
+    return ordering
+
+
+def encode_cursor(obj, ordering):
+    values = [getattr(obj, field.lstrip('-')) for field in ordering]
+    data = json.dumps(values, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def ordering_fields(queryset, ordering):
+    '''
+    정렬 기준의 모델 필드 (annotate 한 값이면 output_field)
+    '''
+    fields = []
+    for field in ordering:
+        name = field.lstrip('-')
+        if name in queryset.query.annotations:
+            fields.append(queryset.query.annotations[name].output_field)
+            continue
+        # movie__title 처럼 관계를 따라가는 정렬
+        opts = queryset.model._meta
+        for part in name.split('__'):
+            model_field = opts.pk if part == 'pk' else opts.get_field(part)
+            if model_field.is_relation:
+                opts = model_field.related_model._meta
+        fields.append(model_field.target_field if model_field.is_relation else model_field)
+    return fields
+
+
+def decode_cursor(cursor, ordering, fields=None):
+    '''
+    cursor 를 정렬 기준 값 리스트로 되돌린다.
+
+    fields 를 주면 각 값을 필드 타입으로 변환 (변조된 cursor 는 400)
+    '''
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValidationError({'cursor': '잘못된 cursor 입니다.'})
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValidationError({'cursor': '잘못된 cursor 입니다.'})
+    if fields is not None:
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise ValidationError({'cursor': '잘못된 cursor 입니다.'})
+        # NULL 과는 크기를 비교할 수 없다.
+        if any(value is None for value in values):
+            raise ValidationError({'cursor': '잘못된 cursor 입니다.'})
+    return values
+
+
+def keyset_filter(ordering, values):
+    '''
+    (f1, f2, ...) > (v1, v2, ...) 조건을 Q 로 만든다.
+
+    ex) ordering = ['-popularity', 'pk']
+        popularity < v1 OR (popularity = v1 AND pk > v2)
+    '''
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate(request, queryset, page, per_page):
+    '''
+    queryset 에서 한 페이지만큼 가져온다.
+
+    return (page 에 해당하는 객체 리스트, max_page, next_cursor)
+
+    * request.GET 에 cursor 가 있으면 cursor 모드, 없으면 page 번호를 사용
+    * next_cursor : 다음 페이지를 cursor 모드로 요청할 때 사용하는 값
+      (마지막 페이지인 경우 None)
+    '''
+    ordering = get_ordering(queryset)
+    queryset = queryset.order_by(*ordering)
+    max_page = round(cached_count(queryset)/per_page)
+
+    if 'cursor' in request.GET:
+        cursor = request.GET['cursor']
+        if cursor:
+            values = decode_cursor(cursor, ordering, ordering_fields(queryset, ordering))
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        objects = list(queryset[:per_page])
+    else:
+        objects = list(queryset[page*per_page:page*per_page+per_page])
+
+    next_cursor = None
+    if len(objects) == per_page:
+        next_cursor = encode_cursor(objects[-1], ordering)
+    return objects, max_page, next_cursor
+
+
+def paginate_list(request, items, page, per_page):
+    '''
+    미리 계산해둔 리스트(캐시된 영화 목록 등)를 한 페이지만큼 자른다.
+
+    return (page 에 해당하는 리스트, max_page, next_cursor)
+
+    cursor 모드에서는 다음 페이지의 시작 위치를 cursor 로 사용한다.
+    '''
+    max_page = round(len(items)/per_page)
+    start = page*per_page
+    if 'cursor' in request.GET:
+        cursor = request.GET['cursor']
+        start = decode_cursor(cursor, ['offset'])[0] if cursor else 0
+        if not isinstance(start, int) or start < 0:
+            raise ValidationError({'cursor': '잘못된 cursor 입니다.'})
+
+    objects = items[start:start+per_page]
+    next_cursor = None
+    if start+per_page < len(items):
+        data = json.dumps([start+per_page])
+        next_cursor = base64.urlsafe_b64encode(data.encode()).decode()
+    return objects, max_page, next_cursor
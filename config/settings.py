@@ -187,6 +187,48 @@ REST_FRAMEWORK = {
     ]
 }
 
+# 캐시 설정 (CACHE_BACKEND : locmem / file / redis)
+# * locmem : 프로세스 메모리 (개발용, MAX_ENTRIES 를 넘으면 오래된 항목부터 삭제)
+# * file : CACHE_LOCATION 디렉토리에 저장 (여러 프로세스가 공유)
+# * redis : CACHE_LOCATION 의 redis 서버 사용 (django-redis 설치 필요)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+CACHE_MAX_ENTRIES = config('CACHE_MAX_ENTRIES', default=5000, cast=int)
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/1',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_LOCATION or '/var/tmp/oneshot_cache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+
+# 익명 사용자 API 응답 캐시 유지 시간 (초, config/cache.py)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=60 * 5, cast=int)
+
+# 팔로잉 feed 를 shot 생성 시 미리 만들어두는 timeline 사용 여부 (shots/timeline.py)
+SHOT_TIMELINE_ENABLED = config('SHOT_TIMELINE_ENABLED', default=False, cast=bool)
+
+# TMDB 영화 데이터 수집 (movies/tmdb, ingest_tmdb 명령)
+TMDB_API_KEY = config('API_KEY', default='')
+TMDB_BASE_URL = config('TMDB_BASE_URL', default='https://api.themoviedb.org/3')
+# 초당 최대 요청 수
+TMDB_RATE_LIMIT = config('TMDB_RATE_LIMIT', default=40, cast=int)
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
 
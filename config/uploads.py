@@ -0,0 +1,173 @@
+'''
+이미지 업로드 (multipart) 를 스트리밍으로 받기
+
+기본 parser 는 업로드 전체를 받은 뒤에야 크기와 형식을 확인한다.
+ImageUploadParser 는
+
+* Content-Length 가 IMAGE_UPLOAD_MAX_SIZE 를 넘으면 body 를 읽기 전에 413
+* 파일을 chunk 단위로 임시 파일에 쓰면서 (메모리에 올리지 않음)
+    - 첫 chunk 의 파일 시그니처가 JPEG / PNG / GIF / WebP 가 아니면 바로 400
+    - 받은 크기가 IMAGE_UPLOAD_MAX_SIZE 를 넘는 순간 413
+* 다 받으면 이미지 헤더만 읽어서 픽셀 수가 IMAGE_UPLOAD_MAX_PIXELS 를 넘으면 400
+
+임시 파일을 storage (S3) 에 올리는 일은 요청이 끝난 뒤 shots/uploads.py 에서 한다.
+'''
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser
+from django.http.multipartparser import MultiPartParserError
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, ValidationError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+IMAGE_UPLOAD_MAX_SIZE = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+IMAGE_UPLOAD_MAX_PIXELS = getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)
+# 요청이 끝난 뒤 storage 에 올릴 때까지 업로드 파일을 보관하는 디렉토리
+IMAGE_UPLOAD_SPOOL_DIR = getattr(
+    settings, 'IMAGE_UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'oneshot-uploads')
+)
+
+# 파일 시그니처 길이 (WebP : RIFF....WEBP)
+HEADER_SIZE = 12
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = f'이미지는 {IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024)}MB 까지 업로드할 수 있습니다.'
+    default_code = 'upload_too_large'
+
+
+def is_image_header(header):
+    return (
+        header.startswith(b'\xff\xd8\xff')
+        or header.startswith(b'\x89PNG\r\n\x1a\n')
+        or header[:6] in (b'GIF87a', b'GIF89a')
+        or (header[:4] == b'RIFF' and header[8:12] == b'WEBP')
+    )
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    '''
+    파일을 임시 파일에 쓰면서 크기와 파일 시그니처를 확인하는 upload handler
+    '''
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # 파일이 아닌 필드는 DATA_UPLOAD_MAX_MEMORY_SIZE 까지 허용
+        if content_length and content_length > IMAGE_UPLOAD_MAX_SIZE + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > IMAGE_UPLOAD_MAX_SIZE:
+            raise UploadTooLarge()
+        if len(self.header) < HEADER_SIZE:
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) == HEADER_SIZE:
+                self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self):
+        if not is_image_header(self.header):
+            raise ValidationError({self.field_name: 'JPEG, PNG, GIF, WebP 이미지만 업로드할 수 있습니다.'})
+
+    def file_complete(self, file_size):
+        if len(self.header) < HEADER_SIZE:
+            self.check_header()
+        file = super().file_complete(file_size)
+        # 헤더만 읽어서 크기 확인 (decode 하지 않음)
+        try:
+            width, height = Image.open(file).size
+        except Exception:
+            raise ValidationError({self.field_name: '이미지 파일을 읽을 수 없습니다.'})
+        if width * height > IMAGE_UPLOAD_MAX_PIXELS:
+            raise ValidationError({self.field_name: '이미지 해상도가 너무 큽니다.'})
+        file.seek(0)
+        return file
+
+
+class ImageUploadParser(MultiPartParser):
+    '''
+    ImageUploadHandler 로 파일을 받는 multipart parser
+
+    ex) @parser_classes([JSONParser, FormParser, ImageUploadParser])
+    '''
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        try:
+            parser = DjangoMultiPartParser(meta, stream, [ImageUploadHandler(request)], encoding)
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpooledFile:
+    '''
+    spool 디렉토리로 옮긴 업로드 파일
+
+    detach() 로 경로를 넘겨받지 않은 채 객체가 사라지면 파일을 지운다.
+    transaction.on_commit 에 넘긴 callback 이 이 객체를 갖고 있으면,
+    트랜잭션이 rollback 되어 callback 이 버려질 때 파일도 함께 지워진다.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self._finalizer = weakref.finalize(self, remove_file, path)
+
+    def detach(self):
+        '''
+        파일을 지우지 않도록 하고 경로를 반환 (이후 파일 정리는 받은 쪽에서)
+        '''
+        self._finalizer.detach()
+        return self.path
+
+
+def spool(uploaded_file, name=None):
+    '''
+    업로드 파일을 요청이 끝나도 지워지지 않는 위치로 옮기고 SpooledFile 을 반환
+
+    (요청이 끝나면 Django 가 업로드 임시 파일을 닫고 지운다.)
+    name : 확장자를 뺀 spool 파일 이름 (없으면 임의의 이름, spooled_files 로 다시 찾을 때 사용)
+    '''
+    os.makedirs(IMAGE_UPLOAD_SPOOL_DIR, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    path = os.path.join(IMAGE_UPLOAD_SPOOL_DIR, f'{name or uuid.uuid4().hex}{extension}')
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        file_move_safe(uploaded_file.temporary_file_path(), path)
+    else:
+        uploaded_file.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(uploaded_file, f)
+    return SpooledFile(path)
+
+
+def spooled_files():
+    '''
+    {확장자를 뺀 파일 이름: 경로} spool 디렉토리에 남아있는 파일
+    '''
+    if not os.path.isdir(IMAGE_UPLOAD_SPOOL_DIR):
+        return {}
+    return {
+        os.path.splitext(entry.name)[0]: entry.path
+        for entry in os.scandir(IMAGE_UPLOAD_SPOOL_DIR) if entry.is_file()
+    }
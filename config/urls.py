@@ -20,6 +20,7 @@ from django.urls import path,include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from . import views
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -34,6 +35,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/swagger/', schema_view.with_ui('redoc')),
+    path('api/v1/cache/stats/', views.cache_stats),
     path('api/v1/movies/', include('movies.urls')),
     path('api/v1/shots/', include('shots.urls')),
     path('api/v1/accounts/', include('accounts.urls')),
@@ -0,0 +1,31 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import cache
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    '''
+    cache_stats
+
+    ---
+    [GET] API 별 응답 캐시 hit/miss 횟수와 hit_rate, 데이터 그룹별 캐시 버전 (관리자만 가능)
+
+    [DELETE] hit/miss 횟수 초기화
+
+    '''
+    if request.method == 'GET':
+        data = {
+            'versions': dict(zip(cache.GROUPS, cache.get_versions(cache.GROUPS))),
+            'timeout': cache.RESPONSE_CACHE_TIMEOUT,
+            'endpoints': cache.get_stats(),
+        }
+        return Response(data)
+
+    elif request.method == 'DELETE':
+        cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
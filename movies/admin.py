@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Genre, Video, Movie, StarRating, MovieComment
+from .models import Genre, Video, Movie, StarRating, MovieComment, GenreAffinity, MovieWindow, IngestionRun
 
 
 # Register your models here.
@@ -7,4 +7,7 @@ admin.site.register(Genre)
 admin.site.register(Video)
 admin.site.register(Movie)
 admin.site.register(StarRating)
-admin.site.register(MovieComment)
\ No newline at end of file
+admin.site.register(MovieComment)
+admin.site.register(GenreAffinity)
+admin.site.register(MovieWindow)
+admin.site.register(IngestionRun)
@@ -0,0 +1,113 @@
+'''
+영화 제목 자동완성 색인
+
+프로세스 메모리에 영화 제목의 n-gram(1, 2글자) posting list 를 만들어두고
+검색어가 포함된 제목을 인기순으로 k 개 찾는다.
+
+* 처음 사용할 때 DB 에서 (id, 제목, 인기도)만 읽어서 생성
+* 영화가 생성/수정/삭제되면 invalidate() 로 버전을 바꾸고, 다음 요청에서 다시 생성
+  (버전은 캐시에 저장하기 때문에 캐시를 공유하는 다른 프로세스도 다시 생성)
+'''
+import threading
+import time
+import unicodedata
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Movie
+
+VERSION_KEY = 'movies:autocomplete:version'
+# 캐시를 공유하지 않는 프로세스도 주기적으로 다시 생성하도록 최대 유지 시간 (초)
+INDEX_MAX_AGE = getattr(settings, 'MOVIE_AUTOCOMPLETE_MAX_AGE', 60 * 10)
+
+
+def normalize(text):
+    return ' '.join(unicodedata.normalize('NFKC', text or '').lower().split())
+
+
+def grams(text):
+    '''
+    1글자, 2글자 n-gram
+    '''
+    return {text[i:i+n] for n in (1, 2) for i in range(len(text) - n + 1)}
+
+
+class TitleIndex:
+    def __init__(self, rows, version=None):
+        # 인기순으로 정렬해서 posting list 가 인기순이 되도록 한다.
+        rows = sorted(rows, key=lambda row: (-row[2], row[0]))
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = [pk for pk, _, _ in rows]
+        self.titles = [title for _, title, _ in rows]
+        self.normalized = [normalize(title) for title in self.titles]
+        self.postings = {}
+        self.exact = {}
+        for position, title in enumerate(self.normalized):
+            for gram in grams(title):
+                self.postings.setdefault(gram, []).append(position)
+            self.exact.setdefault(title, position)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k=10):
+        '''
+        query 가 포함된 제목을 최대 k 개 [(id, 제목), ...]
+
+        인기순으로 k 개를 찾은 뒤 query 로 시작하는 제목을 앞에 둔다.
+        '''
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) == 1:
+            query_grams = {query}
+        else:
+            query_grams = {query[i:i+2] for i in range(len(query) - 1)}
+        postings = [self.postings.get(gram, []) for gram in query_grams]
+        candidates = min(postings, key=len)
+
+        matched = []
+        for position in candidates:
+            if query in self.normalized[position]:
+                matched.append(position)
+                if len(matched) == k:
+                    break
+        matched.sort(key=lambda position: not self.normalized[position].startswith(query))
+        return [(self.ids[position], self.titles[position]) for position in matched]
+
+    def resolve(self, title):
+        '''
+        제목이 일치하는 영화 id (같은 제목이 여러 개면 가장 인기 있는 영화)
+        '''
+        position = self.exact.get(normalize(title))
+        return None if position is None else self.ids[position]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_index():
+    global _index
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        invalidate()
+        version = cache.get(VERSION_KEY)
+
+    index = _index
+    if index is None or index.version != version\
+        or time.monotonic() - index.built_at > INDEX_MAX_AGE:
+        with _lock:
+            index = _index
+            if index is None or index.version != version\
+                or time.monotonic() - index.built_at > INDEX_MAX_AGE:
+                rows = Movie.objects.values_list('pk', 'title', 'popularity')
+                index = _index = TitleIndex(rows, version)
+    return index
@@ -0,0 +1,159 @@
+'''
+Django fixture(JSON) 를 스트리밍으로 읽어서 bulk insert
+
+loaddata 는 파일 전체를 메모리에 올리고 객체마다 save() 와 signal 을 실행한다.
+load_fixture 는
+
+* 파일을 CHUNK_SIZE 씩 읽으면서 최상위 배열의 객체를 하나씩 파싱 (JSONDecoder.raw_decode)
+* 모델별로 BATCH_SIZE 개씩 모아서 한 트랜잭션에서 upsert (같은 pk 가 있으면 fixture 값으로 덮어씀)
+* ManyToMany 는 중간 테이블 row 를 직접 bulk insert
+* signal 대신 마지막에 장르 bit / genre_mask / 검색 색인 / 캐시를 한 번에 갱신
+'''
+import json
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import connection, transaction
+
+from config import cache
+from config.db import upsert_many
+from . import autocomplete, genres
+from .models import Genre, Movie
+from .search import get_backend
+from .windows import refresh_window
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+SEPARATORS = ' \t\r\n,'
+
+
+def iter_objects(fp, chunk_size=CHUNK_SIZE):
+    '''
+    JSON 배열 파일에서 원소를 하나씩 yield (파일 전체를 메모리에 올리지 않음)
+    '''
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    started = False
+    while True:
+        # 원소 사이의 공백과 쉼표 건너뛰기
+        while pos < len(buffer) and buffer[pos] in SEPARATORS:
+            pos += 1
+        if pos == len(buffer):
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                raise ValueError('fixture 배열이 닫히지 않았습니다.')
+            buffer, pos = chunk, 0
+            continue
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError('fixture 는 JSON 배열이어야 합니다.')
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            obj, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # 원소가 chunk 경계에서 잘린 경우 다음 chunk 를 붙여서 다시 파싱
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield obj
+
+
+class FixtureLoader:
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        # {(모델, 필드 이름들): [row, ...]}
+        self.rows = defaultdict(list)
+        # {중간 테이블 모델: (source 필드, target 필드, {source id}, [(source id, target id), ...])}
+        self.relations = {}
+        self.pending = 0
+        self.counts = defaultdict(int)
+        self.tables = set()
+        self.movie_ids = []
+
+    def add(self, obj):
+        model = apps.get_model(obj['model'])
+        opts = model._meta
+        row = {opts.pk.name: opts.pk.to_python(obj['pk'])}
+        for name, value in obj['fields'].items():
+            field = opts.get_field(name)
+            if field.many_to_many:
+                through = field.remote_field.through
+                source = field.m2m_field_name()
+                target = field.m2m_reverse_field_name()
+                _, _, source_ids, links = self.relations.setdefault(
+                    through, (source, target, set(), [])
+                )
+                source_ids.add(row[opts.pk.name])
+                links.extend((row[opts.pk.name], target_id) for target_id in value)
+                self.tables.add(through._meta.db_table)
+            elif field.is_relation:
+                row[field.name] = value
+            else:
+                row[field.name] = field.to_python(value)
+        self.rows[(model, tuple(row))].append(row)
+        self.counts[opts.label_lower] += 1
+        self.tables.add(opts.db_table)
+        if model is Movie:
+            self.movie_ids.append(row[opts.pk.name])
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with transaction.atomic():
+            for (model, fields), rows in self.rows.items():
+                pk_name = model._meta.pk.name
+                update_fields = [name for name in fields if name != pk_name]
+                upsert_many(model, rows, (pk_name,), update_fields, batch_size=self.batch_size)
+            # fixture 의 관계로 교체 (loaddata 의 set() 과 같음)
+            for through, (source, target, source_ids, links) in self.relations.items():
+                through.objects.filter(**{f'{source}_id__in': source_ids}).delete()
+                through.objects.bulk_create([
+                    through(**{f'{source}_id': source_id, f'{target}_id': target_id})
+                    for source_id, target_id in links
+                ], batch_size=self.batch_size)
+        self.rows.clear()
+        self.relations.clear()
+        self.pending = 0
+
+    def finish(self):
+        self.flush()
+        # 새 장르에 bit 할당 (upsert 는 pre_save signal 이 없음)
+        genres.assign_missing_bits()
+        genres.invalidate()
+
+        backend = get_backend()
+        for i in range(0, len(self.movie_ids), self.batch_size):
+            movie_ids = self.movie_ids[i:i+self.batch_size]
+            genres.update_genre_masks(movie_ids)
+            backend.index(Movie.objects.filter(pk__in=movie_ids).only('pk', 'title', 'overview'))
+        autocomplete.invalidate()
+        cache.invalidate()
+        # 최신 상영작 window 도 새 영화로 다시 계산 (TMDB 수집과 같음)
+        refresh_window()
+
+
+def load_fixture(path, batch_size=BATCH_SIZE):
+    '''
+    fixture 파일을 읽어서 저장
+
+    return {모델 label: 객체 수}
+    '''
+    loader = FixtureLoader(batch_size)
+    # loaddata 와 같이 FK 검사는 마지막에 한 번 (fixture 안의 순서와 상관없이 저장)
+    with connection.constraint_checks_disabled():
+        with open(path, encoding='utf-8') as fp:
+            for obj in iter_objects(fp):
+                loader.add(obj)
+        loader.flush()
+    connection.check_constraints(table_names=sorted(loader.tables))
+    loader.finish()
+    return dict(loader.counts)
@@ -0,0 +1,200 @@
+'''
+장르 이름/bit 매핑과 장르 필터
+
+TMDB 장르는 20개 정도라서 영화의 장르를 Movie.genre_mask 에 bit 로 저장한다.
+(Genre.bit 위치의 bit 가 1 이면 그 장르를 가진 영화)
+
+* 장르 필터와 선호 장르 점수 계산을 movies_movie_genres JOIN 없이 처리
+* genre_mask 는 Movie.genres 가 바뀔 때 signal 에서 update_genre_masks() 로 동기화
+'''
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Max, Value
+
+from config import cache as response_cache
+from .models import Genre, Movie
+
+GENRE_TABLE_KEY = 'movies:genre_table'
+# 장르 테이블 캐시 유지 시간 (초)
+# 수집/적재 명령의 invalidate() 는 그 프로세스의 캐시만 지우기 때문에 (locmem)
+# 다른 프로세스는 이 시간이 지나면 새 장르를 읽는다.
+GENRE_TABLE_TIMEOUT = getattr(settings, 'GENRE_TABLE_TIMEOUT', 60 * 5)
+# BigIntegerField 에 저장할 수 있는 최대 bit 위치
+MAX_GENRE_BIT = Genre.MAX_BIT
+
+
+def genre_table():
+    '''
+    [(장르 id, 이름, bit), ...] (캐시, 장르가 바뀌면 signal 에서 invalidate)
+    '''
+    genres = cache.get(GENRE_TABLE_KEY)
+    if genres is None:
+        genres = list(Genre.objects.order_by('bit', 'pk').values_list('pk', 'name', 'bit'))
+        cache.set(GENRE_TABLE_KEY, genres, GENRE_TABLE_TIMEOUT)
+    return genres
+
+
+def invalidate():
+    cache.delete(GENRE_TABLE_KEY)
+
+
+def genre_map():
+    '''
+    {장르 이름: 장르 id}
+    '''
+    return {name: pk for pk, name, _ in genre_table()}
+
+
+def genre_bits():
+    '''
+    {장르 id: bit}
+    '''
+    return {pk: bit for pk, _, bit in genre_table() if bit is not None}
+
+
+def allocate_bits(count):
+    '''
+    새 장르 count 개에 할당할 bit 위치 리스트
+
+    트랜잭션 안에서 호출하면 장르 row 를 잠가서 commit 할 때까지 다른 요청이 같은 bit 를 읽지 않는다.
+    (트랜잭션 밖이면 Genre.bit 의 unique 제약 조건으로 중복을 막는다.)
+    '''
+    if connection.in_atomic_block:
+        list(Genre.objects.select_for_update().values_list('pk', flat=True))
+    bit = Genre.objects.aggregate(bit=Max('bit'))['bit']
+    start = 0 if bit is None else bit + 1
+    if start + count - 1 > MAX_GENRE_BIT:
+        raise ValueError('genre_mask 에 저장할 수 있는 장르 수를 넘었습니다.')
+    return list(range(start, start + count))
+
+
+def next_bit():
+    return allocate_bits(1)[0]
+
+
+def assign_missing_bits():
+    '''
+    bit 가 없는 장르 (bulk_create 등 signal 없이 만든 장르) 에 bit 를 할당하고
+    그 장르를 가진 영화의 genre_mask 를 다시 계산
+
+    return bit 를 할당한 장르 id 리스트
+    '''
+    with transaction.atomic():
+        missing = list(
+            Genre.objects.select_for_update().filter(bit=None).order_by('pk').values_list('pk', flat=True)
+        )
+        if not missing:
+            return []
+        for genre_id, bit in zip(missing, allocate_bits(len(missing))):
+            Genre.objects.filter(pk=genre_id).update(bit=bit)
+        movie_ids = list(
+            Movie.genres.through.objects.filter(genre_id__in=missing)
+                .values_list('movie_id', flat=True).distinct()
+        )
+        for i in range(0, len(movie_ids), 500):
+            update_genre_masks(movie_ids[i:i+500])
+    invalidate()
+    # update 는 signal 이 없어서 장르에 의존하는 응답 캐시를 직접 무효화
+    response_cache.invalidate(response_cache.GENRES)
+    return missing
+
+
+def mask_of(genre_ids):
+    '''
+    장르 id 들의 bit 를 합친 mask (bit 가 없는 장르는 무시)
+
+    bit 할당은 signal 과 적재 명령 (assign_missing_bits) 에서만 한다. (조회 중에는 DB 에 쓰지 않음)
+    '''
+    bits = genre_bits()
+    mask = 0
+    for genre_id in genre_ids:
+        if genre_id in bits:
+            mask |= 1 << bits[genre_id]
+    return mask
+
+
+def decode_mask(mask):
+    '''
+    genre_mask → [{'id': 장르 id, 'name': 이름}, ...]
+    '''
+    return [
+        {'id': pk, 'name': name}
+        for pk, name, bit in genre_table()
+        if bit is not None and mask & (1 << bit)
+    ]
+
+
+def update_genre_masks(movie_ids):
+    '''
+    movie_ids 영화들의 genre_mask 를 중간 테이블 기준으로 다시 계산
+    '''
+    movie_ids = list(movie_ids)
+    masks = dict.fromkeys(movie_ids, 0)
+    rows = Movie.genres.through.objects.filter(movie_id__in=movie_ids)\
+        .exclude(genre__bit=None).values_list('movie_id', 'genre__bit')
+    for movie_id, bit in rows:
+        masks[movie_id] |= 1 << bit
+
+    # 같은 mask 를 가진 영화끼리 한 번에 update
+    grouped = {}
+    for movie_id, mask in masks.items():
+        grouped.setdefault(mask, []).append(movie_id)
+    for mask, ids in grouped.items():
+        Movie.objects.filter(pk__in=ids).update(genre_mask=mask)
+
+
+def parse_genres(value):
+    '''
+    쿼리스트링의 장르 목록 파싱
+
+    ex) "['액션', '드라마']" → ['액션', '드라마']
+    '''
+    genres = value.strip('[').strip(']')\
+                  .replace('"','').replace("'",'')\
+                  .split(',')
+    return [genre.strip() for genre in genres if genre.strip()]
+
+
+def has_all(queryset, mask):
+    '''
+    mask 의 장르를 모두 가진 영화
+    '''
+    return queryset.alias(matched_genres=F('genre_mask').bitand(mask))\
+        .filter(matched_genres=mask)
+
+
+def has_any(queryset, mask):
+    '''
+    mask 의 장르 중 하나라도 가진 영화
+    '''
+    return queryset.alias(matched_genres=F('genre_mask').bitand(mask))\
+        .exclude(matched_genres=0)
+
+
+def filter_all_genres(queryset, names):
+    '''
+    names 의 장르를 모두 가진 영화만 남긴다.
+    '''
+    genres = genre_map()
+    bits = genre_bits()
+    if any(genres.get(name) not in bits for name in names):
+        # 없는 장르 (또는 아직 bit 가 없는 장르) 가 있으면 모두 가진 영화도 없음
+        return queryset.none()
+    return has_all(queryset, mask_of(genres[name] for name in names))
+
+
+def score_expression(weights):
+    '''
+    영화가 가진 장르의 가중치 합계를 계산하는 expression
+
+    weights : {장르 id: 가중치}
+    SUM(((genre_mask >> bit) & 1) * 가중치) 를 영화 테이블에서 바로 계산하기 때문에
+    전체 영화에 대한 점수를 JOIN 없이 한 번에 구할 수 있다.
+    '''
+    bits = genre_bits()
+    score = Value(0)
+    for genre_id, weight in weights.items():
+        if genre_id in bits and weight:
+            score = score + F('genre_mask').bitrightshift(bits[genre_id]).bitand(1) * weight
+    return score
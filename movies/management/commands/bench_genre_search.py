@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from movies.genres import filter_all_genres
+from movies.models import Genre, Movie
+
+
+def legacy_filter(queryset, names):
+    # 이전 search API 방식 : 장르마다 Genre.objects.get + JOIN
+    for name in names:
+        genre = Genre.objects.get(name=name)
+        queryset &= queryset.filter(genres=genre)
+    return queryset
+
+
+class Command(BaseCommand):
+    help = '장르 1/3/5개 검색에서 이전 방식(장르별 JOIN)과 genre_mask bit 연산 방식을 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, filter_func, names, repeat):
+        movies = Movie.objects.exclude(
+            overview__exact='', poster_path__exact='', backdrop_path__exact=''
+        ).order_by('-popularity', 'pk')
+        elapsed = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                ids = list(filter_func(movies, names).values_list('pk', flat=True)[:12])
+                elapsed += time.perf_counter() - start
+        return elapsed / repeat * 1000, len(ctx.captured_queries), ids
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        # 영화가 많은 장르부터 사용
+        names = list(
+            Genre.objects.annotate(movie_cnt=Count('movie_genres'))
+                .order_by('-movie_cnt').values_list('name', flat=True)
+        )
+        if len(names) < 5:
+            self.stderr.write('장르 데이터가 5개 이상 필요합니다. (loaddata movies.json)')
+            return
+
+        self.stdout.write(f'{"genres":>6} {"legacy ms":>10} {"queries":>7} {"bitmask ms":>12} {"queries":>7}')
+        for num in (1, 3, 5):
+            legacy_ms, legacy_queries, legacy_ids = self.measure(legacy_filter, names[:num], repeat)
+            new_ms, new_queries, new_ids = self.measure(filter_all_genres, names[:num], repeat)
+            if legacy_ids != new_ids:
+                self.stderr.write(f'장르 {num}개 결과가 다릅니다.')
+            self.stdout.write(
+                f'{num:>6} {legacy_ms:>10.2f} {legacy_queries:>7} {new_ms:>12.2f} {new_queries:>7}'
+            )
@@ -0,0 +1,51 @@
+import os
+import time
+import tracemalloc
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.bulk_load import load_fixture
+from movies.models import Genre, Movie, Video
+
+
+class Command(BaseCommand):
+    help = (
+        'movies.json 을 loaddata 와 load_movies(스트리밍 bulk insert) 로 저장하는 시간을 비교합니다. '
+        '(각각 트랜잭션 안에서 저장하고 끝나면 rollback)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=os.path.join(settings.BASE_DIR, 'movies.json'))
+
+    def measure(self, func):
+        with transaction.atomic():
+            tracemalloc.start()
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            counts = (Genre.objects.count(), Video.objects.count(), Movie.objects.count(),
+                      Movie.genres.through.objects.count(), Movie.video.through.objects.count())
+            transaction.set_rollback(True)
+        return elapsed, peak / 1024 / 1024, counts
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if Movie.objects.exists():
+            self.stderr.write('영화 데이터가 없는 DB 에서 실행해야 합니다.')
+            return
+
+        results = {
+            'loaddata': self.measure(lambda: call_command('loaddata', path, stdout=StringIO())),
+            'load_movies': self.measure(lambda: load_fixture(path)),
+        }
+        self.stdout.write(f'{"":>12} {"seconds":>8} {"peak MB":>8}  (genres, videos, movies, movie_genres, movie_video)')
+        for name, (elapsed, peak, counts) in results.items():
+            self.stdout.write(f'{name:>12} {elapsed:>8.2f} {peak:>8.1f}  {counts}')
+        if results['loaddata'][2] != results['load_movies'][2]:
+            self.stderr.write('저장된 row 수가 다릅니다.')
@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movies.tmdb import ingest
+
+# checkpoint 파일 기본 경로 (저장소 밖의 임시 디렉토리)
+DEFAULT_CHECKPOINT = getattr(
+    settings, 'TMDB_CHECKPOINT_PATH', os.path.join(tempfile.gettempdir(), 'oneshot-tmdb-checkpoint.json')
+)
+
+
+class Command(BaseCommand):
+    help = 'TMDB 장르/인기 영화/상영중 영화/예고편을 가져와서 저장합니다. (중단되면 checkpoint 부터 이어서 진행)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=100, help='목록별로 가져올 페이지 수')
+        parser.add_argument('--workers', type=int, default=8, help='동시에 보내는 요청 수')
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='checkpoint 파일 경로')
+        parser.add_argument('--reset', action='store_true', help='checkpoint 를 무시하고 처음부터 수집')
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        if options['reset'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        stats = ingest(
+            pages=options['pages'], workers=options['workers'],
+            checkpoint_path=checkpoint, stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"장르 {stats['genres']}개, 영화 {stats['movies']}개, 예고편 {stats['videos']}개를 저장했습니다."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movies.recommendations import rebuild_affinity
+
+
+class Command(BaseCommand):
+    help = '별점 기록으로부터 유저별 장르 선호도(GenreAffinity)를 다시 계산합니다.'
+
+    def handle(self, *args, **options):
+        count = rebuild_affinity()
+        self.stdout.write(self.style.SUCCESS(f'{count}개의 장르 선호도를 저장했습니다.'))
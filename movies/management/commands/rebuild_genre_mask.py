@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from movies.genres import update_genre_masks
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = '영화의 genre_mask 를 장르 중간 테이블 기준으로 다시 계산합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        movie_ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True))
+        for i in range(0, len(movie_ids), batch_size):
+            update_genre_masks(movie_ids[i:i+batch_size])
+        self.stdout.write(self.style.SUCCESS(f'{len(movie_ids)}개 영화의 genre_mask 를 갱신했습니다.'))
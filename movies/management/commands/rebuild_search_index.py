@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from movies.search import get_backend
+
+
+class Command(BaseCommand):
+    help = '영화 제목/줄거리 검색 색인을 다시 생성합니다.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{backend.__class__.__name__}: {count}개의 영화를 색인했습니다.'
+        ))
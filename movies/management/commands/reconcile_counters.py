@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from accounts.models import Follow, User
+from movies.models import Movie, MovieComment, related_aggregate
+from movies.ratings import rebuild_aggregates
+from shots.models import Shot, ShotComment
+
+# (model, 개수 컬럼, 집계할 model, FK 필드, 집계 함수, 기본값)
+COUNTERS = [
+    (Movie, 'like_cnt', Movie.like_users.through, 'movie', Count('pk'), 0),
+    (Movie, 'comments_cnt', MovieComment, 'movie', Count('pk'), 0),
+    (Movie, 'shot_cnt', Shot, 'movie', Count('pk'), 0),
+    (Shot, 'like_cnt', Shot.like_users.through, 'shot', Count('pk'), 0),
+    (Shot, 'comments_cnt', ShotComment, 'shot', Count('pk'), 0),
+    (User, 'followers_cnt', Follow, 'to_user', Count('pk'), 0),
+    (User, 'followings_cnt', Follow, 'from_user', Count('pk'), 0),
+]
+
+
+class Command(BaseCommand):
+    help = '영화/shot 의 좋아요·댓글·shot·별점 수(합계), 유저의 팔로워·팔로잉 수 컬럼을 실제 개수와 비교해서 다시 맞춥니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='개수가 다른 row 수만 출력')
+
+    def handle(self, *args, **options):
+        for model, counter, related_model, field, aggregate, default in COUNTERS:
+            actual = related_aggregate(related_model, aggregate, default, field=field)
+            drifted = model.objects.filter(~Q(**{counter: actual}))
+            if options['dry_run']:
+                fixed = drifted.count()
+            else:
+                fixed = drifted.update(**{counter: actual})
+            self.stdout.write(f'{model.__name__}.{counter}: {fixed}개 불일치')
+        if not options['dry_run']:
+            # 별점 개수/합계/평균/분포는 별점 기록으로부터 다시 계산
+            fixed = rebuild_aggregates()
+            self.stdout.write(f'Movie.star_*: {fixed}개 불일치')
+            self.stdout.write(self.style.SUCCESS('개수 컬럼을 보정했습니다.'))
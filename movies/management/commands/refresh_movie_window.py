@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movies.windows import refresh_window
+
+
+class Command(BaseCommand):
+    help = '최신 상영작 window (now_playing, movies, movie_trailer API) 를 다시 계산합니다.'
+
+    def handle(self, *args, **options):
+        window = refresh_window()
+        self.stdout.write(self.style.SUCCESS(
+            f"now_playing {len(window['now_playing'])}개, "
+            f"top_rated {len(window['top_rated'])}개, "
+            f"trailers {len(window['trailers'])}개를 저장했습니다."
+        ))
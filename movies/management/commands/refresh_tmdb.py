@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from movies.tmdb import refresh
+
+
+class Command(BaseCommand):
+    help = 'TMDB 인기/상영중 영화 목록을 다시 가져와서 바뀐 인기도/평점 등만 갱신합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=100, help='목록별로 가져올 페이지 수')
+        parser.add_argument('--workers', type=int, default=8, help='동시에 보내는 요청 수')
+
+    def handle(self, *args, **options):
+        stats = refresh(pages=options['pages'], workers=options['workers'], stdout=self.stdout)
+        for name, count in sorted(stats['fields'].items()):
+            self.stdout.write(f'{name}: {count}개 변경')
+        self.stdout.write(self.style.SUCCESS(
+            f"새 영화 {stats['movies']}개, 변경 {stats['updated']}개, "
+            f"변경 없음 {stats['unchanged']}개, 장르 변경 {stats['genres_changed']}개"
+        ))
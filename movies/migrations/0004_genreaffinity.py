@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 15:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('movies', '0003_starrating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenreAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movies.genre')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_affinities', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='genreaffinity',
+            constraint=models.UniqueConstraint(fields=('user', 'genre'), name='unique_user_genre_affinity'),
+        ),
+    ]
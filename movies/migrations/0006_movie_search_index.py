@@ -0,0 +1,69 @@
+# Generated by Django 3.2 on 2026-10-18 16:02
+
+import re
+import unicodedata
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+WORD_RE = re.compile(r'\w+')
+
+
+def index_tokens(text):
+    # 이 migration 을 만들 때의 movies/search/tokenizer.py 색인 방식 (단어별 bigram)
+    words = WORD_RE.findall(unicodedata.normalize('NFKC', text or '').lower())
+    return ' '.join(
+        ' '.join([word] if len(word) <= 2 else [word[i:i+2] for i in range(len(word) - 1)])
+        for word in words
+    )
+
+
+def create_search_index(apps, schema_editor):
+    # 검색 색인 생성 (movies/search 참고)
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    'CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts '
+                    'USING fts5(title, overview)'
+                )
+            except OperationalError:
+                # FTS5 를 지원하지 않는 SQLite 는 LIKE 검색을 사용
+                return
+            Movie = apps.get_model('movies', 'Movie')
+            rows = Movie.objects.values_list('pk', 'title', 'overview').iterator()
+            cursor.executemany(
+                'INSERT INTO movies_movie_fts (rowid, title, overview) VALUES (%s, %s, %s)',
+                [(pk, index_tokens(title), index_tokens(overview)) for pk, title, overview in rows],
+            )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS movies_movie_title_trgm '
+            'ON movies_movie USING gin (title gin_trgm_ops)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS movies_movie_overview_trgm '
+            'ON movies_movie USING gin (overview gin_trgm_ops)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS movies_movie_fts')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS movies_movie_title_trgm')
+        schema_editor.execute('DROP INDEX IF EXISTS movies_movie_overview_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_moviewindow'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+def fill_genre_mask(apps, schema_editor):
+    # 기존 장르에 bit 를 할당하고 영화의 genre_mask 계산
+    Genre = apps.get_model('movies', 'Genre')
+    Movie = apps.get_model('movies', 'Movie')
+    bits = {}
+    for bit, genre in enumerate(Genre.objects.order_by('pk')):
+        genre.bit = bit
+        genre.save(update_fields=['bit'])
+        bits[genre.pk] = bit
+
+    masks = {}
+    rows = Movie.genres.through.objects.values_list('movie_id', 'genre_id')
+    for movie_id, genre_id in rows.iterator():
+        masks[movie_id] = masks.get(movie_id, 0) | (1 << bits[genre_id])
+    movie_ids = {}
+    for movie_id, mask in masks.items():
+        movie_ids.setdefault(mask, []).append(movie_id)
+    for mask, ids in movie_ids.items():
+        for i in range(0, len(ids), 500):
+            Movie.objects.filter(pk__in=ids[i:i+500]).update(genre_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genre',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre_mask',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_genre_mask, migrations.RunPython.noop),
+    ]
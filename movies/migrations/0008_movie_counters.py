@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 15:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(cnt=Count('pk')).values('cnt')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    # 좋아요/댓글 수 채우기 (shot_cnt 는 shots 0009_shot_counters 에서 채움)
+    Movie = apps.get_model('movies', 'Movie')
+    MovieComment = apps.get_model('movies', 'MovieComment')
+    Movie.objects.update(
+        like_cnt=count_of(Movie.like_users.through, 'movie'),
+        comments_cnt=count_of(MovieComment, 'movie'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_genre_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='comments_cnt',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='like_cnt',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='shot_cnt',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 15:56
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_stars(apps, schema_editor):
+    # 유저/영화별로 가장 최근 별점만 남긴다.
+    StarRating = apps.get_model('movies', 'StarRating')
+    duplicates = StarRating.objects.values('user', 'movie')\
+        .annotate(cnt=Count('pk'), latest=Max('pk')).filter(cnt__gt=1)
+    for row in duplicates:
+        StarRating.objects.filter(user=row['user'], movie=row['movie'])\
+            .exclude(pk=row['latest']).delete()
+
+
+def fill_star_aggregates(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    StarRating = apps.get_model('movies', 'StarRating')
+    stars = StarRating.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+    Movie.objects.update(
+        star_cnt=Coalesce(Subquery(stars.annotate(value=Count('pk')).values('value')), 0),
+        star_sum=Coalesce(Subquery(stars.annotate(value=Sum('star')).values('value')), 0.0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='star_cnt',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='star_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(remove_duplicate_stars, migrations.RunPython.noop),
+        migrations.RunPython(fill_star_aggregates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='starrating',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_user_movie_star'),
+        ),
+    ]
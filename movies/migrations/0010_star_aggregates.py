@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+def fill_star_aggregates(apps, schema_editor):
+    # 별점이 있는 영화의 평균과 0.5점 단위 분포 계산
+    Movie = apps.get_model('movies', 'Movie')
+    StarRating = apps.get_model('movies', 'StarRating')
+    hists = {}
+    for movie_id, star in StarRating.objects.values_list('movie_id', 'star').iterator():
+        hist = hists.setdefault(movie_id, [0] * 11)
+        hist[min(max(int(round(star * 2)), 0), 10)] += 1
+
+    movies = Movie.objects.filter(pk__in=list(hists)).only('star_cnt', 'star_sum')
+    for movie in movies:
+        movie.star_hist = hists[movie.pk]
+        movie.star_avg = round(movie.star_sum / movie.star_cnt, 4) if movie.star_cnt else None
+    Movie.objects.bulk_update(movies, ['star_hist', 'star_avg'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_star_rating_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='star_avg',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='star_hist',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_star_aggregates, migrations.RunPython.noop),
+    ]
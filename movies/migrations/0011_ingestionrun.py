@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_star_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('full', '전체 수집'), ('refresh', '변경분 갱신')], max_length=10)),
+                ('succeeded', models.BooleanField(default=False)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_ingestionrun'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='genre',
+            constraint=models.CheckConstraint(check=models.Q(bit__lte=62), name='genre_bit_max'),
+        ),
+    ]
@@ -1,8 +1,20 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
 class Genre(models.Model):
+    # BigIntegerField(genre_mask) 에 저장할 수 있는 최대 bit 위치 (부호 bit 제외)
+    MAX_BIT = 62
+
     name = models.CharField(max_length=100)
+    # Movie.genre_mask 에서 이 장르를 나타내는 bit 위치 (생성 시 자동 할당)
+    bit = models.PositiveSmallIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=models.Q(bit__lte=62), name='genre_bit_max'),
+        ]
 
     def __str__(self):
         return self.name
@@ -18,6 +30,40 @@ class Video(models.Model):
         return self.key
     
 
+class MovieQuerySet(models.QuerySet):
+    def for_list(self):
+        '''
+        MovieListSerializer 로 직렬화하기 위한 쿼리셋
+
+        * genres 는 genre_mask 로 직렬화하기 때문에 따로 조회하지 않는다.
+        * shot 개수는 shot_cnt 컬럼을 사용한다.
+        '''
+        return self.all()
+
+    def for_detail(self):
+        '''
+        MovieDetailSerializer 로 직렬화하기 위한 쿼리셋
+
+        댓글/좋아요/별점 목록을 직렬화하지 않고 개수와 평균만 리턴한다.
+        (개수와 별점 합계는 컬럼에 저장되어 있음)
+        '''
+        return self.prefetch_related('genres', 'video')
+
+
+def related_aggregate(model, aggregate, default=None, field='movie'):
+    '''
+    movie(field) 를 FK 로 가지는 model 의 집계값을 구하는 subquery
+    '''
+    subquery = Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(value=aggregate).values('value')
+    )
+    if default is None:
+        return subquery
+    return Coalesce(subquery, default)
+
+
 class Movie(models.Model):
     title = models.CharField(max_length=100)
     release_date = models.DateField()
@@ -28,10 +74,23 @@ class Movie(models.Model):
     poster_path = models.CharField(max_length=100)
     video = models.ManyToManyField(Video, related_name="movie_videos")
     genres = models.ManyToManyField(Genre, related_name="movie_genres")
+    # genres 를 Genre.bit 위치의 bit 로 나타낸 값 (m2m_changed signal 에서 동기화)
+    genre_mask = models.BigIntegerField(default=0)
     # runtime = models.IntegerField()
     vote_average = models.FloatField()
     vote_count = models.IntegerField()
     like_users = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='like_movies')
+    # 좋아요/댓글/shot 수 (생성/삭제 시 F() 로 갱신, reconcile_counters 로 보정)
+    like_cnt = models.PositiveIntegerField(default=0, db_index=True)
+    comments_cnt = models.PositiveIntegerField(default=0)
+    shot_cnt = models.PositiveIntegerField(default=0, db_index=True)
+    # 별점 개수/합계/평균/0.5점 단위 분포 (별점 생성/수정/삭제 시 함께 갱신, movies/ratings.py)
+    star_cnt = models.PositiveIntegerField(default=0)
+    star_sum = models.FloatField(default=0)
+    star_avg = models.FloatField(null=True, blank=True, db_index=True)
+    star_hist = models.JSONField(default=list, blank=True)
+
+    objects = MovieQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -44,10 +103,68 @@ class StarRating(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # 유저는 영화마다 별점 하나 (movies/ratings.py 에서 upsert)
+            models.UniqueConstraint(fields=['user', 'movie'], name='unique_user_movie_star'),
+        ]
+
     def __str__(self):
         return f'{self.star}'
 
 
+class GenreAffinity(models.Model):
+    '''
+    유저의 장르 선호도
+
+    유저가 준 별점(정수 부분)을 영화의 장르별로 누적한 값
+    movie_star_rating 에서 별점이 생성/수정/삭제될 때마다 갱신된다.
+    '''
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='genre_affinities')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'genre'], name='unique_user_genre_affinity'),
+        ]
+
+    def __str__(self):
+        return f'{self.genre} {self.score}'
+
+
+class MovieWindow(models.Model):
+    '''
+    미리 계산한 영화 목록 스냅샷 (movies/windows.py 참고)
+    '''
+    name = models.CharField(max_length=50, unique=True)
+    data = models.JSONField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class IngestionRun(models.Model):
+    '''
+    TMDB 수집 실행 기록 (movies/tmdb/pipeline.py)
+
+    stats : 가져온/추가된/변경된 영화 수와 필드별 변경 수 등
+    '''
+    FULL = 'full'
+    REFRESH = 'refresh'
+    MODE_CHOICES = [(FULL, '전체 수집'), (REFRESH, '변경분 갱신')]
+
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    succeeded = models.BooleanField(default=False)
+    stats = models.JSONField(default=dict, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.mode} {self.started_at}'
+
+
 class MovieComment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='comments')
@@ -0,0 +1,145 @@
+'''
+영화 별점 생성/수정/삭제
+
+* StarRating 은 (user, movie) unique 제약 조건이 있고 한 번의 upsert 로 저장한다.
+* 영화별 별점 집계(star_cnt, star_sum, star_avg, star_hist)를 같은 트랜잭션에서 변화량만큼 갱신한다.
+* 같은 영화에 대한 별점 변경은 영화 row 를 잠그고(select_for_update) 순서대로 처리해서
+  동시에 요청이 와도 집계와 장르 선호도가 어긋나지 않는다.
+'''
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.http import Http404
+
+from config import cache
+from config.db import upsert
+from .models import Movie, StarRating
+from .recommendations import star_score, update_affinity
+
+# 0.5 점 단위 별점 분포 (0, 0.5, ..., 5.0)
+HIST_SIZE = 11
+
+
+def hist_index(star):
+    return min(max(int(round(star * 2)), 0), HIST_SIZE - 1)
+
+
+def empty_hist():
+    return [0] * HIST_SIZE
+
+
+def build_aggregates(stars):
+    '''
+    별점 목록으로부터 {star_cnt, star_sum, star_avg, star_hist} 계산 (데이터 복구용)
+    '''
+    aggregates = {'star_cnt': 0, 'star_sum': 0.0, 'star_avg': None, 'star_hist': empty_hist()}
+    for star in stars:
+        apply_star(aggregates, None, star)
+    return aggregates
+
+
+def apply_star(aggregates, old_star, new_star):
+    '''
+    별점이 old_star → new_star 로 바뀐 만큼 집계를 변경 (None 이면 별점 없음)
+    '''
+    hist = list(aggregates['star_hist'] or empty_hist())
+    if old_star is not None:
+        aggregates['star_cnt'] -= 1
+        aggregates['star_sum'] -= old_star
+        hist[hist_index(old_star)] -= 1
+    if new_star is not None:
+        aggregates['star_cnt'] += 1
+        aggregates['star_sum'] += new_star
+        hist[hist_index(new_star)] += 1
+    aggregates['star_hist'] = hist
+    if aggregates['star_cnt'] > 0:
+        aggregates['star_avg'] = round(aggregates['star_sum'] / aggregates['star_cnt'], 4)
+    else:
+        aggregates['star_cnt'], aggregates['star_sum'], aggregates['star_avg'] = 0, 0.0, None
+    return aggregates
+
+
+def lock_movie(user, movie_id):
+    '''
+    영화 row 를 잠그고 (genre_mask, 별점 집계, 기존 별점) 과 함께 가져온다.
+
+    기존 별점이 없으면 movie.old_star 는 None
+    '''
+    old_star = StarRating.objects.filter(user=user, movie=OuterRef('pk')).values('star')[:1]
+    movie = Movie.objects.select_for_update().filter(pk=movie_id)\
+        .only('pk', 'genre_mask', 'star_cnt', 'star_sum', 'star_hist')\
+        .annotate(old_star=Subquery(old_star)).first()
+    if movie is None:
+        raise Http404
+    return movie
+
+
+def save_aggregates(movie, old_star, new_star):
+    aggregates = apply_star({
+        'star_cnt': movie.star_cnt,
+        'star_sum': movie.star_sum,
+        'star_hist': movie.star_hist,
+    }, old_star, new_star)
+    Movie.objects.filter(pk=movie.pk).update(**aggregates)
+    # star_avg 로 정렬하는 목록 API 의 응답 캐시만 무효화 (upsert 는 signal 이 없음)
+    transaction.on_commit(lambda: cache.invalidate(cache.RATINGS))
+
+
+def rate_movie(user, movie_id, star):
+    '''
+    별점 생성 또는 수정
+
+    return 저장된 StarRating
+    '''
+    with transaction.atomic():
+        movie = lock_movie(user, movie_id)
+        upsert(
+            StarRating,
+            {'user': user.pk, 'movie': movie.pk, 'star': star},
+            conflict_fields=('user', 'movie'),
+            update_fields=('star', 'updated_at'),
+        )
+        save_aggregates(movie, movie.old_star, star)
+        # 장르 선호도에 별점 변화량 반영
+        update_affinity(user, movie, star_score(star) - star_score(movie.old_star))
+    return StarRating.objects.select_related('user').get(user=user, movie_id=movie.pk)
+
+
+def unrate_movie(user, movie_id):
+    '''
+    별점 삭제
+
+    return 삭제 여부
+    '''
+    with transaction.atomic():
+        movie = lock_movie(user, movie_id)
+        if movie.old_star is None:
+            return False
+        StarRating.objects.filter(user=user, movie_id=movie.pk).delete()
+        save_aggregates(movie, movie.old_star, None)
+        update_affinity(user, movie, -star_score(movie.old_star))
+    return True
+
+
+def rebuild_aggregates():
+    '''
+    별점 기록으로부터 영화별 별점 집계를 다시 계산 (데이터 복구용)
+
+    return 집계가 바뀐 영화 수
+    '''
+    stars = {}
+    for movie_id, star in StarRating.objects.values_list('movie_id', 'star').iterator():
+        stars.setdefault(movie_id, []).append(star)
+
+    fields = ['star_cnt', 'star_sum', 'star_avg', 'star_hist']
+    changed = []
+    movies = Movie.objects.filter(pk__in=list(stars)) | Movie.objects.exclude(star_cnt=0)
+    for movie in movies.only(*fields):
+        aggregates = build_aggregates(stars.get(movie.pk, []))
+        # 별점이 한 번도 없던 영화의 star_hist 는 [] (기본값), apply_star 로 모두 지운 영화는 empty_hist()
+        movie.star_hist = movie.star_hist or empty_hist()
+        if any(getattr(movie, field) != aggregates[field] for field in fields):
+            for field in fields:
+                setattr(movie, field, aggregates[field])
+            changed.append(movie)
+    Movie.objects.bulk_update(changed, fields, batch_size=500)
+    return len(changed)
@@ -0,0 +1,91 @@
+'''
+장르 선호도 기반 영화 추천
+
+* 장르 선호도(GenreAffinity)는 별점이 바뀔 때마다 변화량만큼 갱신한다.
+* 추천할 때는 선호도 상위 장르를 읽고 후보 영화를 한 번의 쿼리로 가져온다.
+'''
+from collections import defaultdict
+
+from django.db.models import F
+
+from .genres import decode_mask, has_any, mask_of, score_expression
+from .models import GenreAffinity, StarRating
+
+TOP_GENRE_NUM = 3
+
+
+def star_score(star):
+    # 선호도에는 별점의 정수 부분만 반영
+    return int(star) if star else 0
+
+
+def update_affinity(user, movie, delta):
+    '''
+    movie 의 장르들에 대한 user 의 선호도를 delta 만큼 변경
+
+    movie 의 장르는 genre_mask 에서 가져오기 때문에 장르 조회 쿼리가 없다.
+    '''
+    if not delta:
+        return
+    genre_ids = [genre['id'] for genre in decode_mask(movie.genre_mask)]
+    if not genre_ids:
+        return
+    GenreAffinity.objects.bulk_create(
+        [GenreAffinity(user=user, genre_id=genre_id) for genre_id in genre_ids],
+        ignore_conflicts=True,
+    )
+    GenreAffinity.objects.filter(user=user, genre_id__in=genre_ids)\
+        .update(score=F('score') + delta)
+
+
+def rebuild_affinity(users=None):
+    '''
+    별점 기록으로부터 장르 선호도를 다시 계산 (데이터 복구용)
+    '''
+    stars = StarRating.objects.exclude(movie__genres=None)
+    affinities = GenreAffinity.objects.all()
+    if users is not None:
+        stars = stars.filter(user__in=users)
+        affinities = affinities.filter(user__in=users)
+
+    scores = defaultdict(int)
+    rows = stars.values_list('user_id', 'movie__genres', 'star')
+    for user_id, genre_id, star in rows.iterator():
+        scores[(user_id, genre_id)] += star_score(star)
+
+    affinities.delete()
+    GenreAffinity.objects.bulk_create(
+        [
+            GenreAffinity(user_id=user_id, genre_id=genre_id, score=score)
+            for (user_id, genre_id), score in scores.items()
+        ],
+        batch_size=1000,
+    )
+    return len(scores)
+
+
+def top_genres(user, num=TOP_GENRE_NUM):
+    '''
+    선호도가 높은 장르 num 개 [(genre, score), ...]
+    '''
+    affinities = GenreAffinity.objects.filter(user=user, score__gt=0)\
+        .select_related('genre').order_by('-score', 'genre_id')[:num]
+    return [(affinity.genre, affinity.score) for affinity in affinities]
+
+
+def recommend(movies, genres, num):
+    '''
+    선호 장르 점수가 높은 영화 순으로 num 개를 추천
+
+    * movies : 추천 후보 쿼리셋 (정렬 기준이 동점일 때의 순서로 사용)
+    * genres : top_genres() 의 결과
+
+    선호 장르 점수는 genre_mask 로 계산하기 때문에 장르 테이블을 JOIN 하지 않는다.
+    '''
+    if not genres:
+        return movies[:num]
+
+    weights = {genre.pk: score for genre, score in genres}
+    ordering = ['-affinity', *movies.query.order_by]
+    return has_any(movies, mask_of(weights))\
+        .alias(affinity=score_expression(weights)).order_by(*ordering)[:num]
@@ -0,0 +1,40 @@
+'''
+영화 검색 backend
+
+settings.MOVIE_SEARCH_BACKEND 에 backend 클래스 경로를 지정할 수 있다.
+지정하지 않으면 DB 종류에 따라 선택한다.
+
+* sqlite : movies.search.sqlite.SqliteSearchBackend (FTS5)
+* postgresql : movies.search.postgres.PostgresSearchBackend (pg_trgm)
+* 그 외 : movies.search.simple.SimpleSearchBackend (LIKE)
+'''
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'sqlite': 'movies.search.sqlite.SqliteSearchBackend',
+    'postgresql': 'movies.search.postgres.PostgresSearchBackend',
+}
+DEFAULT_BACKEND = 'movies.search.simple.SimpleSearchBackend'
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = getattr(settings, 'MOVIE_SEARCH_BACKEND', None)\
+        or BACKENDS.get(connection.vendor, DEFAULT_BACKEND)
+    return import_string(path)()
+
+
+def rank_expression(movie_ids):
+    '''
+    검색 결과 순서(관련도 순위)를 값으로 가지는 expression
+    '''
+    return Case(
+        *[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(movie_ids)],
+        default=Value(len(movie_ids)),
+        output_field=IntegerField(),
+    )
@@ -0,0 +1,29 @@
+from django.conf import settings
+
+
+class SearchBackend:
+    '''
+    영화 검색 backend 의 기본 클래스
+
+    * search : 검색어와 일치하는 영화 id 를 관련도 순으로 반환
+    * search_all : 여러 (검색어, 필드) 조건을 모두 만족하는 영화 id 를 관련도 순으로 반환
+    * index / remove : 영화가 생성/수정/삭제될 때 색인 갱신
+    * rebuild : 전체 색인을 다시 생성
+    '''
+    # 검색 결과로 반환할 최대 영화 수 (결과가 이만큼이면 잘린 것일 수 있음)
+    limit = getattr(settings, 'MOVIE_SEARCH_LIMIT', 500)
+
+    def search(self, query, fields=('title', 'overview'), limit=None):
+        return self.search_all([(query, fields)], limit)
+
+    def search_all(self, terms, limit=None):
+        raise NotImplementedError
+
+    def index(self, movies):
+        pass
+
+    def remove(self, movie_ids):
+        pass
+
+    def rebuild(self):
+        return 0
@@ -0,0 +1,29 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q, Value
+
+from ..models import Movie
+from .base import SearchBackend
+
+
+class PostgresSearchBackend(SearchBackend):
+    '''
+    PostgreSQL pg_trgm 으로 검색
+
+    * 제목/줄거리의 gin_trgm_ops 인덱스로 ILIKE '%검색어%' 를 처리
+      (글자 단위 trigram 이라 한국어도 부분 검색 가능)
+    * 제목 유사도에 가중치를 두어 정렬
+    '''
+    weights = {'title': 1.0, 'overview': 0.1}
+
+    def search_all(self, terms, limit=None):
+        condition = Q()
+        rank = Value(0.0)
+        for query, fields in terms:
+            matched = Q()
+            for field in fields:
+                matched |= Q(**{f'{field}__icontains': query})
+                rank = rank + TrigramSimilarity(field, query) * self.weights[field]
+            condition &= matched
+        movies = Movie.objects.filter(condition)\
+            .annotate(search_rank=rank).order_by('-search_rank', '-popularity', 'pk')
+        return list(movies.values_list('pk', flat=True)[:limit or self.limit])
@@ -0,0 +1,21 @@
+from django.db.models import Q
+
+from ..models import Movie
+from .base import SearchBackend
+
+
+class SimpleSearchBackend(SearchBackend):
+    '''
+    색인 없이 LIKE '%검색어%' 로 검색 (인기순)
+
+    색인을 사용할 수 없는 DB 이거나 한 글자 검색어인 경우에 사용
+    '''
+    def search_all(self, terms, limit=None):
+        condition = Q()
+        for query, fields in terms:
+            matched = Q()
+            for field in fields:
+                matched |= Q(**{f'{field}__icontains': query})
+            condition &= matched
+        movies = Movie.objects.filter(condition).order_by('-popularity', 'pk')
+        return list(movies.values_list('pk', flat=True)[:limit or self.limit])
@@ -0,0 +1,95 @@
+from django.db import connection
+
+from ..models import Movie
+from .base import SearchBackend
+from .simple import SimpleSearchBackend
+from .tokenizer import index_tokens, query_phrases
+
+
+class SqliteSearchBackend(SearchBackend):
+    '''
+    SQLite FTS5 색인으로 검색
+
+    * 제목/줄거리를 bigram 으로 잘라서 movies_movie_fts 테이블에 색인 (rowid = movie id)
+    * 검색어도 bigram 으로 잘라서 단어별 phrase 를 AND 로 검색
+    * bm25 점수로 정렬 (제목 일치에 가중치)
+    '''
+    table = 'movies_movie_fts'
+    weights = {'title': 10.0, 'overview': 1.0}
+    batch_size = 500
+
+    def __init__(self):
+        self.fallback = SimpleSearchBackend()
+        self.table_exists = False
+
+    def available(self):
+        # 색인 테이블은 migration 에서 생성 (FTS5 를 지원하지 않는 SQLite 면 없음)
+        if not self.table_exists:
+            self.table_exists = self.table in connection.introspection.table_names()
+        return self.table_exists
+
+    def match_expression(self, query, fields):
+        phrases = query_phrases(query)
+        # 한 글자 단어는 bigram 색인으로 찾을 수 없음
+        if not phrases or any(len(phrase[0]) < 2 for phrase in phrases):
+            return None
+        terms = ' AND '.join('"%s"' % ' '.join(phrase) for phrase in phrases)
+        return '{%s} : (%s)' % (' '.join(fields), terms)
+
+    def search_all(self, terms, limit=None):
+        expressions = [self.match_expression(query, fields) for query, fields in terms]
+        if not expressions or None in expressions or not self.available():
+            return self.fallback.search_all(terms, limit)
+        expression = ' AND '.join(f'({expression})' for expression in expressions)
+
+        weights = ', '.join(str(self.weights[field]) for field in ('title', 'overview'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                [expression, limit or self.limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def remove(self, movie_ids):
+        movie_ids = list(movie_ids)
+        if not movie_ids or not self.available():
+            return
+        with connection.cursor() as cursor:
+            for i in range(0, len(movie_ids), self.batch_size):
+                batch = movie_ids[i:i+self.batch_size]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(
+                    f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', batch
+                )
+
+    def index(self, movies):
+        movies = list(movies)
+        if not movies or not self.available():
+            return
+        self.remove([movie.pk for movie in movies])
+        self.insert((movie.pk, movie.title, movie.overview) for movie in movies)
+
+    def insert(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, overview) VALUES (%s, %s, %s)',
+                [(pk, index_tokens(title), index_tokens(overview)) for pk, title, overview in rows],
+            )
+
+    def rebuild(self):
+        if not self.available():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        rows = Movie.objects.values_list('pk', 'title', 'overview').iterator()
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                self.insert(batch)
+                count += len(batch)
+                batch = []
+        self.insert(batch)
+        return count + len(batch)
@@ -0,0 +1,41 @@
+'''
+검색용 n-gram 토크나이저
+
+한국어는 조사/어미가 붙어서 공백 단위로 자르면 부분 검색이 되지 않는다.
+그래서 단어를 글자 2개씩 자른 bigram 으로 색인하고, 검색어도 같은 방식으로 잘라서
+연속된 bigram(phrase)으로 검색한다.
+
+ex) '스타워즈 에피소드' → [['스타', '타워', '워즈'], ['에피', '피소', '소드']]
+'''
+import re
+import unicodedata
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def words(text):
+    return WORD_RE.findall(normalize(text))
+
+
+def ngrams(word, n=2):
+    if len(word) <= n:
+        return [word]
+    return [word[i:i+n] for i in range(len(word) - n + 1)]
+
+
+def index_tokens(text):
+    '''
+    색인할 문자열 (bigram 을 공백으로 이어붙인 문자열)
+    '''
+    return ' '.join(' '.join(ngrams(word)) for word in words(text))
+
+
+def query_phrases(text):
+    '''
+    검색어의 단어별 bigram 리스트
+    '''
+    return [ngrams(word) for word in words(text)]
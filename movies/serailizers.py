@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Movie, Genre, MovieComment, StarRating, Video
+from .genres import decode_mask
 from django.contrib.auth import get_user_model
 from shots.serializers.shot import ShotListSerializer
 User = get_user_model()
@@ -8,7 +9,7 @@ User = get_user_model()
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
-        fields = '__all__'
+        fields = ('id', 'name')
 
 
 class VideoSerializer(serializers.ModelSerializer):
@@ -18,13 +19,17 @@ class VideoSerializer(serializers.ModelSerializer):
 
 
 class MovieListSerializer(serializers.ModelSerializer):
-    genres = GenreSerializer(read_only=True, many=True)
-    shot_cnt = serializers.IntegerField(source='shot_set.count', read_only=True)
+    # Movie.objects.for_list() 로 가져온 쿼리셋을 직렬화
+    # (genres 는 genre_mask 에서 변환)
+    genres = serializers.SerializerMethodField()
     class Meta:
         model = Movie
         fields = ('pk','title','release_date','adult','popularity',
                 'poster_path','genres','vote_average','vote_count',
-                'shot_cnt')
+                'shot_cnt','star_cnt','star_avg')
+
+    def get_genres(self, movie):
+        return decode_mask(movie.genre_mask)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -60,14 +65,33 @@ class StarSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class MovieStarSerializer(serializers.ModelSerializer):
+    # 영화 상세 페이지의 별점 목록 (영화 정보 제외)
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = StarRating
+        fields = ('id', 'user', 'star', 'created_at', 'updated_at')
+        extra_kwargs = {'star': {'required': True}}
+
+
+class MovieDetailSerializer(serializers.ModelSerializer):
+    # Movie.objects.for_detail() 로 가져온 객체를 직렬화
+    # 댓글/별점/좋아요 유저 목록은 페이지 API 로 따로 조회
+    genres = GenreSerializer(read_only=True, many=True)
+    video = VideoSerializer(read_only=True, many=True)
+
+    class Meta:
+        model = Movie
+        exclude = ('like_users', 'genre_mask', 'star_sum')
+
+
 class MovieSerializer(serializers.ModelSerializer):    
     genres = GenreSerializer(read_only=True, many=True)
     video = VideoSerializer(read_only=True, many=True)
     stars = StarSerializer(read_only=True, many=True)
     comments = MovieCommentSerializer(read_only=True, many=True)
-    comments_cnt = serializers.IntegerField(source='comments.count', read_only=True)
     like_users = UserSerializer(read_only=True, many=True)
-    like_cnt = serializers.IntegerField(source='like_users.count', read_only=True)
 
     class Meta:
         model = Movie
@@ -0,0 +1,78 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from config import cache
+from . import autocomplete, genres
+from .models import Genre, Movie, StarRating
+from .search import get_backend
+
+
+@receiver(post_save, sender=Movie)
+def index_movie(sender, instance, **kwargs):
+    # 영화 제목/줄거리 검색 색인 갱신
+    get_backend().index([instance])
+    autocomplete.invalidate()
+
+
+@receiver(post_delete, sender=Movie)
+def remove_movie_index(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+    autocomplete.invalidate()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_map(sender, **kwargs):
+    genres.invalidate()
+
+
+@receiver(pre_save, sender=Genre)
+def assign_genre_bit(sender, instance, **kwargs):
+    # 새 장르에 genre_mask 의 bit 위치 할당
+    if instance.bit is None:
+        instance.bit = genres.next_bit()
+
+
+@receiver(post_delete, sender=Genre)
+def clear_genre_bit(sender, instance, **kwargs):
+    if instance.bit is not None:
+        mask = 1 << instance.bit
+        genres.has_any(Movie.objects.all(), mask)\
+            .update(genre_mask=F('genre_mask').bitand(~mask))
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def sync_genre_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    # Movie.genres 가 바뀌면 genre_mask 다시 계산
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            genres.update_genre_masks([instance.pk])
+    elif action == 'pre_clear':
+        # genre.movie_genres.clear() 는 post_clear 에서 영화 id 를 알 수 없음
+        instance._cleared_movie_ids = list(instance.movie_genres.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        genres.update_genre_masks(instance._cleared_movie_ids)
+    elif action in ('post_add', 'post_remove'):
+        genres.update_genre_masks(pk_set)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(m2m_changed, sender=Movie.genres.through)
+def invalidate_movie_cache(sender, **kwargs):
+    # 영화에 의존하는 카탈로그 API 응답 캐시 무효화 (config/cache.py)
+    if kwargs.get('action', 'post_').startswith('post_'):
+        cache.invalidate(cache.MOVIES)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_cache(sender, **kwargs):
+    cache.invalidate(cache.GENRES)
+
+
+@receiver(post_save, sender=StarRating)
+@receiver(post_delete, sender=StarRating)
+def invalidate_rating_cache(sender, **kwargs):
+    cache.invalidate(cache.RATINGS)
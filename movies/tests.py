@@ -1,3 +1,770 @@
+import base64
+import datetime
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from shots.models import Shot
+from . import genres
+from .bulk_load import iter_objects, load_fixture
+from .management.commands.ingest_tmdb import DEFAULT_CHECKPOINT
+from .models import Genre, GenreAffinity, IngestionRun, Movie, MovieComment, MovieWindow, StarRating
+from .ratings import empty_hist, rebuild_aggregates
+from .recommendations import recommend, top_genres
+from .search import get_backend
+from .search.simple import SimpleSearchBackend
+from .search.sqlite import SqliteSearchBackend
+from .search.tokenizer import index_tokens, query_phrases
+from .tmdb import TMDBClient, TMDBError
+from .tmdb.pipeline import DeltaRefresh, Ingestion
+from .windows import CACHE_KEY, LOCK_KEY, get_window, refresh_window
+
+
+class MovieListQueryTest(TestCase):
+    '''
+    목록 API 의 쿼리 수가 페이지에 담긴 영화 수와 무관한지 확인
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.genres = [Genre.objects.create(name=f'genre{i}') for i in range(3)]
+
+    def create_movies(self, n):
+        for i in range(n):
+            movie = Movie.objects.create(
+                title=f'movie{i}', release_date='2022-05-20', overview='overview',
+                adult=False, popularity=n - i, backdrop_path='/b.jpg',
+                poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+            )
+            movie.genres.set(self.genres)
+            Shot.objects.create(user=self.user, movie=movie, title='shot', content='content')
+        # ORM 으로 직접 만든 데이터의 개수 컬럼 맞추기
+        call_command('reconcile_counters', stdout=StringIO())
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_popular_query_count_is_constant(self):
+        self.create_movies(2)
+        small, _ = self.count_queries('/api/v1/movies/popular/0/')
+        self.create_movies(10)
+        large, response = self.count_queries('/api/v1/movies/popular/0/')
+
+        self.assertEqual(small, large)
+        movie = response.data['movies'][0]
+        self.assertEqual(movie['shot_cnt'], 1)
+        self.assertEqual(len(movie['genres']), 3)
+
+    def test_cursor_pages_and_tampered_cursor(self):
+        self.create_movies(25)
+        pks, cursor = [], ''
+        while cursor is not None:
+            response = self.client.get(f'/api/v1/movies/popular/0/?cursor={cursor}')
+            pks += [movie['pk'] for movie in response.data['movies']]
+            cursor = response.data['next_cursor']
+        self.assertEqual(len(pks), 25)
+        self.assertEqual(len(set(pks)), 25)
+
+        # 값 타입이 다른 cursor 는 500 이 아니라 400
+        for values in (['abc', 1], [1.5, {'a': 1}], [None, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(f'/api/v1/movies/popular/0/?cursor={cursor}')
+            self.assertEqual(response.status_code, 400)
+
+
+class MovieDetailQueryTest(TestCase):
+    '''
+    영화 상세와 댓글/별점/좋아요 목록 API 의 쿼리 수가 데이터 양과 무관한지 확인
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.movie = Movie.objects.create(
+            title='movie', release_date='2022-05-20', overview='overview',
+            adult=False, popularity=1, backdrop_path='/b.jpg',
+            poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+        )
+        self.urls = [
+            f'/api/v1/movies/{self.movie.pk}/',
+            f'/api/v1/movies/{self.movie.pk}/like_users/page/0/',
+            f'/api/v1/movies/{self.movie.pk}/comments/page/0/',
+            f'/api/v1/movies/{self.movie.pk}/stars/page/0/',
+        ]
+
+    def create_data(self, n):
+        start = User.objects.count()
+        for i in range(start, start + n):
+            user = User.objects.create_user(username=f'user{i}', password='pw')
+            self.movie.like_users.add(user)
+            MovieComment.objects.create(user=user, movie=self.movie, content='comment')
+            StarRating.objects.create(user=user, movie=self.movie, star=4)
+        call_command('reconcile_counters', stdout=StringIO())
+
+    def count_queries(self):
+        counts = []
+        for url in self.urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        return counts
+
+    def test_query_count_is_constant(self):
+        self.create_data(2)
+        small = self.count_queries()
+        self.create_data(8)
+        self.assertEqual(small, self.count_queries())
+
+        response = self.client.get(self.urls[0])
+        self.assertEqual(response.data['movie']['comments_cnt'], 10)
+        self.assertEqual(response.data['movie']['like_cnt'], 10)
+        response = self.client.get(self.urls[2])
+        self.assertEqual(len(response.data['comments']), 10)
+
+    def test_missing_movie(self):
+        for url in self.urls:
+            response = self.client.get(url.replace(f'/{self.movie.pk}/', '/0/'))
+            self.assertEqual(response.status_code, 404)
+
+
+class MovieWindowTest(TestCase):
+    '''
+    최신 상영작 window 는 영화 id 만 저장하고 페이지마다 최신 값으로 직렬화
+    '''
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        today = timezone.localdate()
+        self.movies = [
+            Movie.objects.create(
+                title=f'movie{i}', release_date=today - datetime.timedelta(i), overview='overview',
+                adult=False, popularity=i, backdrop_path='/b.jpg',
+                poster_path='/p.jpg', vote_average=7.0 - i, vote_count=200,
+            )
+            for i in range(3)
+        ]
+        self.movies[1].video.create(key='abc', name='trailer', size=1080, type='Trailer', official=True)
+
+    def test_ids_are_hydrated(self):
+        window = refresh_window()
+        self.assertEqual(window['now_playing'], [movie.pk for movie in self.movies])
+        self.assertEqual(window['trailers'], [{'movie_id': self.movies[1].pk, 'key': 'abc'}])
+
+        # window 를 다시 만들지 않아도 shot 수는 최신 값
+        Shot.objects.create(user=self.user, movie=self.movies[0], title='shot', content='content')
+        call_command('reconcile_counters', stdout=StringIO())
+        cache.clear()
+        cache.set(CACHE_KEY, window)
+        response = self.client.get('/api/v1/movies/now_playing/0/')
+        self.assertEqual(response.data['movies'][0]['shot_cnt'], 1)
+        response = self.client.get('/api/v1/movies/movie_trailer/')
+        self.assertEqual(response.data['trailer'], 'https://www.youtube.com/embed/abc')
+        self.assertEqual(response.data['movie']['id'], self.movies[1].pk)
+
+    def test_single_rebuild_when_expired(self):
+        refresh_window()
+        MovieWindow.objects.update(refreshed_at=timezone.now() - datetime.timedelta(days=2))
+        cache.delete(CACHE_KEY)
+        # 다른 요청이 다시 계산하는 중이면 이전 스냅샷 사용
+        cache.add(LOCK_KEY, 1)
+        Movie.objects.filter(pk=self.movies[0].pk).delete()
+        self.assertEqual(len(get_window()['now_playing']), 3)
+
+        cache.delete(CACHE_KEY)
+        cache.delete(LOCK_KEY)
+        self.assertEqual(len(get_window()['now_playing']), 2)
+        self.assertIsNone(cache.get(LOCK_KEY))
+
+
+class MovieSearchTest(TestCase):
+    '''
+    bigram 토크나이저와 검색 backend (SQLite FTS5, LIKE)
+    '''
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.movies = [
+            Movie.objects.create(
+                title=title, release_date='2022-05-20', overview=overview,
+                adult=False, popularity=popularity, backdrop_path='/b.jpg',
+                poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+            )
+            for title, overview, popularity in [
+                ('스타워즈 에피소드', '우주 전쟁', 1),
+                ('우주 전쟁', '스타워즈 에피소드를 닮은 영화', 2),
+                ('스타워즈 외전', '전쟁 영화', 3),
+            ]
+        ]
+        self.pks = [movie.pk for movie in self.movies]
+
+    def test_tokenizer(self):
+        self.assertEqual(index_tokens('스타워즈 에피소드'), '스타 타워 워즈 에피 피소 소드')
+        self.assertEqual(index_tokens('ＡＢ, c'), 'ab c')
+        self.assertEqual(query_phrases('스타워즈 외'), [['스타', '타워', '워즈'], ['외']])
+
+    def assert_backend(self, backend):
+        ids = backend.search('스타워즈')
+        self.assertEqual(set(ids), set(self.pks))
+        self.assertEqual(backend.search('에피소드', fields=('title',)), [self.pks[0]])
+        # 제목과 검색어를 모두 만족하는 영화
+        ids = backend.search_all([('스타워즈', ('title',)), ('전쟁', ('title', 'overview'))])
+        self.assertEqual(set(ids), {self.pks[0], self.pks[2]})
+        self.assertEqual(len(backend.search('스타워즈', limit=1)), 1)
+
+    def test_sqlite_backend(self):
+        backend = SqliteSearchBackend()
+        self.assertTrue(backend.available())
+        self.assert_backend(backend)
+        # 제목 일치가 줄거리 일치보다 앞
+        self.assertEqual(backend.search('스타워즈 에피소드')[0], self.pks[0])
+        # 한 글자 검색어는 LIKE 검색
+        self.assertEqual(set(backend.search('외')), {self.pks[2]})
+
+        Movie.objects.filter(pk=self.pks[2]).delete()
+        self.assertEqual(set(backend.search('스타워즈')), set(self.pks[:2]))
+        self.assertEqual(backend.rebuild(), 2)
+
+    def test_simple_backend(self):
+        backend = SimpleSearchBackend()
+        self.assert_backend(backend)
+        # LIKE 검색은 인기순
+        self.assertEqual(backend.search('스타워즈'), self.pks[::-1])
+
+    def test_title_and_query(self):
+        response = self.client.get('/api/v1/movies/search/0/?title=스타워즈&query=전쟁')
+        self.assertEqual({movie['pk'] for movie in response.data['movies']}, {self.pks[0], self.pks[2]})
+        self.assertFalse(response.data['truncated'])
+
+
+class AutocompleteTest(TestCase):
+    '''
+    제목 자동완성 limit 범위
+    '''
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(60):
+            Movie.objects.create(
+                title=f'movie{i}', release_date='2022-05-20', overview='overview',
+                adult=False, popularity=i, backdrop_path='/b.jpg',
+                poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+            )
+
+    def test_limit_is_clamped(self):
+        for limit, expected in [('', 10), ('3', 3), ('0', 1), ('-5', 1), ('100', 50), ('abc', 10)]:
+            response = self.client.get(f'/api/v1/movies/autocomplete/?q=movie&limit={limit}')
+            self.assertEqual(len(response.data['movies']), expected, limit)
+        response = self.client.get('/api/v1/movies/autocomplete/?q=movie&limit=1')
+        self.assertEqual(response.data['movies'][0]['title'], 'movie59')
+
+
+class GenreMaskTest(TestCase):
+    '''
+    Movie.genre_mask 동기화와 장르 필터
+    '''
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.action = Genre.objects.create(name='액션')
+        self.drama = Genre.objects.create(name='드라마')
+        self.movies = [
+            Movie.objects.create(
+                title=f'movie{i}', release_date='2022-05-20', overview='overview',
+                adult=False, popularity=i, backdrop_path='/b.jpg',
+                poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+            )
+            for i in range(3)
+        ]
+
+    def mask(self, movie):
+        return Movie.objects.get(pk=movie.pk).genre_mask
+
+    def test_m2m_changes_sync_mask(self):
+        movie = self.movies[0]
+        movie.genres.add(self.action, self.drama)
+        self.assertEqual(self.mask(movie), genres.mask_of([self.action.pk, self.drama.pk]))
+        movie.genres.remove(self.drama)
+        self.assertEqual(self.mask(movie), genres.mask_of([self.action.pk]))
+        movie.genres.clear()
+        self.assertEqual(self.mask(movie), 0)
+
+        # 장르 쪽에서 바꾸기
+        self.action.movie_genres.add(*self.movies)
+        self.assertEqual([self.mask(movie) for movie in self.movies], [1 << self.action.bit] * 3)
+        self.action.movie_genres.clear()
+        self.assertEqual([self.mask(movie) for movie in self.movies], [0] * 3)
+
+        self.drama.movie_genres.add(movie)
+        self.drama.delete()
+        self.assertEqual(self.mask(movie), 0)
+
+    def test_has_all_and_has_any(self):
+        self.movies[0].genres.add(self.action, self.drama)
+        self.movies[1].genres.add(self.action)
+        mask = genres.mask_of([self.action.pk, self.drama.pk])
+        movies = Movie.objects.order_by('pk')
+        self.assertEqual(list(genres.has_all(movies, mask)), self.movies[:1])
+        self.assertEqual(list(genres.has_any(movies, mask)), self.movies[:2])
+        self.assertEqual(
+            list(genres.filter_all_genres(movies, ['액션'])), self.movies[:2]
+        )
+        self.assertEqual(list(genres.filter_all_genres(movies, ['액션', '없는 장르'])), [])
+
+    def test_search_by_genre(self):
+        self.movies[0].genres.add(self.action, self.drama)
+        self.movies[1].genres.add(self.action)
+        response = self.client.get("/api/v1/movies/search/0/?genre=['액션', '드라마']")
+        self.assertEqual([movie['title'] for movie in response.data['movies']], ['movie0'])
+
+    def test_bench_genre_search(self):
+        names = ['코미디', '공포', 'SF']
+        extra = [Genre.objects.create(name=name) for name in names]
+        for i, movie in enumerate(self.movies):
+            movie.genres.add(self.action, self.drama, *extra[:i + 1])
+        out, err = StringIO(), StringIO()
+        call_command('bench_genre_search', '--repeat=1', stdout=out, stderr=err)
+        self.assertIn('bitmask ms', out.getvalue())
+        # 이전 방식과 결과가 같다.
+        self.assertEqual(err.getvalue(), '')
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+    def test_bulk_created_genre_gets_bit(self):
+        Genre.objects.bulk_create([Genre(name='코미디')])
+        comedy = Genre.objects.get(name='코미디')
+        self.assertIsNone(comedy.bit)
+        self.movies[2].genres.add(comedy)
+        genres.invalidate()
+
+        # 조회 중에는 bit 를 할당하지 않고 bit 가 없는 장르는 일치하는 영화가 없는 것으로 처리
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(genres.mask_of([comedy.pk, 0]), 0)
+            self.assertEqual(list(genres.filter_all_genres(Movie.objects.all(), ['코미디'])), [])
+        self.assertFalse([query for query in ctx.captured_queries if 'UPDATE' in query['sql']])
+
+        # 적재 명령의 assign_missing_bits 에서 bit 를 할당하고 영화의 genre_mask 도 다시 계산
+        self.assertEqual(genres.assign_missing_bits(), [comedy.pk])
+        comedy.refresh_from_db()
+        self.assertEqual(comedy.bit, 2)
+        self.assertEqual(genres.mask_of([comedy.pk, 0]), 1 << 2)
+        self.assertEqual(self.mask(self.movies[2]), 1 << 2)
+        self.assertEqual(
+            list(genres.filter_all_genres(Movie.objects.all(), ['코미디'])), [self.movies[2]]
+        )
+
+    def test_genre_table_expires(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            genres.invalidate()
+            genres.genre_table()
+        self.assertEqual(cache_set.call_args[0][2], genres.GENRE_TABLE_TIMEOUT)
+
+    def test_bit_is_bounded(self):
+        Genre.objects.filter(pk=self.drama.pk).update(bit=genres.MAX_GENRE_BIT)
+        with self.assertRaises(ValueError):
+            Genre.objects.create(name='코미디')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Genre.objects.filter(pk=self.drama.pk).update(bit=genres.MAX_GENRE_BIT + 1)
+
+
+class ResponseCacheTest(TestCase):
+    '''
+    익명 사용자 카탈로그 API 응답 캐시와 signal 무효화 확인
+    '''
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Genre.objects.create(name='액션')
+
+    def test_cached_until_genre_changes(self):
+        response = self.client.get('/api/v1/movies/genre/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/movies/genre/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        Genre.objects.create(name='드라마')
+        response = self.client.get('/api/v1/movies/genre/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 2)
+
+    def test_rating_keeps_genre_list_cached(self):
+        user = User.objects.create_user(username='tester', password='pw')
+        movie = Movie.objects.create(
+            title='movie', release_date='2022-05-20', overview='overview',
+            adult=False, popularity=1, backdrop_path='/b.jpg',
+            poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+        )
+        self.client.get('/api/v1/movies/genre/')
+        self.client.get('/api/v1/movies/popular/1/?sort=star_avg')
+
+        StarRating.objects.create(user=user, movie=movie, star=4)
+        response = self.client.get('/api/v1/movies/genre/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.client.get('/api/v1/movies/popular/1/?sort=star_avg')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_authenticated_request_is_not_cached(self):
+        user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(user)
+        self.client.get('/api/v1/movies/genre/')
+        response = self.client.get('/api/v1/movies/genre/')
+        self.assertFalse(response.has_header('X-Cache'))
+
+
+class StarRatingTest(TestCase):
+    '''
+    별점 upsert 와 영화별 별점 집계
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        self.client.force_authenticate(self.user)
+        self.movie = Movie.objects.create(
+            title='movie', release_date='2022-05-20', overview='overview',
+            adult=False, popularity=1, backdrop_path='/b.jpg',
+            poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+        )
+        self.url = f'/api/v1/movies/{self.movie.pk}/star_rating/'
+
+    def test_upsert_and_delete(self):
+        self.client.post(self.url, {'star': 3})
+        response = self.client.post(self.url, {'star': 4.5})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['star'], 4.5)
+        other = APIClient()
+        other.force_authenticate(self.other)
+        other.post(self.url, {'star': 2})
+
+        self.movie.refresh_from_db()
+        self.assertEqual(StarRating.objects.filter(movie=self.movie).count(), 2)
+        self.assertEqual((self.movie.star_cnt, self.movie.star_avg), (2, 3.25))
+        self.assertEqual(self.movie.star_hist, [0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0])
+
+        # 별점 평균순 정렬은 별점이 있는 영화만
+        response = self.client.get('/api/v1/movies/popular/0/?sort=star_avg')
+        self.assertEqual([movie['pk'] for movie in response.data['movies']], [self.movie.pk])
+        self.assertEqual(response.data['movies'][0]['star_avg'], 3.25)
+        self.assertEqual(self.client.get('/api/v1/movies/popular/0/?sort=abc').status_code, 400)
+
+        # 상세 정보의 stars 는 현재 유저의 별점
+        response = self.client.get(f'/api/v1/movies/{self.movie.pk}/')
+        self.assertEqual(response.data['stars']['star'], 4.5)
+        self.assertEqual(response.data['movie']['star_avg'], 3.25)
+
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.star_cnt, self.movie.star_sum, self.movie.star_avg), (1, 2, 2))
+
+        # 별점 기록으로 다시 계산해도 같은 값
+        call_command('reconcile_counters', stdout=StringIO())
+        before = (self.movie.star_cnt, self.movie.star_sum, self.movie.star_avg, self.movie.star_hist)
+        self.movie.refresh_from_db()
+        self.assertEqual(
+            (self.movie.star_cnt, self.movie.star_sum, self.movie.star_avg, self.movie.star_hist), before
+        )
+
+    def test_rating_invalidates_only_rating_cache(self):
+        cache.clear()
+        Genre.objects.create(name='액션')
+        anonymous = APIClient()
+        urls = ['/api/v1/movies/genre/', '/api/v1/movies/popular/0/?sort=star_avg']
+        for url in urls:
+            anonymous.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'star': 3})
+        self.assertEqual(anonymous.get(urls[0])['X-Cache'], 'HIT')
+        response = anonymous.get(urls[1])
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['movies'][0]['star_avg'], 3)
+
+    def test_rebuild_after_last_rating_removed(self):
+        self.client.post(self.url, {'star': 3})
+        self.client.delete(self.url)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.star_hist, empty_hist())
+
+        # 다시 계산해도 별점을 모두 지운 영화는 같은 형태 (불일치로 보지 않음)
+        Movie.objects.filter(pk=self.movie.pk).update(star_cnt=1)
+        self.assertEqual(rebuild_aggregates(), 1)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.star_cnt, self.movie.star_hist), (0, empty_hist()))
+        self.assertEqual(rebuild_aggregates(), 0)
+
+
+class GenreAffinityTest(TestCase):
+    '''
+    별점 변화량만큼 장르 선호도를 갱신하고 선호 장르 순으로 추천
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.action, self.drama, self.comedy = [
+            Genre.objects.create(name=name) for name in ('액션', '드라마', '코미디')
+        ]
+        self.movies = []
+        for i, genres in enumerate([[self.action, self.drama], [self.drama], [self.comedy]]):
+            movie = Movie.objects.create(
+                title=f'movie{i}', release_date='2022-05-20', overview='overview',
+                adult=False, popularity=i, backdrop_path='/b.jpg',
+                poster_path='/p.jpg', vote_average=7.0, vote_count=200,
+            )
+            movie.genres.set(genres)
+            self.movies.append(movie)
+
+    def scores(self):
+        return dict(GenreAffinity.objects.filter(user=self.user).values_list('genre__name', 'score'))
+
+    def rate(self, movie, star):
+        return self.client.post(f'/api/v1/movies/{movie.pk}/star_rating/', {'star': star})
+
+    def test_update_and_rebuild(self):
+        self.rate(self.movies[0], 4.5)
+        self.assertEqual(self.scores(), {'액션': 4, '드라마': 4})
+        self.rate(self.movies[0], 2)
+        self.rate(self.movies[1], 3)
+        self.assertEqual(self.scores(), {'액션': 2, '드라마': 5})
+        self.client.delete(f'/api/v1/movies/{self.movies[0].pk}/star_rating/')
+        self.assertEqual(self.scores(), {'액션': 0, '드라마': 3})
+
+        # 다시 계산해도 같은 점수 (점수가 0 인 장르는 row 가 없음)
+        call_command('rebuild_genre_affinity', stdout=StringIO())
+        self.assertEqual(self.scores(), {'드라마': 3})
+
+    def test_recommend_by_top_genres(self):
+        self.rate(self.movies[1], 5)
+        genres = top_genres(self.user)
+        self.assertEqual(genres, [(self.drama, 5)])
+        movies = recommend(Movie.objects.order_by('-popularity'), genres, 10)
+        # 드라마 장르가 있는 영화만, 같은 점수면 인기순
+        self.assertEqual([movie.pk for movie in movies], [self.movies[1].pk, self.movies[0].pk])
+
+
+class FakeTMDBHandler(BaseHTTPRequestHandler):
+    '''
+    TMDB API 응답을 흉내내는 로컬 서버
+
+    * 처음 요청하는 경로에 server.errors[경로] 상태 코드를 순서대로 응답 (재시도 확인)
+    * server.broken 의 영화는 예고편 요청에 404 응답 (수집 중단 확인)
+    * server.changes[영화 id] 로 영화 정보 변경 (변경분 갱신 확인)
+    '''
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = urlparse(self.path).path
+        with server.lock:
+            server.requests.append(path)
+            errors = server.errors.get(path)
+            status = errors.pop(0) if errors else 200
+        if path.endswith('/videos') and int(path.split('/')[-2]) in server.broken:
+            status = 404
+        if status != 200:
+            self.send_response(status)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+
+        if path == '/genre/movie/list':
+            data = {'genres': [{'id': 28, 'name': '액션'}, {'id': 18, 'name': '드라마'}]}
+        elif path.endswith('/videos'):
+            movie_id = path.split('/')[-2]
+            data = {'results': [{
+                'name': 'trailer', 'key': f'key{movie_id}', 'size': 1080,
+                'type': 'Trailer', 'official': True,
+            }]}
+        else:
+            kind = path.split('/')[-1]
+            page = int(urlparse(self.path).query.split('page=')[1].split('&')[0])
+            offset = 0 if kind == 'popular' else 1
+            data = {'results': [
+                self.movie(page * 10 + offset + i, released=i < 2) for i in range(3)
+            ]}
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def movie(self, movie_id, released):
+        return {
+            'id': movie_id, 'title': f'movie {movie_id}',
+            'release_date': '2022-05-20' if released else '', 'overview': 'overview',
+            'adult': False, 'popularity': 1, 'backdrop_path': None, 'poster_path': '/p.jpg',
+            'vote_average': 7.0, 'vote_count': 10, 'genre_ids': [28, 18][:movie_id % 2 + 1],
+            **self.server.changes.get(movie_id, {}),
+        }
+
+
+class TMDBIngestionTest(TestCase):
+    '''
+    로컬 TMDB 서버로 수집 파이프라인 확인 (재시도, checkpoint 이어서 수집)
+    '''
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTMDBHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.errors = {'/movie/popular': [429, 500]}
+        self.server.broken = {21}
+        self.server.changes = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def tmdb_client(self):
+        client = TMDBClient('key', f'http://127.0.0.1:{self.server.server_port}', rate=0, backoff=0)
+        self.addCleanup(client.close)
+        return client
+
+    def ingestion(self):
+        ingestion = Ingestion(self.tmdb_client(), pages=2, workers=1, checkpoint_path=self.checkpoint)
+        ingestion.video_batch_size = 1
+        return ingestion
+
+    def test_resume_after_failure(self):
+        with self.assertRaises(TMDBError):
+            self.ingestion().run()
+        # 429, 500 후 재시도해서 성공
+        self.assertEqual(self.server.requests.count('/movie/popular'), 4)
+        self.assertTrue(os.path.exists(self.checkpoint))
+        with open(self.checkpoint) as f:
+            done = set(json.load(f)['videos_done'])
+
+        self.server.requests.clear()
+        self.server.broken.clear()
+        stats = self.ingestion().run()
+        self.assertFalse(os.path.exists(self.checkpoint))
+        # 목록은 다시 요청하지 않고 남은 예고편만 요청
+        movie_ids = {10, 11, 20, 21, 12, 22}
+        self.assertEqual(
+            sorted(self.server.requests),
+            sorted(f'/movie/{pk}/videos' for pk in movie_ids - done),
+        )
+        self.assertEqual(stats['movies'], 0)
+
+        self.assertEqual(Movie.objects.count(), 6)
+        self.assertEqual(dict(Genre.objects.values_list('pk', 'bit')), {28: 0, 18: 1})
+        movie = Movie.objects.get(pk=11)
+        self.assertEqual(set(movie.genres.values_list('pk', flat=True)), {28, 18})
+        self.assertEqual(movie.genre_mask, 3)
+        self.assertEqual(list(Movie.objects.get(pk=21).video.values_list('key', flat=True)), ['key21'])
+        self.assertEqual(Movie.objects.get(pk=10).backdrop_path, '')
+        # 이전 실행에서 저장한 영화도 검색 색인에 추가
+        self.assertEqual(set(get_backend().search('movie')), movie_ids)
+
+    def test_resume_after_crash_before_page_checkpoint(self):
+        class CrashingSet(set):
+            def add(self, item):
+                raise RuntimeError('crash')
+
+        self.server.broken.clear()
+        ingestion = self.ingestion()
+        ingestion.checkpoint.pages = CrashingSet()
+        # 첫 페이지의 영화는 commit 되었지만 페이지 checkpoint 는 저장되지 않음
+        with self.assertRaises(RuntimeError):
+            ingestion.run()
+        self.assertTrue(Movie.objects.exists())
+
+        self.ingestion().run()
+        movie_ids = {10, 11, 20, 21, 12, 22}
+        self.assertEqual(set(Movie.objects.filter(video__isnull=False).values_list('pk', flat=True)), movie_ids)
+        self.assertEqual(set(get_backend().search('movie')), movie_ids)
+
+    def test_default_checkpoint_outside_repo(self):
+        self.assertFalse(os.path.abspath(DEFAULT_CHECKPOINT).startswith(str(settings.BASE_DIR) + os.sep))
+
+    def test_delta_refresh(self):
+        self.server.broken.clear()
+        self.ingestion().run()
+        stats = DeltaRefresh(self.tmdb_client(), pages=2, workers=2).run()
+        # 11, 21 은 인기/상영중 목록에 모두 있지만 한 번만 센다.
+        self.assertEqual((stats['updated'], stats['unchanged'], stats['movies']), (0, 6, 0))
+
+        self.server.requests.clear()
+        self.server.changes = {
+            10: {'popularity': 9.5, 'vote_count': 99},
+            20: {'title': 'new title'},
+            11: {'genre_ids': [18]},
+        }
+        cache_version = cache.get('response_cache:version:movies')
+        stats = DeltaRefresh(self.tmdb_client(), pages=2, workers=2).run()
+        self.assertEqual((stats['updated'], stats['unchanged']), (2, 4))
+        self.assertEqual(stats['genres_changed'], 1)
+        self.assertEqual(stats['fields'], {'popularity': 1, 'vote_count': 1, 'title': 1})
+        # 이미 저장된 영화의 예고편은 다시 요청하지 않는다.
+        self.assertFalse([path for path in self.server.requests if path.endswith('/videos')])
+        self.assertNotEqual(cache.get('response_cache:version:movies'), cache_version)
+
+        movie = Movie.objects.get(pk=10)
+        self.assertEqual((movie.popularity, movie.vote_count), (9.5, 99))
+        self.assertEqual(Movie.objects.get(pk=20).title, 'new title')
+        self.assertEqual(Movie.objects.get(pk=11).genre_mask, 2)
+        run = IngestionRun.objects.latest('pk')
+        self.assertEqual((run.mode, run.succeeded, run.stats['updated']), ('refresh', True, 2))
+
+
+class FixtureLoadTest(TestCase):
+    '''
+    fixture 스트리밍 파싱과 bulk insert
+    '''
+    fixture = [
+        {'model': 'movies.genre', 'pk': 28, 'fields': {'name': '액션'}},
+        {'model': 'movies.genre', 'pk': 18, 'fields': {'name': '드라마'}},
+        {'model': 'movies.video', 'pk': 1, 'fields': {
+            'name': '예고편 "1"', 'key': 'abc', 'size': 1080, 'type': 'Trailer', 'official': True,
+        }},
+        {'model': 'movies.movie', 'pk': 11, 'fields': {
+            'title': '스타워즈', 'release_date': '1977-05-25', 'overview': '[공화국]',
+            'adult': False, 'popularity': 75.5, 'backdrop_path': '/b.jpg', 'poster_path': '/p.jpg',
+            'vote_average': 8.2, 'vote_count': 17220, 'video': [1], 'genres': [18, 28],
+        }},
+    ]
+
+    def test_stream_objects(self):
+        text = json.dumps(self.fixture, ensure_ascii=False, indent=2)
+        # chunk 경계에서 잘린 원소도 다시 이어서 파싱
+        self.assertEqual(list(iter_objects(StringIO(text), chunk_size=7)), self.fixture)
+        with self.assertRaises(ValueError):
+            list(iter_objects(StringIO(text[:-10]), chunk_size=7))
+
+    def test_load_fixture(self):
+        Genre.objects.create(pk=18, name='old')
+        MovieWindow.objects.create(name='now_playing', data={'stale': True})
+        path = os.path.join(tempfile.mkdtemp(), 'movies.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.fixture, f, ensure_ascii=False)
 
-# Create your tests here.
+        counts = load_fixture(path, batch_size=2)
+        self.assertEqual(counts, {'movies.genre': 2, 'movies.video': 1, 'movies.movie': 1})
+        self.assertEqual(dict(Genre.objects.values_list('pk', 'name')), {18: '드라마', 28: '액션'})
+        movie = Movie.objects.get(pk=11)
+        self.assertEqual(movie.genre_mask, 0b11)
+        self.assertEqual(list(movie.video.values_list('key', flat=True)), ['abc'])
+        self.assertEqual(get_backend().search('스타워즈'), [11])
+        # 적재가 끝나면 window 스냅샷도 다시 계산
+        self.assertEqual(MovieWindow.objects.get(name='now_playing').data['version'], 2)
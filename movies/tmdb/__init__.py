@@ -0,0 +1,50 @@
+'''
+TMDB 영화 데이터 수집
+
+* client.TMDBClient : thread 간 공유하는 HTTP client (연결 재사용, 요청 수 제한, 재시도)
+* pipeline.Ingestion : 목록/예고편을 동시에 가져와서 batch upsert, checkpoint 로 이어서 수집
+* pipeline.DeltaRefresh : 저장된 영화와 비교해서 바뀐 필드만 갱신
+'''
+from django.conf import settings
+
+from .client import TMDBClient, TMDBError
+from .pipeline import DeltaRefresh, Ingestion
+
+
+def get_client(**kwargs):
+    options = {
+        'api_key': settings.TMDB_API_KEY,
+        'base_url': settings.TMDB_BASE_URL,
+        'rate': settings.TMDB_RATE_LIMIT,
+        **kwargs,
+    }
+    return TMDBClient(**options)
+
+
+def ingest(pages=100, workers=8, checkpoint_path=None, client=None, stdout=None):
+    '''
+    TMDB 장르, 인기/상영중 영화 pages 페이지, 새 영화의 예고편을 저장
+
+    return {'genres': , 'movies': , 'videos': }
+    '''
+    client = client or get_client(pool_size=workers)
+    try:
+        return Ingestion(
+            client, pages=pages, workers=workers,
+            checkpoint_path=checkpoint_path, stdout=stdout,
+        ).run()
+    finally:
+        client.close()
+
+
+def refresh(pages=100, workers=8, client=None, stdout=None):
+    '''
+    TMDB 인기/상영중 영화 pages 페이지를 가져와서 저장된 영화의 인기도/평점 등을 갱신
+
+    return DeltaRefresh.stats
+    '''
+    client = client or get_client(pool_size=workers)
+    try:
+        return DeltaRefresh(client, pages=pages, workers=workers, stdout=stdout).run()
+    finally:
+        client.close()
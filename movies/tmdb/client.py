@@ -0,0 +1,95 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TMDBError(Exception):
+    pass
+
+
+class RateLimiter:
+    '''
+    초당 rate 개의 요청만 보내도록 요청 간격을 맞춘다. (thread-safe)
+    '''
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            scheduled = max(self.next_time, now)
+            self.next_time = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+class TMDBClient:
+    '''
+    TMDB API client
+
+    * 하나의 requests.Session 을 여러 thread 가 공유 (연결 재사용)
+    * RateLimiter 로 초당 요청 수 제한
+    * 429 / 5xx / 연결 오류는 max_retries 번까지 다시 시도 (지수 backoff, 429 는 Retry-After)
+    '''
+    def __init__(self, api_key, base_url, rate=40, max_retries=4, backoff=0.5,
+                 timeout=10, pool_size=10, language='ko-KR'):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.language = language
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def retry_delay(self, attempt, response=None):
+        if response is not None and response.headers.get('Retry-After'):
+            try:
+                return float(response.headers['Retry-After'])
+            except ValueError:
+                pass
+        return self.backoff * 2 ** attempt
+
+    def get(self, path, **params):
+        params = {'api_key': self.api_key, **params}
+        url = self.base_url + path
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt == self.max_retries:
+                    raise TMDBError(f'{path}: {error}')
+                time.sleep(self.retry_delay(attempt))
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    raise TMDBError(f'{path}: HTTP {response.status_code}')
+                time.sleep(self.retry_delay(attempt, response))
+                continue
+            if response.status_code != 200:
+                raise TMDBError(f'{path}: HTTP {response.status_code}')
+            return response.json()
+
+    def genres(self):
+        return self.get('/genre/movie/list', language=self.language).get('genres', [])
+
+    def movie_list(self, kind, page):
+        # kind : popular / now_playing
+        return self.get(f'/movie/{kind}', language=self.language, page=page).get('results', [])
+
+    def videos(self, movie_id):
+        return self.get(f'/movie/{movie_id}/videos').get('results', [])
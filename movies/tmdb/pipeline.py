@@ -0,0 +1,329 @@
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import transaction
+from django.utils import timezone
+
+from config import cache
+from config.db import upsert_many
+from .. import autocomplete, genres
+from ..models import Genre, IngestionRun, Movie, Video
+from ..search import get_backend
+from ..windows import refresh_window
+
+# TMDB 영화 정보 중 저장하는 필드 (좋아요/별점 등 서비스에서 계산하는 필드는 덮어쓰지 않음)
+MOVIE_FIELDS = (
+    'title', 'release_date', 'overview', 'adult', 'popularity',
+    'backdrop_path', 'poster_path', 'vote_average', 'vote_count',
+)
+# 바뀌면 검색 색인/자동완성을 갱신해야 하는 필드
+TEXT_FIELDS = ('title', 'overview')
+LIST_KINDS = ('popular', 'now_playing')
+
+
+def movie_row(movie):
+    return {
+        'id': movie['id'],
+        'title': movie['title'][:100],
+        'release_date': movie['release_date'],
+        'overview': movie.get('overview') or '',
+        'adult': movie.get('adult', False),
+        'popularity': movie.get('popularity', 0),
+        'backdrop_path': movie.get('backdrop_path') or '',
+        'poster_path': movie.get('poster_path') or '',
+        'vote_average': movie.get('vote_average', 0),
+        'vote_count': movie.get('vote_count', 0),
+    }
+
+
+class Checkpoint:
+    '''
+    진행 상황을 JSON 파일에 저장해서 중단된 수집을 이어서 진행
+
+    * pages : 저장을 마친 목록 페이지 ["popular:1", ...]
+    * movie_ids : 이번 수집에서 저장한 영화 id (마무리 단계에서 검색 색인 갱신)
+    * pending_videos : 예고편을 가져와야 하는 영화 id
+    * videos_done : 예고편 저장을 마친 영화 id
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.data = {
+            'genres': False, 'pages': [], 'movie_ids': [], 'pending_videos': [], 'videos_done': [],
+        }
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.data.update(json.load(f))
+        self.pages = set(self.data['pages'])
+        self.movie_ids = set(self.data['movie_ids'])
+        self.pending_videos = set(self.data['pending_videos'])
+        self.videos_done = set(self.data['videos_done'])
+
+    def save(self):
+        if not self.path:
+            return
+        self.data.update({
+            'pages': sorted(self.pages),
+            'movie_ids': sorted(self.movie_ids),
+            'pending_videos': sorted(self.pending_videos),
+            'videos_done': sorted(self.videos_done),
+        })
+        # 저장 중에 중단되어도 파일이 깨지지 않도록 임시 파일에 쓰고 교체
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Ingestion:
+    '''
+    TMDB 인기/상영중 영화 목록과 예고편을 가져와서 저장
+
+    * HTTP 요청은 workers 개의 thread 에서 동시에 보내고, DB 저장은 main thread 에서 batch 로 처리
+    * 영화/장르는 upsert, 장르 관계와 예고편은 bulk insert
+    * 단계가 끝날 때마다 checkpoint 를 저장하고, 모두 끝나면 checkpoint 파일을 삭제
+    * 실행 결과는 IngestionRun 에 기록
+    '''
+    mode = IngestionRun.FULL
+    video_batch_size = 50
+
+    def __init__(self, client, pages=100, workers=8, checkpoint_path=None, stdout=None):
+        self.client = client
+        self.pages = pages
+        self.workers = workers
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.stdout = stdout
+        # 이어서 수집하면 이전 실행에서 저장한 영화도 마무리 단계에서 색인
+        self.movie_ids = self.checkpoint.movie_ids
+        self.stats = {'genres': 0, 'movies': 0, 'videos': 0}
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def run(self):
+        started_at = timezone.now()
+        succeeded = False
+        try:
+            self.collect()
+            succeeded = True
+        finally:
+            IngestionRun.objects.create(
+                mode=self.mode, succeeded=succeeded, stats=self.stats,
+                started_at=started_at, finished_at=timezone.now(),
+            )
+        self.checkpoint.clear()
+        return self.stats
+
+    def collect(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if not self.checkpoint.data['genres']:
+                self.save_genres(self.client.genres())
+                self.checkpoint.data['genres'] = True
+                self.checkpoint.save()
+            self.fetch_pages(executor)
+            self.fetch_videos(executor)
+        self.finish()
+
+    #### 장르 ####
+    def save_genres(self, rows):
+        with transaction.atomic():
+            bits = dict(Genre.objects.values_list('pk', 'bit'))
+            # 새 장르는 genre_mask 의 다음 bit 위치 할당 (upsert 는 pre_save signal 이 없음)
+            new_bits = iter(genres.allocate_bits(
+                sum(1 for genre in rows if bits.get(genre['id']) is None)
+            ))
+            genre_rows = []
+            for genre in rows:
+                bit = bits.get(genre['id'])
+                if bit is None:
+                    bit = next(new_bits)
+                genre_rows.append({'id': genre['id'], 'name': genre['name'], 'bit': bit})
+            upsert_many(Genre, genre_rows, ('id',), ('name',))
+        genres.invalidate()
+        self.stats['genres'] = len(genre_rows)
+        self.log(f'장르 {len(genre_rows)}개 저장')
+
+    #### 영화 목록 ####
+    def fetch_pages(self, executor):
+        futures = {}
+        for page in range(1, self.pages + 1):
+            for kind in LIST_KINDS:
+                key = f'{kind}:{page}'
+                if key not in self.checkpoint.pages:
+                    futures[executor.submit(self.client.movie_list, kind, page)] = key
+        for future in as_completed(futures):
+            self.save_movies(future.result())
+            self.checkpoint.pages.add(futures[future])
+            self.checkpoint.save()
+        self.log(f'영화 목록 {len(futures)}페이지 저장')
+
+    def save_movies(self, movies):
+        movies = {movie['id']: movie for movie in movies if movie.get('release_date')}
+        if not movies:
+            return
+        ids = list(movies)
+        with transaction.atomic():
+            existing = set(Movie.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            upsert_many(Movie, [movie_row(movie) for movie in movies.values()], ('id',), MOVIE_FIELDS)
+            self.save_movie_genres(movies)
+
+            # 새로 추가된 영화만 예고편을 가져온다.
+            # commit 후 checkpoint 를 저장하기 전에 중단되면 다음 실행에서는 이미 있는 영화가 되므로
+            # commit 전에 checkpoint 에 저장 (commit 이 실패한 영화는 fetch_videos 에서 제외)
+            self.checkpoint.pending_videos.update(set(ids) - existing - self.checkpoint.videos_done)
+            self.movie_ids.update(ids)
+            self.checkpoint.save()
+        self.stats['movies'] += len(ids)
+
+    def save_movie_genres(self, movies):
+        '''
+        {영화 id: TMDB 영화} 의 장르 관계를 다시 저장
+
+        bulk insert 는 m2m_changed signal 이 없어서 genre_mask 를 직접 갱신한다.
+        '''
+        if not movies:
+            return
+        Through = Movie.genres.through
+        known = set(genres.genre_bits())
+        Through.objects.filter(movie_id__in=list(movies)).delete()
+        Through.objects.bulk_create([
+            Through(movie_id=movie_id, genre_id=genre_id)
+            for movie_id, movie in movies.items()
+            for genre_id in movie.get('genre_ids', []) if genre_id in known
+        ])
+        genres.update_genre_masks(list(movies))
+
+    #### 예고편 ####
+    def fetch_videos(self, executor):
+        pending = self.checkpoint.pending_videos - self.checkpoint.videos_done
+        pending = sorted(Movie.objects.filter(pk__in=pending).values_list('pk', flat=True))
+        futures = {executor.submit(self.client.videos, movie_id): movie_id for movie_id in pending}
+        results = {}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if len(results) >= self.video_batch_size:
+                self.save_videos(results)
+                results = {}
+        self.save_videos(results)
+        self.log(f'예고편 {len(pending)}개 영화 저장')
+
+    def save_videos(self, results):
+        if not results:
+            return
+        videos = {
+            video['key']: video
+            for movie_videos in results.values() for video in movie_videos
+        }
+        with transaction.atomic():
+            keys = set(Video.objects.filter(key__in=list(videos)).values_list('key', flat=True))
+            Video.objects.bulk_create([
+                Video(
+                    name=video['name'][:100], key=video['key'], size=video['size'],
+                    type=video['type'][:20], official=video['official'],
+                )
+                for key, video in videos.items() if key not in keys
+            ])
+            video_ids = dict(Video.objects.filter(key__in=list(videos)).values_list('key', 'pk'))
+
+            Through = Movie.video.through
+            Through.objects.bulk_create([
+                Through(movie_id=movie_id, video_id=video_ids[video['key']])
+                for movie_id, movie_videos in results.items() for video in movie_videos
+            ], ignore_conflicts=True)
+
+        self.checkpoint.videos_done.update(results)
+        self.checkpoint.pending_videos.difference_update(results)
+        self.checkpoint.save()
+        self.stats['videos'] += len(videos)
+
+    #### 마무리 ####
+    def finish(self):
+        # upsert/bulk_update 는 post_save signal 이 없어서 검색 색인과 캐시를 직접 갱신
+        if self.movie_ids:
+            movies = Movie.objects.filter(pk__in=list(self.movie_ids)).only('pk', *TEXT_FIELDS)
+            get_backend().index(movies)
+            autocomplete.invalidate()
+        cache.invalidate()
+        # 최신 상영작 window 는 평점순 목록을 포함하기 때문에 다시 계산
+        refresh_window()
+
+
+class DeltaRefresh(Ingestion):
+    '''
+    이미 저장된 영화의 인기도/평점 등을 TMDB 최신 값으로 갱신
+
+    * 가져온 영화를 저장된 값과 비교해서 바뀐 영화의 바뀐 필드만 bulk_update
+    * 새 영화는 전체 수집과 같이 저장하고 예고편을 가져온다.
+    * 바뀐 영화가 없으면 캐시/window 를 갱신하지 않는다.
+    * checkpoint 를 사용하지 않는다. (중단되면 처음부터 다시 비교)
+
+    stats
+    * movies : 새로 추가된 영화 수
+    * updated / unchanged : 저장된 영화 중 값이 바뀐/그대로인 영화 수
+    * genres_changed : 장르가 바뀐 영화 수
+    * fields : {필드 이름: 값이 바뀐 영화 수}
+    '''
+    mode = IngestionRun.REFRESH
+
+    def __init__(self, client, pages=100, workers=8, stdout=None):
+        super().__init__(client, pages=pages, workers=workers, stdout=stdout)
+        self.stats.update({'updated': 0, 'unchanged': 0, 'genres_changed': 0, 'fields': {}})
+        self.changed = False
+        # 이미 비교한 영화 id (인기/상영중 목록에 모두 있는 영화를 두 번 세지 않음)
+        self.seen = set()
+
+    def save_movies(self, movies):
+        movies = {
+            movie['id']: movie for movie in movies
+            if movie.get('release_date') and movie['id'] not in self.seen
+        }
+        self.seen.update(movies)
+        stored = Movie.objects.filter(pk__in=list(movies)).only('pk', 'genre_mask', *MOVIE_FIELDS)\
+            .in_bulk()
+        new = [movie for pk, movie in movies.items() if pk not in stored]
+        if new:
+            super().save_movies(new)
+            self.changed = True
+
+        updates = defaultdict(list)
+        genre_changes = {}
+        known = genres.genre_bits()
+        for pk, obj in stored.items():
+            row = movie_row(movies[pk])
+            fields = []
+            for name in MOVIE_FIELDS:
+                value = Movie._meta.get_field(name).to_python(row[name])
+                if getattr(obj, name) != value:
+                    setattr(obj, name, value)
+                    fields.append(name)
+            if fields:
+                updates[tuple(fields)].append(obj)
+                self.stats['updated'] += 1
+                for name in fields:
+                    self.stats['fields'][name] = self.stats['fields'].get(name, 0) + 1
+                if set(fields) & set(TEXT_FIELDS):
+                    self.movie_ids.add(pk)
+            else:
+                self.stats['unchanged'] += 1
+            genre_ids = [genre_id for genre_id in movies[pk].get('genre_ids', []) if genre_id in known]
+            if obj.genre_mask != genres.mask_of(genre_ids):
+                genre_changes[pk] = movies[pk]
+
+        if updates or genre_changes:
+            with transaction.atomic():
+                # 바뀐 필드 조합별로 나눠서 바뀐 컬럼만 UPDATE
+                for fields, objs in updates.items():
+                    Movie.objects.bulk_update(objs, fields, batch_size=500)
+                self.save_movie_genres(genre_changes)
+            self.stats['genres_changed'] += len(genre_changes)
+            self.changed = True
+
+    def finish(self):
+        if self.changed:
+            super().finish()
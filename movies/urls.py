@@ -5,6 +5,7 @@ from . import views
 urlpatterns = [
     path('genre/', views.genre),
     path('movie_title/', views.movie_title),
+    path('autocomplete/', views.movie_autocomplete),
     path('movie_trailer/', views.movie_trailer),
     path('popular/<int:page>/', views.movie_popular),
     path('now_playing/<int:page>/', views.now_playing),
@@ -14,7 +15,10 @@ urlpatterns = [
     path('page/<int:page>/', views.movies),
     path('<int:movie_id>/', views.movie_detail),
     path('<int:movie_id>/likes/', views.movie_likes),
+    path('<int:movie_id>/like_users/page/<int:page>/', views.movie_like_users),
     path('<int:movie_id>/comments/', views.movie_comment_create),
+    path('<int:movie_id>/comments/page/<int:page>/', views.movie_comments),
+    path('<int:movie_id>/stars/page/<int:page>/', views.movie_stars),
     path('<int:movie_id>/comments/<int:comment_id>/', views.movie_update_or_delete),
     path('<int:movie_id>/star_rating/', views.movie_star_rating),
 ]
@@ -1,6 +1,8 @@
 from http.client import ResponseNotReady
 from types import GetSetDescriptorType
+from django.http import Http404
 from django.shortcuts import get_list_or_404, get_object_or_404
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -9,12 +11,24 @@ from .serailizers import (
     GenreSerializer, 
     MovieListSerializer, 
     MovieSerializer, 
+    MovieDetailSerializer,
     MovieCommentSerializer, 
-    StarSerializer
+    MovieStarSerializer,
+    StarSerializer,
+    UserSerializer,
 )
 from .models import Movie, MovieComment, StarRating, Genre
-from accounts.models import User
-from django.db.models import Count
+from django.db import transaction
+from config.cache import GENRES, MOVIES, RATINGS, SHOTS, cache_response
+from config.db import update_counters
+from config.likes import METHOD_ACTIONS, change_like
+from config.pagination import paginate, paginate_list
+from .recommendations import top_genres, recommend
+from .ratings import rate_movie, unrate_movie
+from .windows import get_window, hydrate, trailer_data
+from .search import get_backend, rank_expression
+from .autocomplete import get_index
+from .genres import filter_all_genres, parse_genres
 ####################################
 # 영화 추천 알고리즘을 위해 사용되는 모듈
 import random
@@ -23,14 +37,33 @@ import datetime as dt
 
 ####################################
 ## TMDB 로부터 movie data 가져올 때 사용하는 함수
-## python manage.py migrate 후 다음 함수 실행되어야 에러가 나지 않는다.
+## python manage.py migrate 후 다음 함수 (또는 python manage.py ingest_tmdb) 실행되어야 에러가 나지 않는다.
+## 중단되면 checkpoint 부터 이어서 수집한다. (movies/tmdb)
 # from . import dump_movie_data
 # dump_movie_data.get_movie_data()
 ####################################
 
 MOVIE_NUM = 12
+PAGE_NUM = 20
+AUTOCOMPLETE_NUM = 10
+# ?sort= 로 선택할 수 있는 정렬 기준
+# star_avg : 우리 서비스 별점 평균순 (별점이 있는 영화만)
+MOVIE_SORTS = {
+    'popularity': ('-popularity', 'pk'),
+    'star_avg': ('-star_avg', '-star_cnt', 'pk'),
+}
+
+
+def sort_movies(movies, sort):
+    if sort not in MOVIE_SORTS:
+        raise ValidationError({'sort': f'sort 는 {", ".join(MOVIE_SORTS)} 중 하나입니다.'})
+    if sort == 'star_avg':
+        movies = movies.filter(star_cnt__gt=0)
+    return movies.order_by(*MOVIE_SORTS[sort])
+
 
 @api_view(['GET'])
+@cache_response(depends_on=(GENRES,))
 def genre(request):
     '''
     genre
@@ -50,12 +83,34 @@ def movie_title(request):
     movie_title
 
     ---
+    전체 영화 제목 리스트 (자동완성은 autocomplete API 사용)
     
     '''
-    movies = Movie.objects.all()
-    movie_title = list(title[0] for title in movies.values_list('title'))
     data = {
-        'movie_title': movie_title,
+        'movie_title': get_index().titles,
+    }
+    return Response(data)
+
+
+@api_view(['GET'])
+def movie_autocomplete(request):
+    '''
+    movie_autocomplete
+
+    ---
+    [GET] 검색어가 포함된 영화 제목을 인기순으로 리턴 (검색어로 시작하는 제목 우선)
+
+    * q : 검색어
+    * limit : 최대 개수 (기본 10, 1 ~ 50)
+
+    '''
+    try:
+        limit = max(1, min(int(request.GET.get('limit', AUTOCOMPLETE_NUM)), 50))
+    except ValueError:
+        limit = AUTOCOMPLETE_NUM
+    movies = get_index().search(request.GET.get('q', ''), limit)
+    data = {
+        'movies': [{'pk': pk, 'title': title} for pk, title in movies],
     }
     return Response(data)
 
@@ -69,27 +124,24 @@ def movie_trailer(request):
     ---
     최신 상영작 중 랜덤한 movie_trailer 를 리턴하는 API
 
+    미리 계산해둔 window 의 예고편 목록에서 하나를 고른다. (movies/windows.py)
+
     '''
-    today = dt.datetime.now()
-    start = today - dt.timedelta(30)
-    end = today + dt.timedelta(30)
-    movies = Movie.objects.all().order_by('-release_date')\
-        .filter(release_date__range=(start, end))[:20]
-    serializer = MovieSerializer(movies, many=True)
-    movies = []
-    for movie in serializer.data:
-        if movie['video']: # 비디오 정보가 있는 경우 리스트에 video key 값을 append
-            movies.append(movie)
-    movie = random.sample(movies,1)[0]
-    trailer = 'https://www.youtube.com/embed/' + movie['video'][0]['key']
+    trailers = list(get_window()['trailers'])
+    random.shuffle(trailers)
+    for trailer in trailers:
+        # window 를 만든 뒤 삭제된 영화는 건너뛰기
+        data = trailer_data(trailer)
+        if data is not None:
+            return Response(data)
     data = {
-        'movie': movie,
-        'trailer' : trailer,
+        'detail': '예고편이 있는 최신 상영작이 없습니다.'
     }
-    return Response(data)
+    return Response(data, status=status.HTTP_404_NOT_FOUND)
 
 
 @api_view(['GET'])
+@cache_response(depends_on=(MOVIES, GENRES, RATINGS))
 def movie_popular(request, page):
     '''
     movie_popular
@@ -101,14 +153,19 @@ def movie_popular(request, page):
     
     max_page를 넘어가는 값을 page 로 주면 빈 리스트를 반환합니다.
 
-    '''
-    movies = Movie.objects.all().order_by('-popularity')
-    max_page = round(len(movies)/MOVIE_NUM)
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    ?sort=star_avg 를 주면 별점 평균순으로 정렬합니다. (기본 popularity)
 
-    movies = movies[page*MOVIE_NUM:page*MOVIE_NUM+MOVIE_NUM]
+    '''
+    movies = sort_movies(Movie.objects.all(), request.GET.get('sort', 'popularity'))
+    movies, max_page, next_cursor = paginate(
+        request, movies.for_list(), page, MOVIE_NUM
+    )
     serializer = MovieListSerializer(movies, many=True)
     data = {
         "max_page"  : max_page,
+        "next_cursor" : next_cursor,
         "movie_cnt" : MOVIE_NUM,
         "movies"    : serializer.data,
     }
@@ -116,6 +173,7 @@ def movie_popular(request, page):
 
 
 @api_view(['GET'])
+@cache_response(depends_on=(MOVIES, GENRES))
 def now_playing(request, page):
     '''
     now_playing
@@ -127,24 +185,21 @@ def now_playing(request, page):
     
     max_page를 넘어가는 값을 page 로 주면 빈 리스트를 반환합니다.
 
-    '''
-    today = dt.datetime.now()
-    start = today - dt.timedelta(30)
-    end = today + dt.timedelta(30)
-    movies = Movie.objects.all()\
-        .filter(
-            release_date__range=(start, end)
-        ).exclude(
-            poster_path__exact='',
-        ).order_by('-release_date')
-    max_page = round(len(movies)/MOVIE_NUM)
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
 
-    movies = movies[page*MOVIE_NUM:page*MOVIE_NUM+MOVIE_NUM]
-    serializer = MovieListSerializer(movies, many=True)
+    미리 계산해둔 window 의 영화 id 를 사용합니다. (movies/windows.py)
+
+    '''
+    movies, max_page, next_cursor = paginate_list(
+        request, get_window()['now_playing'], page, MOVIE_NUM
+    )
+    # 개수/별점은 최신 값으로 직렬화
+    movies = hydrate(movies)
     data = {
         "max_page"  : max_page, 
+        "next_cursor" : next_cursor,
         "movie_cnt" : MOVIE_NUM,
-        "movies"    : serializer.data,
+        "movies"    : movies,
     }
     return Response(data)
 
@@ -158,26 +213,14 @@ def my_movies(request):
     ---
 
     로그인 시 유저의 평점 정보 기반으로 영화 추천
-    * 장르 키워드로 임의의 영화 12개
+    * 장르 선호도(GenreAffinity) 상위 3개 장르의 점수 합이 높은 영화 12개
     * release_date 임의로 조절
     * 평점 순으로 정렬
     * vote_count가 100 이상
     '''
-    # 현재 유저의 객체 가져오기
-    from accounts.serializers import UserStarSerializer
-    user = get_object_or_404(User, pk=request.user.pk)
-    serializer = UserStarSerializer(user)
-
-    genres = Genre.objects.all().values_list()
-    genres_cnt = {genre[1]:0 for genre in genres}
-    
-    for movie in serializer.data['starrating_set']:
-        star = int(movie['star'])
-        # print(f'{star}점')
-        for genre in movie['movie']['genres']:
-            id, name = list(genre.values())
-            genres_cnt[name] += star
-    # print(genres_cnt)
+    # 유저의 장르 선호도 상위 3개 (별점 생성/수정/삭제 시 갱신됨)
+    genres = top_genres(request.user)
+    top3 = [genre.name for genre, score in genres]
 
     # DB에서 영화 데이터 가져오기
     today = dt.datetime.now()
@@ -193,28 +236,14 @@ def my_movies(request):
             vote_count__gt=100,
             release_date__range=(start, end)
         )
-    # print(len(movies)) # 3292개
 
-    gscore = sorted(genres_cnt.items(), key=lambda x:x[1], reverse=True)
-    my_movie = Movie.objects.none()
-    # print('---',gscore[0][1])
-    if gscore[0][1]:
-        top3 = list(g[0] for g in gscore[:3])
-        for gen in top3:
-            g = Genre.objects.get(name=gen)
-            gen_movies = movies.filter(genres=g)[:MOVIE_NUM/len(top3)]
-            my_movie |= gen_movies
-    else:
-        top3 = []
+    # 선호 장르 점수가 높은 영화를 한 번의 쿼리로 가져오기
+    my_movie = list(recommend(movies.for_list(), genres, MOVIE_NUM))
 
     # 전체 길이가 MOVIE_NUM 넘지 않는 경우 추가 데이터(평점순)를 뒤에 붙이기
-    end = 0
-    while len(my_movie) < MOVIE_NUM:
+    if len(my_movie) < MOVIE_NUM:
         num = MOVIE_NUM - len(my_movie)
-        tmp_list = movies[end:end+num]
-        my_movie |= tmp_list
-        end += num
-    print(len(my_movie))
+        my_movie += movies.exclude(pk__in=[movie.pk for movie in my_movie]).for_list()[:num]
 
     serializer = MovieListSerializer(my_movie, many=True)
 
@@ -226,6 +255,7 @@ def my_movies(request):
 
 
 @api_view(['GET'])
+@cache_response(depends_on=(MOVIES, GENRES, SHOTS))
 def shotest(request):
     '''
     shotest
@@ -241,27 +271,20 @@ def shotest(request):
     )
     # print(len(movies)) # 3292개
 
-    # shot이 있는 영화데이터를 추출
-    shotest = movies.exclude(shot=None)
+    # shot이 있는 영화데이터를 shot 개수 순으로 추출 (shot_cnt 인덱스 사용)
+    shotest = list(movies.filter(shot_cnt__gt=0).order_by('-shot_cnt', '-popularity'))
 
     # 전체 길이가 MOVIE_NUM 넘지 않는 경우 추가 데이터(인기순)를 뒤에 붙이기
-    today = dt.datetime.now()
-    start = today - dt.timedelta(days=3000)
-    end = today + dt.timedelta(300)
-    movies = movies.filter( # 추천을 위한 영화 필터링
-        vote_count__gt=100,
-        release_date__range=(start, end)
-    )
-
-    end = 0
-    while len(shotest) < MOVIE_NUM:
-        num = MOVIE_NUM - len(shotest)
-        tmp_list = movies[end:end+num]
-        shotest |= tmp_list
-        end += num
-
-    # 합친 쿼리셋을 shot 개수로 내림차순 정렬
-    shotest = shotest.annotate(shot_count=Count('shot')).order_by('-shot_count')
+    if len(shotest) < MOVIE_NUM:
+        today = dt.datetime.now()
+        start = today - dt.timedelta(days=3000)
+        end = today + dt.timedelta(300)
+        movies = movies.filter( # 추천을 위한 영화 필터링
+            vote_count__gt=100,
+            release_date__range=(start, end),
+            shot_cnt=0,
+        )
+        shotest += movies[:MOVIE_NUM - len(shotest)]
     
     # serializer 반환
     serializer = MovieListSerializer(shotest, many=True)
@@ -269,6 +292,7 @@ def shotest(request):
 
 
 @api_view(['GET'])
+@cache_response(depends_on=(MOVIES, GENRES, RATINGS))
 def search(request, page):
     '''
     search
@@ -278,6 +302,7 @@ def search(request, page):
     쿼리문을 통해 검색한 영화를 리턴하는 API
     {
         'title':'',
+        'query':'',
         'genre': ['액션', '애니메이션', '드라마'],
         'release_date_start': "2022-05-16",
         'release_date_end': "2022-05-16",
@@ -285,6 +310,11 @@ def search(request, page):
         'vote_average_end': 0,
     }
 
+    * title : 제목 검색, query : 제목+줄거리 검색 (둘 다 주면 둘 다 일치하는 영화)
+    * 검색 결과는 관련도 상위 MOVIE_SEARCH_LIMIT(기본 500)개까지 (넘으면 truncated = true)
+    * title/query 가 있으면 검색 관련도 순, 없으면 인기순으로 정렬
+    * sort : popularity(인기순), star_avg(별점 평균순) 를 주면 그 기준으로 정렬
+
     '''
     def get_value(request, key, default):
         # 쿼리스트링의 value 리턴
@@ -300,28 +330,27 @@ def search(request, page):
         backdrop_path__exact=''
     )
 
-    #### 제목 ####
+    #### 제목 / 검색어 (제목+줄거리) ####
+    # 검색 색인에서 관련도 순으로 영화 id 를 가져온다. (movies/search)
+    # 제목과 검색어를 같이 주면 두 조건을 모두 만족하는 영화
+    ranked_ids = None
+    terms = []
     title = get_value(request, 'title', '')
     if title:
-        searched &= searched.filter(
-            title__contains=title
-        )
-        # print('title: ',len(searched),title)
+        terms.append((title, ('title',)))
+    query = get_value(request, 'query', '')
+    if query:
+        terms.append((query, ('title', 'overview')))
+    if terms:
+        backend = get_backend()
+        ranked_ids = backend.search_all(terms)
+        searched &= searched.filter(pk__in=ranked_ids)
 
 
     #### 장르 ####
-    genres = get_value(request, 'genre', [])
+    genres = parse_genres(get_value(request, 'genre', ''))
     if genres:
-        genres = genres.strip('[').strip(']')\
-                        .replace('"','').replace("'",'')\
-                        .split(',')
-        genres = [genre.strip() for genre in genres]
-
-        for genre in genres:
-            g = Genre.objects.get(name=genre)
-            searched &= searched.filter(genres=g)
-            print(len(searched.filter(genres=g)))
-        # print('genres: ',len(searched),genres)
+        searched = filter_all_genres(searched, genres)
 
 
     #### 개봉일 ####
@@ -344,7 +373,7 @@ def search(request, page):
         # print('vote_average: ',len(searched),vote_average_start,vote_average_end)
 
     # 쿼리스트링이 없는 경우 (검색하기 전인 경우) 
-    if not title and not genres\
+    if not title and not query and not genres\
         and (not release_date_start or not release_date_start)\
         and (not vote_average_start or not vote_average_end):
         searched &= searched.filter(
@@ -353,22 +382,35 @@ def search(request, page):
         # print('no query: ',len(searched))
 
 
-    # 쿼리셋을 인기순으로 정렬
-    searched = searched.order_by('-popularity', '-release_date', '-vote_average')
+    sort = get_value(request, 'sort', '')
+    if sort:
+        searched = sort_movies(searched, sort)
+    elif ranked_ids is not None:
+        # 쿼리셋을 검색 관련도 순으로 정렬
+        searched = searched.annotate(search_rank=rank_expression(ranked_ids))\
+            .order_by('search_rank', 'pk')
+    else:
+        # 쿼리셋을 인기순으로 정렬
+        searched = searched.order_by('-popularity', '-release_date', '-vote_average', 'pk')
 
 
     # 결과 전송을 위한 serializer
-    max_page = round(len(searched)/MOVIE_NUM)
-    searched = searched[page*MOVIE_NUM:page*MOVIE_NUM+MOVIE_NUM]
+    searched, max_page, next_cursor = paginate(
+        request, searched.for_list(), page, MOVIE_NUM
+    )
     serializer = MovieListSerializer(searched, many=True)
     data = {
         "max_page"  : max_page,
+        "next_cursor" : next_cursor,
         "movies"    : serializer.data,
+        # 검색 결과가 MOVIE_SEARCH_LIMIT 개를 넘어서 관련도 상위 결과만 보여주는 경우 True
+        "truncated" : ranked_ids is not None and len(ranked_ids) >= backend.limit,
     }
     return Response(data)
 
 
 @api_view(['GET'])
+@cache_response(depends_on=(MOVIES, GENRES))
 def movies(request, page):
     '''
     movies
@@ -379,19 +421,20 @@ def movies(request, page):
     페이지 번호에 따라 평점이 높은 순으로 최신 상영작 20개씩 반환하는 API
     
     max_page를 넘어가는 값을 page 로 주면 빈 리스트를 반환합니다.
-    '''
-    today = dt.datetime.now()
-    start = today - dt.timedelta(30)
-    end = today + dt.timedelta(30)
-    movies = Movie.objects.all().order_by('-vote_average', '-release_date')\
-        .filter(release_date__range=(start, end))
-    max_page = round(len(movies)/MOVIE_NUM)
 
-    movies = movies[page*MOVIE_NUM:page*MOVIE_NUM+MOVIE_NUM]
-    serializer = MovieListSerializer(movies, many=True)
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
+    미리 계산해둔 window 의 영화 id 를 사용합니다. (movies/windows.py)
+    '''
+    movies, max_page, next_cursor = paginate_list(
+        request, get_window()['top_rated'], page, MOVIE_NUM
+    )
+    # 개수/별점은 최신 값으로 직렬화
+    movies = hydrate(movies)
     data = {
         "max_page"  : max_page, 
-        "movies"    : serializer.data,
+        "next_cursor" : next_cursor,
+        "movies"    : movies,
     }
     return Response(data)
 
@@ -406,9 +449,11 @@ def movie_detail(request, movie_id):
 
     * stars: 현재 접속중인 유저의 별점 평가 내역 있으면 같이 리턴, 없으면 ''를 리턴
     * movie : 영화 상세 정보
+        - 댓글/좋아요/별점은 개수(comments_cnt, like_cnt, star_cnt)와 평균(star_avg)만 리턴
+        - 목록은 comments/page/<page>/, stars/page/<page>/, like_users/page/<page>/ 에서 조회
 
     '''
-    movie = get_object_or_404(Movie, pk=movie_id)
+    movie = get_object_or_404(Movie.objects.for_detail(), pk=movie_id)
 
     # 별점 정보
     stars = ''
@@ -416,8 +461,7 @@ def movie_detail(request, movie_id):
     # request.user.id 값이 있는지 없는지를 검사
     # AnonymousUser 일때 id 값이 None 이기 때문에 TypeError 발생
     if request.user.id:
-        if movie.stars.filter(user=request.user).exists():
-            stars = list(movie.stars.values())[0]
+        stars = movie.stars.filter(user=request.user).values().first() or ''
     
     # 좋아요 상태 리턴
     is_liked = False
@@ -428,14 +472,15 @@ def movie_detail(request, movie_id):
     # 영화 포스터/트레일러 url
     have_trailer = False
     url_path = ''
-    if movie.video.values(): 
-        key = list(movie.video.values())[0]['key']
+    videos = movie.video.all()
+    if videos:
+        key = videos[0].key
         url_path = f'https://www.youtube.com/embed/{key}'
         have_trailer = True
     else:
         url_path = f'https://image.tmdb.org/t/p/original{movie.poster_path}'
     
-    serializer = MovieSerializer(movie)
+    serializer = MovieDetailSerializer(movie)
     data = {
         "have_trailer" : have_trailer,
         "url_path" : url_path,
@@ -446,27 +491,99 @@ def movie_detail(request, movie_id):
     return Response(data)
 
 
-@api_view(['POST'])
+@api_view(['POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def movie_likes(request, movie_id):
     '''
     movie_likes
 
     ---
-    [POST]
+    [POST] 좋아요 토글
+
+    [PUT] 좋아요 (이미 좋아요 상태면 그대로)
+
+    [DELETE] 좋아요 취소 (좋아요 상태가 아니면 그대로)
+
+    return { "is_liked": true, "like_cnt": 1 }
 
     '''
-    movie = get_object_or_404(Movie, pk=movie_id)
-    if movie.like_users.filter(pk=request.user.pk).exists():
-        movie.like_users.remove(request.user)
-        is_liked = False
-    else:
-        movie.like_users.add(request.user)
-        is_liked = True
-    serializer = MovieSerializer(movie)
+    if not Movie.objects.filter(pk=movie_id).exists():
+        raise Http404
+    is_liked, like_cnt = change_like(
+        Movie, movie_id, request.user, METHOD_ACTIONS[request.method]
+    )
     data = {
         'is_liked': is_liked,
-        'movie': serializer.data
+        'like_cnt': like_cnt,
+    }
+    return Response(data)
+
+
+def get_movie_id(movie_id):
+    # 없는 영화의 목록은 빈 목록 대신 404
+    return get_object_or_404(Movie.objects.values_list('pk', flat=True), pk=movie_id)
+
+
+@api_view(['GET'])
+def movie_like_users(request, movie_id, page):
+    '''
+    movie_like_users
+
+    ---
+    [GET] 영화에 좋아요를 누른 유저 목록 (페이지당 20개)
+
+    '''
+    # 좋아요를 누른 순서(최신순)로 정렬하기 위해 중간 테이블을 조회
+    likes = Movie.like_users.through.objects.filter(movie_id=get_movie_id(movie_id))\
+        .select_related('user').order_by('-pk')
+    likes, max_page, next_cursor = paginate(request, likes, page, PAGE_NUM)
+    serializer = UserSerializer([like.user for like in likes], many=True)
+    data = {
+        "max_page"  : max_page,
+        "next_cursor" : next_cursor,
+        "like_users" : serializer.data,
+    }
+    return Response(data)
+
+
+@api_view(['GET'])
+def movie_comments(request, movie_id, page):
+    '''
+    movie_comments
+
+    ---
+    [GET] 영화 댓글 목록 (최신순, 페이지당 20개)
+
+    '''
+    comments = MovieComment.objects.filter(movie_id=get_movie_id(movie_id))\
+        .select_related('user').order_by('-pk')
+    comments, max_page, next_cursor = paginate(request, comments, page, PAGE_NUM)
+    serializer = MovieCommentSerializer(comments, many=True)
+    data = {
+        "max_page"  : max_page,
+        "next_cursor" : next_cursor,
+        "comments" : serializer.data,
+    }
+    return Response(data)
+
+
+@api_view(['GET'])
+def movie_stars(request, movie_id, page):
+    '''
+    movie_stars
+
+    ---
+    [GET] 영화 별점 목록 (최신순, 페이지당 20개)
+
+    '''
+    stars = StarRating.objects.filter(movie_id=get_movie_id(movie_id))\
+        .select_related('user').order_by('-pk')
+    stars, max_page, next_cursor = paginate(request, stars, page, PAGE_NUM)
+    serializer = MovieStarSerializer(stars, many=True)
+    data = {
+        "max_page"  : max_page,
+        "next_cursor" : next_cursor,
+        "stars" : serializer.data,
     }
     return Response(data)
 
@@ -480,13 +597,16 @@ def movie_comment_create(request, movie_id):
     ---
     [POST]
 
+    생성한 댓글을 리턴
+
     '''
     movie = get_object_or_404(Movie, pk=movie_id)
     serializer = MovieCommentSerializer(data=request.data)
     if serializer.is_valid(raise_exception=True):
-        serializer.save(movie=movie, user=request.user)
-        res = MovieSerializer(movie)
-        return Response(res.data['comments'], status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            serializer.save(movie=movie, user=request.user)
+            update_counters(Movie, movie.pk, comments_cnt=1)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT', 'DELETE'])
@@ -499,25 +619,24 @@ def movie_update_or_delete(request, movie_id, comment_id):
     [PUT]
 
     * content
+    * 수정한 댓글을 리턴
 
     [DELETE]
 
     '''
-    comment = get_object_or_404(MovieComment, pk=comment_id)
+    comment = get_object_or_404(MovieComment, pk=comment_id, movie_id=movie_id)
     
     def comment_update():
         serializer = MovieCommentSerializer(comment, request.data)
         if serializer.is_valid(raise_exception=True):
             serializer.save()
-            movie = get_object_or_404(Movie, pk=movie_id)
-            res = MovieSerializer(movie)
-            return Response(res.data['comments'])
+            return Response(serializer.data)
 
     def comment_delete():
-        comment.delete()
-        movie = get_object_or_404(Movie, pk=movie_id)
-        res = MovieSerializer(movie)
-        return Response(res.data['comments'])
+        with transaction.atomic():
+            comment.delete()
+            update_counters(Movie, movie_id, comments_cnt=-1)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     if request.method == 'PUT':
         return comment_update()
@@ -534,33 +653,27 @@ def movie_star_rating(request, movie_id):
     ---
     [POST]
 
-    * 별점 생성, 수정 시 사용
+    * 별점 생성, 수정 시 사용 (유저/영화별로 하나만 저장)
+    * 저장된 별점을 리턴 { "id", "user", "star", "created_at", "updated_at" }
     
     [DELETE]
     
     * 별점 삭제
 
     '''
-    movie = get_object_or_404(Movie, pk=movie_id)
-
     def star_update():
-        if movie.stars.filter(user=request.user):
-            existed_star = list(movie.stars.filter(user=request.user).values())[0]
-            star_id = existed_star['id']
-            star = get_object_or_404(StarRating, pk=star_id)
-            serializer = StarSerializer(star, request.data)
-        else:
-            serializer = StarSerializer(data=request.data)
-        
+        serializer = MovieStarSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save(movie=movie, user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            star = rate_movie(request.user, movie_id, serializer.validated_data['star'])
+            return Response(MovieStarSerializer(star).data, status=status.HTTP_201_CREATED)
 
     def star_delete():
-        if movie.stars.filter(user=request.user):
-            star = movie.stars.filter(user=request.user)
-            star.delete()
+        if unrate_movie(request.user, movie_id):
             return Response(status=status.HTTP_204_NO_CONTENT)
+        data = {
+            'detail': '별점 평가 내역이 없습니다.'
+        }
+        return Response(data, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'POST':
         return star_update()
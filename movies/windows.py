@@ -0,0 +1,125 @@
+'''
+최신 상영작(개봉일 기준 ±30일) window
+
+now_playing, movies, movie_trailer API 는 요청마다 window 조건으로 영화 테이블을 정렬하지 않고
+미리 계산해둔 window 를 사용한다.
+
+* window 에는 정렬된 영화 id 와 예고편 key 만 저장
+    - 페이지의 영화는 요청마다 id 로 조회해서 직렬화 (shot_cnt, like_cnt, star_avg 등은 항상 최신 값)
+* python manage.py refresh_movie_window 로 갱신 (스케줄러에서 주기적으로 실행)
+* 계산 결과는 MovieWindow 테이블에 저장하고, 각 프로세스는 캐시에 올려서 사용
+* 스냅샷이 WINDOW_MAX_AGE 보다 오래되었으면 요청 시 다시 계산
+    - 동시에 여러 요청이 다시 계산하지 않도록 cache.add 로 잠그고,
+      잠금을 얻지 못한 요청은 이전 스냅샷을 사용
+'''
+import datetime as dt
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Movie, MovieWindow
+from .serailizers import MovieDetailSerializer, MovieListSerializer
+
+WINDOW_NAME = 'now_playing'
+CACHE_KEY = 'movies:window:' + WINDOW_NAME
+LOCK_KEY = CACHE_KEY + ':lock'
+# 저장 형식 (형식이 다른 예전 스냅샷은 다시 계산)
+WINDOW_VERSION = 2
+# 프로세스 캐시 유지 시간 (초) / 스냅샷 최대 유지 시간 / 재계산 잠금 시간 (초)
+CACHE_TIMEOUT = getattr(settings, 'MOVIE_WINDOW_CACHE_TIMEOUT', 60 * 5)
+WINDOW_MAX_AGE = dt.timedelta(seconds=getattr(settings, 'MOVIE_WINDOW_MAX_AGE', 60 * 60 * 24))
+LOCK_TIMEOUT = 60
+# 예고편 후보로 사용할 최신 영화 수
+TRAILER_NUM = 20
+
+
+def build_window():
+    '''
+    window 에 들어갈 영화 id 목록을 계산
+
+    * now_playing : 포스터가 있는 영화, 개봉일 최신순
+    * top_rated : 평점순, 개봉일 최신순
+    * trailers : 최신 영화 20개 중 예고편이 있는 영화의 id 와 예고편 key
+    '''
+    today = dt.datetime.now()
+    start = today - dt.timedelta(30)
+    end = today + dt.timedelta(30)
+    movies = Movie.objects.filter(release_date__range=(start, end))
+
+    now_playing = movies.exclude(poster_path__exact='')\
+        .order_by('-release_date', 'pk').values_list('pk', flat=True)
+    top_rated = movies.order_by('-vote_average', '-release_date', 'pk').values_list('pk', flat=True)
+
+    trailers = []
+    latest = movies.order_by('-release_date').prefetch_related('video').only('pk')[:TRAILER_NUM]
+    for movie in latest:
+        videos = movie.video.all()
+        if videos: # 비디오 정보가 있는 경우만 예고편 후보로 사용
+            trailers.append({'movie_id': movie.pk, 'key': videos[0].key})
+
+    return {
+        'version': WINDOW_VERSION,
+        'now_playing': list(now_playing),
+        'top_rated': list(top_rated),
+        'trailers': trailers,
+    }
+
+
+def refresh_window():
+    '''
+    window 를 다시 계산해서 스냅샷과 캐시에 저장
+    '''
+    window = build_window()
+    MovieWindow.objects.update_or_create(
+        name=WINDOW_NAME, defaults={'data': window}
+    )
+    cache.set(CACHE_KEY, window, CACHE_TIMEOUT)
+    return window
+
+
+def get_window():
+    '''
+    캐시 → 스냅샷 → 재계산 순서로 window 를 가져온다.
+    '''
+    window = cache.get(CACHE_KEY)
+    if window is not None:
+        return window
+
+    snapshot = MovieWindow.objects.filter(name=WINDOW_NAME).first()
+    if snapshot is not None and snapshot.data.get('version') != WINDOW_VERSION:
+        snapshot = None
+    if snapshot is None or timezone.now() - snapshot.refreshed_at > WINDOW_MAX_AGE:
+        # 한 요청만 다시 계산 (스냅샷이 아예 없으면 기다리지 않고 직접 계산)
+        if cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+            try:
+                return refresh_window()
+            finally:
+                cache.delete(LOCK_KEY)
+        if snapshot is None:
+            return build_window()
+    cache.set(CACHE_KEY, snapshot.data, CACHE_TIMEOUT)
+    return snapshot.data
+
+
+def hydrate(movie_ids):
+    '''
+    window 의 영화 id 목록 → MovieListSerializer 데이터 (id 순서 유지)
+    '''
+    movies = Movie.objects.filter(pk__in=movie_ids).for_list().in_bulk()
+    return MovieListSerializer([movies[pk] for pk in movie_ids if pk in movies], many=True).data
+
+
+def trailer_data(trailer):
+    '''
+    window 의 예고편 → {'movie': MovieDetailSerializer 데이터, 'trailer': url}
+
+    영화가 삭제되었으면 None
+    '''
+    movie = Movie.objects.for_detail().filter(pk=trailer['movie_id']).first()
+    if movie is None:
+        return None
+    return {
+        'movie': MovieDetailSerializer(movie).data,
+        'trailer': 'https://www.youtube.com/embed/' + trailer['key'],
+    }
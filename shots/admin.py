@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import Shot, ShotComment
+from .models import Shot, ShotComment, StoredImage, TimelineEntry
 
 
 # Register your models here.
 admin.site.register(Shot)
-admin.site.register(ShotComment)
\ No newline at end of file
+admin.site.register(ShotComment)
+admin.site.register(TimelineEntry)
+admin.site.register(StoredImage)
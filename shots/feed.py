@@ -0,0 +1,103 @@
+'''
+shot 목록(feed) 조회
+
+한 페이지의 shot 에 필요한 부가 정보를 shot 수와 무관한 쿼리 수로 가져온다.
+
+* 좋아요 여부 : 페이지의 shot id 로 한 번의 IN 쿼리
+* 미리보기 댓글 : shot 마다 최신 댓글 N 개를 한 번의 쿼리로 조회
+
+무한 스크롤 feed 는 ?before=<shot id> cursor 로 그 shot 보다 오래된 shot 을 가져온다.
+(offset 없이 id 인덱스에서 바로 시작하기 때문에 뒤쪽 페이지도 첫 페이지와 같은 비용)
+'''
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
+from rest_framework.exceptions import ValidationError
+
+from .models import Shot, ShotComment
+
+# shot 목록에서 함께 보여줄 최신 댓글 수
+PREVIEW_COMMENT_NUM = 3
+# feed 한 번에 가져오는 shot 수 (기본 / 최대)
+FEED_NUM = 20
+MAX_FEED_NUM = 50
+
+
+def parse_feed_params(request):
+    '''
+    쿼리스트링의 before, limit 파싱 → (before, limit)
+    '''
+    before = request.GET.get('before')
+    try:
+        before = int(before) if before else None
+        limit = min(int(request.GET.get('limit', FEED_NUM)), MAX_FEED_NUM)
+    except ValueError:
+        raise ValidationError({'before': 'before, limit 은 정수입니다.'})
+    if limit < 1:
+        raise ValidationError({'limit': 'limit 은 1 이상입니다.'})
+    return before, limit
+
+
+def following_shots(user):
+    '''
+    user 가 팔로우하는 유저들의 shot
+
+    팔로잉 id 목록을 파이썬으로 가져오지 않고 subquery 로 넘기기 때문에
+    팔로잉이 수천 명이어도 파라미터 수와 무관하게 한 번의 쿼리로 조회하고,
+    유저별 shot 은 (user, -id) 인덱스에서 id 역순으로 읽는다.
+    '''
+    followings = get_user_model().followings.through.objects\
+        .filter(from_user=user).values('to_user')
+    return Shot.objects.filter(user__in=Subquery(followings))
+
+
+def feed_page(shots, before, limit):
+    '''
+    before 보다 오래된 shot 을 최신순으로 limit 개
+
+    return (shot 리스트, next_before)
+    * next_before : 다음 요청의 before 값 (마지막 페이지인 경우 None)
+    '''
+    if before is not None:
+        shots = shots.filter(pk__lt=before)
+    shots = list(shots.order_by('-pk')[:limit])
+    next_before = shots[-1].pk if len(shots) == limit else None
+    return shots, next_before
+
+
+def liked_shot_ids(user, shot_ids):
+    '''
+    shot_ids 중 user 가 좋아요한 shot id 집합
+    '''
+    if not user.is_authenticated:
+        return set()
+    likes = Shot.like_users.through.objects.filter(user=user, shot_id__in=shot_ids)
+    return set(likes.values_list('shot_id', flat=True))
+
+
+def preview_comments(shot_ids, num=PREVIEW_COMMENT_NUM):
+    '''
+    {shot id: [최신 댓글 num 개], ...}
+    '''
+    comments = {shot_id: [] for shot_id in shot_ids}
+    if not num or not shot_ids:
+        return comments
+    latest = ShotComment.objects.filter(shot=OuterRef('shot'))\
+        .order_by('-pk').values('pk')[:num]
+    rows = ShotComment.objects.filter(shot_id__in=shot_ids, pk__in=Subquery(latest))\
+        .select_related('user').order_by('-pk')
+    for comment in rows:
+        comments[comment.shot_id].append(comment)
+    return comments
+
+
+def attach_feed_data(shots, user, num=PREVIEW_COMMENT_NUM):
+    '''
+    shots 에 is_liked, preview_comments 속성을 붙인다.
+    '''
+    shot_ids = [shot.pk for shot in shots]
+    liked = liked_shot_ids(user, shot_ids)
+    comments = preview_comments(shot_ids, num)
+    for shot in shots:
+        shot.is_liked = shot.pk in liked
+        shot.preview_comments = comments[shot.pk]
+    return shots
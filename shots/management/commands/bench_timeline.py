@@ -0,0 +1,97 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from shots import timeline
+from shots.feed import feed_page, following_shots
+from shots.models import Shot, TimelineEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        '팔로잉 feed 를 읽을 때 계산하는 방식(fan-out-on-read)과 '
+        'shot 생성 시 timeline 에 넣어두는 방식(fan-out-on-write)을 비교합니다. '
+        '(데이터는 트랜잭션 안에서 만들고 끝나면 rollback)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=10000, help='인기 유저의 팔로워 수')
+        parser.add_argument('--followings', type=int, default=2000, help='feed 를 읽는 유저의 팔로잉 수')
+        parser.add_argument('--shots', type=int, default=5, help='팔로잉 유저별 shot 수')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, func, repeat):
+        elapsed = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                result = func()
+                elapsed += time.perf_counter() - start
+        return elapsed / repeat * 1000, len(ctx.captured_queries), result
+
+    def create_users(self, prefix, num):
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', password='!') for i in range(num)], batch_size=1000
+        )
+        return list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        Follow = User.followings.through
+        reader = User.objects.create(username='bench_reader', password='!')
+        author = User.objects.create(username='bench_author', password='!')
+
+        # 인기 유저와 팔로워 (reader 도 팔로워)
+        followers = self.create_users('bench_follower', options['followers'] - 1) + [reader.pk]
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=pk, to_user_id=author.pk) for pk in followers], batch_size=1000
+        )
+
+        # reader 가 팔로우하는 유저들과 shot
+        followings = self.create_users('bench_following', options['followings'])
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=reader.pk, to_user_id=pk) for pk in followings], batch_size=1000
+        )
+        Shot.objects.bulk_create(
+            [Shot(user_id=pk, title='bench', content='bench')
+             for _ in range(options['shots']) for pk in followings],
+            batch_size=1000,
+        )
+        for pk in followings:
+            timeline.backfill(reader.pk, pk)
+
+        repeat = options['repeat']
+        self.stdout.write(
+            f'followers={len(followers)} followings={len(followings)} '
+            f'timeline={TimelineEntry.objects.filter(user=reader).count()}'
+        )
+        self.stdout.write(f'{"":<24} {"ms":>9} {"queries":>7}')
+
+        # 쓰기 : shot 1개 생성 시 팔로워 timeline 에 fan-out
+        shot = Shot.objects.create(user=author, title='bench', content='bench')
+        write_ms, write_queries, _ = self.measure(lambda: timeline.fan_out(shot.pk, author.pk), 1)
+        self.stdout.write(f'{"fan-out write (1 shot)":<24} {write_ms:>9.2f} {write_queries:>7}')
+
+        # 읽기 : 팔로잉 feed 첫 페이지 / 뒤쪽 페이지
+        read = lambda before: feed_page(following_shots(reader).for_feed(), before, 20)[0]
+        write = lambda before: timeline.timeline_page(reader, before, 20)[0]
+        first = read(None)
+        before = first[len(first) // 2].pk if first else None
+        for name, func in (('fan-out-on-read', read), ('fan-out-on-write', write)):
+            for label, cursor in (('first', None), ('before', before)):
+                ms, queries, shots = self.measure(lambda: func(cursor), repeat)
+                self.stdout.write(f'{name + " " + label:<24} {ms:>9.2f} {queries:>7}')
+
+        read_ids = [shot.pk for shot in read(None)]
+        write_ids = [shot.pk for shot in write(None)]
+        if read_ids != write_ids:
+            self.stderr.write('두 방식의 결과가 다릅니다.')
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+from config import images
+from shots.models import Shot
+from shots.uploads import recover_stale
+
+# (모델, 이미지 필드, variants 필드)
+IMAGE_FIELDS = [
+    (Shot, 'image', 'image_variants'),
+    (User, 'profile_image', 'profile_image_variants'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'shot 이미지 / 프로필 이미지 중 크기별 variant 가 없는 이미지를 변환합니다. '
+        '저장 중(processing)으로 남은 shot 이미지는 다시 저장하거나 실패로 처리합니다.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes', type=int, default=30,
+            help='이 시간보다 오래 processing 인 shot 과 spool 파일을 정리 (기본 30분)',
+        )
+
+    def handle(self, *args, **options):
+        result = recover_stale(timezone.now() - timedelta(minutes=options['stale_minutes']))
+        self.stdout.write(
+            f'저장 중인 shot 이미지: {result["stored"]}개 다시 저장, {result["failed"]}개 실패 처리, '
+            f'spool 파일 {result["removed"]}개 삭제'
+        )
+        for model, field_name, variants_field in IMAGE_FIELDS:
+            instances = model.objects.exclude(**{field_name: ''})\
+                .only('pk', field_name, variants_field).iterator()
+            count = 0
+            for instance in instances:
+                if images.needs_processing(instance, field_name, variants_field):
+                    images.process(model._meta.label, instance.pk, field_name, variants_field)
+                    count += 1
+            self.stdout.write(f'{model.__name__}.{field_name}: {count}개 변환')
+        self.stdout.write(self.style.SUCCESS('이미지 변환을 마쳤습니다.'))
@@ -0,0 +1,89 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from config import dedup
+from config.db import upsert_many
+from shots.models import StoredImage
+from .process_images import IMAGE_FIELDS
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        '이미지 파일의 참조 수(StoredImage)를 shot / 유저 row 로부터 다시 세고, '
+        '참조되지 않는 파일을 삭제합니다.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='삭제하지 않고 개수만 출력')
+        parser.add_argument(
+            '--scan', action='store_true',
+            help=f'storage 의 {dedup.PREFIX}/ 디렉토리에서 참조 수 기록이 없는 파일도 찾아서 삭제',
+        )
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='--scan 에서 이 시간 안에 저장된 파일은 업로드 중일 수 있어서 남겨둠 (기본 60분)',
+        )
+
+    def handle(self, *args, **options):
+        counts = self.count_references()
+        self.recount(counts, options['dry_run'])
+        orphans = list(StoredImage.objects.filter(ref_cnt=0).values_list('name', flat=True))
+        if not options['dry_run']:
+            orphans = dedup.delete_unreferenced(dedup.content_storage, orphans)
+        self.stdout.write(f'참조되지 않는 파일: {len(orphans)}개 삭제')
+
+        if options['scan']:
+            before = timezone.now() - timedelta(minutes=options['grace_minutes'])
+            # 선점만 되고 아직 참조되지 않은 파일은 기록이 있어서 남겨둠
+            stored = set(StoredImage.objects.values_list('name', flat=True))
+            unknown = [
+                name for name in self.walk(dedup.PREFIX)
+                if name not in counts and name not in stored
+                and dedup.content_storage.get_modified_time(name) < before
+            ]
+            if not options['dry_run']:
+                for name in unknown:
+                    dedup.content_storage.delete(name)
+            self.stdout.write(f'기록이 없는 파일: {len(unknown)}개 삭제')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('이미지 파일을 정리했습니다.'))
+
+    def count_references(self):
+        '''
+        return Counter({파일 이름: 참조하는 row 수})
+        '''
+        counts = Counter()
+        for model, field_name, variants_field in IMAGE_FIELDS:
+            rows = model.objects.exclude(**{field_name: ''})\
+                .values_list(field_name, variants_field).iterator()
+            for name, variants in rows:
+                counts.update(dedup.referenced_names(name, variants))
+        return counts
+
+    def recount(self, counts, dry_run):
+        stored = dict(StoredImage.objects.values_list('name', 'ref_cnt').iterator())
+        drifted = [
+            {'name': name, 'ref_cnt': count}
+            for name, count in counts.items() if stored.get(name) != count
+        ]
+        unreferenced = [name for name, count in stored.items() if count and name not in counts]
+        self.stdout.write(f'StoredImage.ref_cnt: {len(drifted) + len(unreferenced)}개 불일치')
+        if dry_run:
+            return
+        with transaction.atomic():
+            upsert_many(StoredImage, drifted, ('name',), ['ref_cnt'], batch_size=BATCH_SIZE)
+            for i in range(0, len(unreferenced), BATCH_SIZE):
+                StoredImage.objects.filter(name__in=unreferenced[i:i+BATCH_SIZE]).update(ref_cnt=0)
+
+    def walk(self, path):
+        directories, files = dedup.content_storage.listdir(path)
+        for name in files:
+            yield f'{path}/{name}'
+        for directory in directories:
+            yield from self.walk(f'{path}/{directory}')
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shots', '0006_alter_shot_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shot',
+            index=models.Index(fields=['user', '-id'], name='shot_user_id_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 15:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(cnt=Count('pk')).values('cnt')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    # shot 좋아요/댓글 수, 영화별 shot 수 채우기
+    Shot = apps.get_model('shots', 'Shot')
+    ShotComment = apps.get_model('shots', 'ShotComment')
+    Movie = apps.get_model('movies', 'Movie')
+    Shot.objects.update(
+        like_cnt=count_of(Shot.like_users.through, 'shot'),
+        comments_cnt=count_of(ShotComment, 'shot'),
+    )
+    Movie.objects.update(shot_cnt=count_of(Shot, 'movie'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_counters'),
+        ('shots', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shot',
+            name='comments_cnt',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shot',
+            name='like_cnt',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
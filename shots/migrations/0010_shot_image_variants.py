@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shots', '0009_shot_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shot',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
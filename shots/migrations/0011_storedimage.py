@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 16:15
+
+import config.dedup
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shots', '0010_shot_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_cnt', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='shot',
+            name='image',
+            field=models.ImageField(blank=True, storage=config.dedup.ContentAddressedStorage(), upload_to=''),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shots', '0011_storedimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shot',
+            name='image_status',
+            field=models.CharField(choices=[('ready', '저장 완료'), ('processing', '저장 중'), ('failed', '저장 실패')], default='ready', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shots', '0012_shot_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedimage',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shots', '0013_storedimage_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shot',
+            name='image_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
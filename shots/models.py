@@ -1,25 +1,54 @@
 from django.db import models
 from django.conf import settings
+from config.dedup import content_storage
 from movies.models import Movie
-import os
+
+
+class ShotQuerySet(models.QuerySet):
+    def for_feed(self):
+        '''
+        ShotListSerializer 로 직렬화하기 위한 쿼리셋
+
+        * 작성자, 영화는 JOIN 으로 함께 조회
+        * 좋아요/댓글 수는 like_cnt, comments_cnt 컬럼을 사용
+        '''
+        return self.select_related('user', 'movie')
 
 
 class Shot(models.Model):
+    # 이미지 업로드 상태 (요청이 끝난 뒤 storage 에 저장, shots/uploads.py)
+    IMAGE_READY = 'ready'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [(IMAGE_READY, '저장 완료'), (IMAGE_PROCESSING, '저장 중'), (IMAGE_FAILED, '저장 실패')]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=100)
     content = models.TextField()
-    image = models.ImageField(blank=True)
+    # 같은 내용의 이미지는 한 번만 저장 (config/dedup.py)
+    image = models.ImageField(blank=True, storage=content_storage)
+    # 이미지 크기별 WebP/JPEG 파일 (저장 후 config/images.py 에서 변환)
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default=IMAGE_READY)
+    # 저장 중인 업로드의 id (shots/uploads.py, 마지막 업로드만 반영)
+    image_token = models.UUIDField(null=True, blank=True, editable=False)
     movie_char = models.CharField(max_length=100, blank=True)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, null=True)
     like_users = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='like_shots')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
-    # def delete(self, *args, **kargs): # (local) DB 삭제하는 경우 저장한 이미지도 삭제하기 위해
-    #     if self.image:
-    #         os.remove(os.path.join(settings.MEDIA_ROOT, self.image.path))
-    #     super(Shot, self).delete(*args, **kargs)
-    
+    # 좋아요/댓글 수 (생성/삭제 시 F() 로 갱신, reconcile_counters 로 보정)
+    like_cnt = models.PositiveIntegerField(default=0, db_index=True)
+    comments_cnt = models.PositiveIntegerField(default=0)
+
+    objects = ShotQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # 팔로잉 feed : 유저별 최신 shot 을 id 역순으로 조회
+            models.Index(fields=['user', '-id'], name='shot_user_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -32,4 +61,37 @@ class ShotComment(models.Model):
     shot = models.ForeignKey(Shot, on_delete=models.CASCADE, related_name='comments')
 
     def __str__(self):
-        return self.user
\ No newline at end of file
+        return self.user
+
+class TimelineEntry(models.Model):
+    '''
+    팔로워의 shot timeline (fan-out-on-write)
+
+    shot 이 생성되면 팔로워들의 timeline 에 shot id 를 넣어둔다. (작성자 본인의 timeline 에는 넣지 않음)
+    (SHOT_TIMELINE_ENABLED 설정 시 사용, shots/timeline.py)
+    '''
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    shot = models.ForeignKey(Shot, on_delete=models.CASCADE, related_name='timeline_entries')
+
+    class Meta:
+        constraints = [
+            # (user, shot) 인덱스로 유저의 timeline 을 shot id 역순으로 조회
+            models.UniqueConstraint(fields=['user', 'shot'], name='unique_user_timeline_shot'),
+        ]
+
+
+class StoredImage(models.Model):
+    '''
+    내용 hash 로 저장한 이미지 파일의 참조 수
+
+    shot / 유저 row 가 파일(원본, variant)을 가리키는 수 (config/dedup.py)
+    0 이 되면 파일과 함께 삭제하고, reclaim_images 명령으로 보정한다.
+    '''
+    name = models.CharField(max_length=255, unique=True)
+    ref_cnt = models.PositiveIntegerField(default=0)
+    # 저장/재사용하려고 선점한 시각 (참조 수를 올리면 None)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_cnt})'
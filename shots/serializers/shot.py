@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from config.images import ImageVariantsField
 from movies.models import Movie
-from ..models import Shot
+from ..models import Shot, ShotComment
 from .shot_comment import ShotCommentSerializer
 
 User = get_user_model()
@@ -25,23 +26,40 @@ class ShotSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     movie = MovieSerializer(read_only=True)
     comments = ShotCommentSerializer(many=True, read_only=True)
-    comments_cnt = serializers.IntegerField(source='comments.count', read_only=True)
     like_users = UserSerializer(many=True, read_only=True)
-    like_cnt = serializers.IntegerField(source='like_users.count', read_only=True)
     image = serializers.ImageField(use_url=True, required=False)
+    # 크기별 WebP/JPEG URL (변환이 끝나기 전에는 빈 dict)
+    image_variants = ImageVariantsField(image_field='image')
     
     class Meta:
         model = Shot
-        fields = '__all__'
+        exclude = ('image_token',)
+        read_only_fields = ('like_cnt', 'comments_cnt', 'image_status')
+
+class ShotPreviewCommentSerializer(serializers.ModelSerializer):
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = ShotComment
+        fields = ('id', 'user', 'content', 'created_at',)
+
 
 class ShotListSerializer(serializers.ModelSerializer):
+    '''
+    shot 목록용 serializer
+
+    Shot.objects.for_feed() 쿼리셋에 feed.attach_feed_data() 를 적용한 shot 을 직렬화한다.
+    (좋아요 유저 목록 대신 개수, 전체 댓글 대신 최신 댓글 몇 개만 포함)
+    '''
     user = UserSerializer(read_only=True)
     movie = MovieSerializer(read_only=True)
-    comments = ShotCommentSerializer(many=True, read_only=True)
-    comments_cnt = serializers.IntegerField(source='comments.count', read_only=True)
-    like_users = UserSerializer(many=True, read_only=True)
-    like_cnt = serializers.IntegerField(source='like_users.count', read_only=True)
+    comments = ShotPreviewCommentSerializer(source='preview_comments', many=True, read_only=True)
+    is_liked = serializers.BooleanField(read_only=True)
+    image_variants = ImageVariantsField(image_field='image')
     
     class Meta:
         model = Shot
-        fields = '__all__'
\ No newline at end of file
+        fields = (
+            'id', 'user', 'movie', 'title', 'content', 'image', 'image_status', 'image_variants', 'movie_char',
+            'created_at', 'updated_at', 'comments', 'comments_cnt', 'like_cnt', 'is_liked',
+        )
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from config import cache, dedup, images
+from . import timeline
+from .models import Shot
+
+
+@receiver(post_save, sender=Shot)
+@receiver(post_delete, sender=Shot)
+def invalidate_response_cache(sender, **kwargs):
+    # shot 수로 정렬하는 shotest 응답 캐시 무효화 (config/cache.py)
+    cache.invalidate(cache.SHOTS)
+
+
+@receiver(post_save, sender=Shot)
+def fan_out_shot(sender, instance, created, **kwargs):
+    # 팔로워들의 timeline 에 새 shot 추가 (shots/timeline.py)
+    if created and timeline.enabled():
+        timeline.schedule_fan_out(instance)
+
+
+@receiver(post_save, sender=Shot)
+def process_shot_image(sender, instance, **kwargs):
+    # 이미지가 새로 저장되면 크기별 variant 생성 (config/images.py)
+    images.schedule_processing(instance, 'image', 'image_variants')
+
+
+@receiver(pre_save, sender=Shot)
+def remember_shot_image(sender, instance, update_fields, **kwargs):
+    dedup.before_save(instance, 'image', 'image_variants', update_fields)
+
+
+@receiver(post_save, sender=Shot)
+def count_shot_image(sender, instance, update_fields, **kwargs):
+    # 바뀐 이미지 파일의 참조 수 변경 (config/dedup.py)
+    dedup.after_save(instance, 'image', 'image_variants', update_fields)
+
+
+@receiver(post_delete, sender=Shot)
+def release_shot_image(sender, instance, **kwargs):
+    # 참조하는 shot / 유저가 없는 이미지 파일은 commit 후 삭제
+    dedup.after_delete(instance, 'image', 'image_variants')
+
+
+@receiver(post_delete, sender=Shot)
+def discard_shot(sender, instance, **kwargs):
+    if timeline.enabled():
+        timeline.store.discard(instance.pk)
+
+
+@receiver(m2m_changed, sender=get_user_model().followings.through)
+def sync_timeline(sender, instance, action, reverse, pk_set, **kwargs):
+    # 팔로우하면 상대의 최신 shot 을 채우고, 언팔로우하면 뺀다.
+    if not timeline.enabled() or action not in ('post_add', 'post_remove'):
+        return
+    sync = timeline.backfill if action == 'post_add' else timeline.unfollow
+    for pk in pk_set:
+        # reverse : you.followers.add(me) 처럼 팔로우 당하는 쪽에서 호출
+        user_id, followee_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+        sync(user_id, followee_id)
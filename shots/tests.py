@@ -1,3 +1,502 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from config import dedup
+from . import timeline
+from .models import Shot, ShotComment, StoredImage, TimelineEntry
+from .serializers.shot import ShotSerializer
+from .uploads import save_shot
+
+
+class ShotFeedQueryTest(TestCase):
+    '''
+    shot 목록 API 의 쿼리 수가 페이지에 담긴 shot 수와 무관한지 확인
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def create_shots(self, n):
+        for i in range(n):
+            shot = Shot.objects.create(user=self.user, title=f'shot{i}', content='content')
+            for j in range(5):
+                ShotComment.objects.create(user=self.user, shot=shot, content=f'comment{j}')
+            if i % 2:
+                shot.like_users.add(self.user)
+        # ORM 으로 직접 만든 데이터의 개수 컬럼 맞추기
+        call_command('reconcile_counters', stdout=StringIO())
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_feed_query_count_is_constant(self):
+        self.create_shots(2)
+        small, _ = self.count_queries('/api/v1/shots/page/0/')
+        self.create_shots(10)
+        large, response = self.count_queries('/api/v1/shots/page/0/')
+
+        self.assertEqual(small, large)
+        shots = response.data['shots']
+        self.assertEqual(len(shots), 12)
+        self.assertEqual([shot['is_liked'] for shot in shots], response.data['is_liked'])
+        self.assertEqual(shots[0]['comments_cnt'], 5)
+        self.assertEqual(len(shots[0]['comments']), 3)
+        self.assertEqual(shots[0]['comments'][0]['content'], 'comment4')
+        self.assertEqual(shots[0]['like_cnt'], 1)
+        self.assertTrue(shots[0]['is_liked'])
+        self.assertFalse(shots[1]['is_liked'])
+
+
+class ShotFollowingFeedTest(TestCase):
+    '''
+    팔로잉 feed 가 before cursor 로 끝까지 조회되는지 확인
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.followed = User.objects.create_user(username='followed', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        self.user.followings.add(self.followed)
+        for i in range(5):
+            Shot.objects.create(user=self.followed, title=f'shot{i}', content='content')
+            Shot.objects.create(user=self.other, title=f'other{i}', content='content')
+
+    def test_following_feed_pages_with_before_cursor(self):
+        expected = list(
+            Shot.objects.filter(user=self.followed).order_by('-pk').values_list('pk', flat=True)
+        )
+        ids = []
+        url = '/api/v1/shots/feed/following/?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [shot['id'] for shot in response.data['shots']]
+            next_before = response.data['next_before']
+            url = next_before and f'/api/v1/shots/feed/following/?limit=2&before={next_before}'
+        self.assertEqual(ids, expected)
+
+    def test_invalid_before(self):
+        response = self.client.get('/api/v1/shots/feed/?before=abc')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SHOT_TIMELINE_ENABLED=True, SHOT_TIMELINE_ASYNC=False)
+class ShotTimelineTest(TestCase):
+    '''
+    fan-out-on-write timeline 으로 팔로잉 feed 조회
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.author = User.objects.create_user(username='author', password='pw')
+
+    def create_shots(self, n):
+        shots = []
+        for i in range(n):
+            with self.captureOnCommitCallbacks(execute=True):
+                shots.append(Shot.objects.create(user=self.author, title=f'shot{i}', content='content'))
+        return [shot.pk for shot in reversed(shots)]
+
+    def test_fan_out_and_unfollow(self):
+        # 팔로우 전에 작성한 shot 은 팔로우할 때 채워진다.
+        old = self.create_shots(2)
+        self.author.followers.add(self.user)
+        new = self.create_shots(3)
+
+        response = self.client.get('/api/v1/shots/feed/following/')
+        self.assertEqual([shot['id'] for shot in response.data['shots']], new + old)
+
+        self.author.followers.remove(self.user)
+        response = self.client.get('/api/v1/shots/feed/following/')
+        self.assertEqual(response.data['shots'], [])
+
+    def test_same_shots_as_following_shots(self):
+        # 내 shot 은 timeline 을 사용하지 않는 feed 와 같이 포함하지 않는다.
+        self.author.followers.add(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Shot.objects.create(user=self.user, title='mine', content='content')
+        expected = self.create_shots(2)
+
+        response = self.client.get('/api/v1/shots/feed/following/')
+        self.assertEqual([shot['id'] for shot in response.data['shots']], expected)
+        with override_settings(SHOT_TIMELINE_ENABLED=False):
+            response = self.client.get('/api/v1/shots/feed/following/')
+        self.assertEqual([shot['id'] for shot in response.data['shots']], expected)
+
+    def test_fan_out_error_is_logged(self):
+        # 테스트 트랜잭션의 DB 연결은 닫지 않는다.
+        with mock.patch.object(timeline, 'fan_out', side_effect=RuntimeError), \
+                mock.patch.object(timeline, 'connection'), \
+                self.assertLogs('shots.timeline', 'ERROR'):
+            timeline._fan_out_in_thread(0, self.author.pk)
+
+    def test_timeline_is_bounded(self):
+        self.author.followers.add(self.user)
+        with mock.patch.object(timeline, 'TIMELINE_SIZE', 2):
+            ids = self.create_shots(4)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.user).order_by('-shot').values_list('shot', flat=True)),
+            ids[:2],
+        )
+
+
+class ShotCounterTest(TestCase):
+    '''
+    좋아요/댓글 API 가 개수 컬럼을 갱신하는지 확인
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.shot = Shot.objects.create(user=self.user, title='shot', content='content')
+
+    def test_like_and_comment_counters(self):
+        response = self.client.post(f'/api/v1/shots/{self.shot.pk}/likes/')
+        self.assertEqual(response.data['like_cnt'], 1)
+        response = self.client.post(f'/api/v1/shots/{self.shot.pk}/likes/')
+        self.assertEqual(response.data['like_cnt'], 0)
+
+        # PUT/DELETE 는 여러 번 보내도 결과가 같다.
+        for _ in range(2):
+            response = self.client.put(f'/api/v1/shots/{self.shot.pk}/likes/')
+            self.assertEqual((response.data['is_like'], response.data['like_cnt']), (True, 1))
+        for _ in range(2):
+            response = self.client.delete(f'/api/v1/shots/{self.shot.pk}/likes/')
+            self.assertEqual((response.data['is_like'], response.data['like_cnt']), (False, 0))
+        self.assertEqual(self.client.put('/api/v1/shots/0/likes/').status_code, 404)
+
+        self.client.post(f'/api/v1/shots/{self.shot.pk}/comments/', {'content': 'a'})
+        self.client.post(f'/api/v1/shots/{self.shot.pk}/comments/', {'content': 'b'})
+        comment = ShotComment.objects.filter(shot=self.shot).first()
+        self.client.delete(f'/api/v1/shots/{self.shot.pk}/comments/{comment.pk}/')
+        self.shot.refresh_from_db()
+        self.assertEqual(self.shot.comments_cnt, 1)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('Shot.like_cnt: 0개', out.getvalue())
+        self.assertIn('Shot.comments_cnt: 0개', out.getvalue())
+
+
+def make_jpeg(size=(3000, 2000), color=(200, 30, 30)):
+    # EXIF 회전(90도) 정보와 카메라 정보가 들어있는 JPEG
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'Camera'
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class ShotImageTest(TestCase):
+    '''
+    shot 이미지 크기별 WebP/JPEG variant 생성 (로컬 파일 storage 사용)
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        storage = FileSystemStorage(location=self.media_root, base_url='/media/')
+        patcher = mock.patch.object(Shot._meta.get_field('image'), 'storage', storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = storage
+
+    def create_shot(self, content):
+        image = SimpleUploadedFile('photo.jpg', content, content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/shots/', {
+                'title': 'title', 'content': 'content', 'image': image,
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Shot.objects.get(pk=response.data['id'])
+
+    def test_variants(self):
+        shot = self.create_shot(make_jpeg())
+        variants = shot.image_variants
+        self.assertEqual(variants['source'], shot.image.name)
+        # EXIF 회전이 적용되어 세로 이미지
+        self.assertEqual((variants['full']['width'], variants['full']['height']), (1067, 1600))
+        self.assertEqual((variants['feed']['width'], variants['feed']['height']), (480, 720))
+        self.assertEqual(max(variants['thumb']['width'], variants['thumb']['height']), 200)
+
+        with self.storage.open(variants['feed']['jpeg']) as f:
+            image = Image.open(f)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertFalse(image.getexif())
+        with self.storage.open(variants['thumb']['webp']) as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+
+        response = self.client.get('/api/v1/shots/page/0/')
+        urls = response.data['shots'][0]['image_variants']
+        self.assertEqual(urls['thumb']['webp'], '/media/' + variants['thumb']['webp'])
+
+        # 같은 이미지는 같은 이름(내용 hash)으로 저장
+        other = self.create_shot(make_jpeg())
+        self.assertEqual(other.image_variants['feed'], variants['feed'])
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class ImageDedupTest(TestCase):
+    '''
+    같은 내용의 이미지는 한 번만 저장하고 참조하는 row 가 없으면 삭제
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.storage = FileSystemStorage(location=self.media_root, base_url='/media/')
+        patcher = mock.patch.object(dedup.content_storage, '_backend', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_shot(self, content):
+        image = SimpleUploadedFile('photo.jpg', content, content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/shots/', {
+                'title': 'title', 'content': 'content', 'image': image,
+            }, format='multipart')
+        return Shot.objects.get(pk=response.data['id'])
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def ref_counts(self):
+        return dict(StoredImage.objects.values_list('name', 'ref_cnt'))
+
+    def test_dedup_and_cleanup(self):
+        content = make_jpeg()
+        first, second = self.create_shot(content), self.create_shot(content)
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.image.name, f'images/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(second.image.name, first.image.name)
+        # 원본 1개 + variant 3개 x 2형식
+        names = dedup.referenced_names(first.image.name, first.image_variants)
+        self.assertEqual(len(names), 7)
+        self.assertEqual(self.files(), sorted(names))
+        self.assertEqual(self.ref_counts(), {name: 2 for name in names})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.ref_counts(), {name: 1 for name in names})
+        self.assertEqual(len(self.files()), 7)
+
+        # 탈퇴하면 작성한 shot 의 이미지도 삭제
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.ref_counts(), {})
+        self.assertEqual(self.files(), [])
+
+    def test_replace_image(self):
+        shot = self.create_shot(make_jpeg())
+        old = dedup.referenced_names(shot.image.name, shot.image_variants)
+        with self.captureOnCommitCallbacks(execute=True):
+            shot.image = SimpleUploadedFile('new.png', make_jpeg(color=(0, 0, 255)))
+            shot.save()
+        shot.refresh_from_db()
+        new = dedup.referenced_names(shot.image.name, shot.image_variants)
+        self.assertTrue(shot.image.name.endswith('.png'))
+        self.assertEqual(len(new), 7)
+        self.assertEqual(self.ref_counts(), {name: 1 for name in new})
+        self.assertEqual(self.files(), sorted(new))
+        self.assertFalse(old & new)
+
+    def test_claimed_file_is_not_deleted(self):
+        content = make_jpeg()
+        shot = self.create_shot(content)
+        names = dedup.referenced_names(shot.image.name, shot.image_variants)
+        with self.captureOnCommitCallbacks() as callbacks:
+            shot.delete()
+        self.assertEqual(set(self.ref_counts().values()), {0})
+
+        # 참조 수가 0 인 파일을 지우기 전에 같은 내용을 저장 (파일이 있어서 업로드는 건너뜀)
+        name = dedup.content_storage.save('photo.jpg', io.BytesIO(content))
+        self.assertEqual(name, shot.image.name)
+        for callback in callbacks:
+            callback()
+        # 선점된 원본은 남고 나머지는 삭제
+        self.assertEqual(self.files(), [name])
+        dedup.acquire({name})
+        self.assertEqual(self.ref_counts(), {name: 1})
+
+        # 선점 후 참조되지 않고 IMAGE_CLAIM_TIMEOUT 이 지나면 삭제
+        dedup.claim(name)
+        StoredImage.objects.filter(name=name).update(ref_cnt=0)
+        self.assertEqual(dedup.delete_unreferenced(dedup.content_storage, names), [])
+        with mock.patch.object(dedup, 'IMAGE_CLAIM_TIMEOUT', -1):
+            self.assertEqual(dedup.delete_unreferenced(dedup.content_storage, names), [name])
+        self.assertEqual(self.files(), [])
+
+    def test_reclaim_images(self):
+        shot = self.create_shot(make_jpeg())
+        names = dedup.referenced_names(shot.image.name, shot.image_variants)
+        self.storage.save('images/aa/orphan.jpg', io.BytesIO(b'orphan'))
+        StoredImage.objects.filter(name=shot.image.name).update(ref_cnt=5)
+        StoredImage.objects.create(name='images/bb/deleted.jpg', ref_cnt=2)
+
+        out = StringIO()
+        call_command('reclaim_images', '--scan', '--grace-minutes=-1', stdout=out)
+        self.assertIn('StoredImage.ref_cnt: 2개 불일치', out.getvalue())
+        self.assertEqual(self.ref_counts(), {name: 1 for name in names})
+        self.assertEqual(self.files(), sorted(names))
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class ShotUploadTest(TestCase):
+    '''
+    이미지 업로드는 크기/형식을 먼저 확인하고 응답 후 storage 에 저장
+    '''
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tester', password='pw')
+        self.client.force_authenticate(self.user)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.storage = FileSystemStorage(location=self.media_root, base_url='/media/')
+        patcher = mock.patch.object(dedup.content_storage, '_backend', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, name, content):
+        image = SimpleUploadedFile(name, content, content_type='image/jpeg')
+        return self.client.post('/api/v1/shots/', {
+            'title': 'title', 'content': 'content', 'image': image,
+        }, format='multipart')
+
+    def test_store_after_response(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.post('photo.jpg', make_jpeg())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['image_status'], 'processing')
+        self.assertIsNone(response.data['image'])
+        self.assertEqual(self.storage.listdir('')[0], [])
+
+        for callback in callbacks:
+            callback()
+        shot = Shot.objects.get(pk=response.data['id'])
+        self.assertEqual(shot.image_status, Shot.IMAGE_READY)
+        self.assertTrue(self.storage.exists(shot.image.name))
+        self.assertEqual(shot.image_variants['source'], shot.image.name)
+        self.assertEqual(StoredImage.objects.get(name=shot.image.name).ref_cnt, 1)
+
+    def test_reject_before_storing(self):
+        response = self.post('photo.jpg', b'<?php echo "not an image"; ?>')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+        with mock.patch('config.uploads.IMAGE_UPLOAD_MAX_SIZE', 1024):
+            response = self.post('photo.jpg', make_jpeg())
+        self.assertEqual(response.status_code, 413)
+
+        with mock.patch('config.uploads.IMAGE_UPLOAD_MAX_PIXELS', 1000):
+            response = self.post('photo.jpg', make_jpeg())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Shot.objects.exists())
+
+    def put(self, shot, content):
+        image = SimpleUploadedFile('photo.jpg', content, content_type='image/jpeg')
+        return self.client.put(f'/api/v1/shots/{shot.pk}/', {
+            'title': 'title', 'content': 'content', 'image': image,
+        }, format='multipart')
+
+    def test_last_update_wins(self):
+        shot = Shot.objects.create(user=self.user, title='title', content='content')
+        first, second = make_jpeg(), make_jpeg(color=(0, 0, 255))
+        for order in (reversed, list):
+            callbacks = []
+            for content in (first, second):
+                with self.captureOnCommitCallbacks() as captured:
+                    self.assertEqual(self.put(shot, content).status_code, 200)
+                callbacks += captured
+            # 먼저 시작한 업로드가 나중에 끝나도, 먼저 끝나도 마지막 요청의 이미지가 남는다.
+            for callback in order(callbacks):
+                callback()
+            shot.refresh_from_db()
+            self.assertEqual(shot.image_status, Shot.IMAGE_READY)
+            self.assertEqual(shot.image.name.split('/')[-1], hashlib.sha256(second).hexdigest() + '.jpg')
+
+    def test_rollback_removes_spooled_file(self):
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir)
+        serializer = ShotSerializer(data={
+            'title': 'title', 'content': 'content',
+            'image': SimpleUploadedFile('photo.jpg', make_jpeg(), content_type='image/jpeg'),
+        })
+        serializer.is_valid(raise_exception=True)
+        with mock.patch('config.uploads.IMAGE_UPLOAD_SPOOL_DIR', spool_dir):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                save_shot(serializer, user=self.user)
+                self.assertEqual(len(os.listdir(spool_dir)), 1)
+                raise RuntimeError
+        self.assertEqual(os.listdir(spool_dir), [])
+        self.assertFalse(Shot.objects.exists())
+
+    def test_recover_stale_uploads(self):
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir)
+        with mock.patch('config.uploads.IMAGE_UPLOAD_SPOOL_DIR', spool_dir):
+            # commit 후 저장 thread 가 실행되기 전에 프로세스가 종료된 경우
+            with self.captureOnCommitCallbacks():
+                kept = Shot.objects.get(pk=self.post('photo.jpg', make_jpeg()).data['id'])
+                lost = Shot.objects.get(pk=self.post('photo.jpg', make_jpeg()).data['id'])
+                recent = Shot.objects.get(pk=self.post('photo.jpg', make_jpeg()).data['id'])
+            os.remove(os.path.join(spool_dir, f'{lost.image_token.hex}.jpg'))
+            orphan = os.path.join(spool_dir, 'orphan.jpg')
+            open(orphan, 'wb').close()
+            os.utime(orphan, (0, 0))
+            before = timezone.now() - datetime.timedelta(minutes=30)
+            Shot.objects.filter(pk__in=[kept.pk, lost.pk]).update(updated_at=before)
+
+            out = StringIO()
+            call_command('process_images', stdout=out)
+            self.assertIn('1개 다시 저장, 1개 실패 처리, spool 파일 1개 삭제', out.getvalue())
+            self.assertEqual(os.listdir(spool_dir), [f'{recent.image_token.hex}.jpg'])
+        statuses = dict(Shot.objects.values_list('pk', 'image_status'))
+        self.assertEqual(
+            [statuses[shot.pk] for shot in (kept, lost, recent)],
+            [Shot.IMAGE_READY, Shot.IMAGE_FAILED, Shot.IMAGE_PROCESSING],
+        )
+        kept.refresh_from_db()
+        self.assertTrue(self.storage.exists(kept.image.name))
+
+    def test_store_failure(self):
+        with mock.patch.object(self.storage, 'save', side_effect=OSError), \
+                self.assertLogs('shots.uploads', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.post('photo.jpg', make_jpeg())
+        shot = Shot.objects.get(pk=response.data['id'])
+        self.assertEqual(shot.image_status, Shot.IMAGE_FAILED)
+        self.assertFalse(shot.image)
@@ -0,0 +1,211 @@
+'''
+팔로워 timeline (fan-out-on-write)
+
+팔로잉 feed 를 읽을 때마다 followings 를 JOIN 하지 않고,
+shot 이 생성될 때 팔로워들의 timeline 에 shot id 를 미리 넣어둔다.
+(following_shots 와 같이 내 shot 은 포함하지 않음)
+
+* SHOT_TIMELINE_ENABLED = True 일 때만 사용 (기본은 읽을 때 계산하는 following_shots)
+* fan-out 은 트랜잭션 commit 후 thread pool 에서 SHOT_TIMELINE_BATCH 명씩 처리
+    - SHOT_TIMELINE_ASYNC = False 면 요청 안에서 바로 처리 (테스트/관리 명령용)
+* 유저별 timeline 은 최신 SHOT_TIMELINE_SIZE 개만 유지
+* 저장소는 SHOT_TIMELINE_STORE 로 선택
+    - 'db' : TimelineEntry 테이블
+    - 'local' : 프로세스 메모리 (개발용, 서버 프로세스 간 공유되지 않음)
+* 읽을 때는 timeline 의 shot id 한 페이지를 한 번의 쿼리로 가져온다.
+'''
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Shot, TimelineEntry
+
+TIMELINE_STORE = getattr(settings, 'SHOT_TIMELINE_STORE', 'db')
+# 유저별 timeline 최대 길이 / fan-out 한 번에 처리하는 팔로워 수
+TIMELINE_SIZE = getattr(settings, 'SHOT_TIMELINE_SIZE', 500)
+TIMELINE_BATCH = getattr(settings, 'SHOT_TIMELINE_BATCH', 1000)
+TIMELINE_WORKERS = getattr(settings, 'SHOT_TIMELINE_WORKERS', 2)
+
+logger = logging.getLogger(__name__)
+
+
+class DBTimelineStore:
+    '''
+    TimelineEntry 테이블에 저장
+    '''
+    def push(self, user_ids, shot_id):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, shot_id=shot_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        self.trim(user_ids)
+
+    def push_many(self, user_id, shot_ids):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, shot_id=shot_id) for shot_id in shot_ids],
+            ignore_conflicts=True,
+        )
+        self.trim([user_id])
+
+    def trim(self, user_ids):
+        # 유저별로 TIMELINE_SIZE 번째 shot 보다 오래된 항목 삭제
+        oldest = TimelineEntry.objects.filter(user=OuterRef('user'))\
+            .order_by('-shot').values('shot')[TIMELINE_SIZE-1:TIMELINE_SIZE]
+        TimelineEntry.objects.filter(user_id__in=user_ids)\
+            .filter(shot__lt=Subquery(oldest)).delete()
+
+    def remove_author(self, user_id, author_id):
+        TimelineEntry.objects.filter(user_id=user_id, shot__user_id=author_id).delete()
+
+    def discard(self, shot_id):
+        # shot 이 삭제되면 FK cascade 로 함께 삭제됨
+        pass
+
+    def page(self, user_id, before, limit):
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        if before is not None:
+            entries = entries.filter(shot__lt=before)
+        return list(entries.order_by('-shot').values_list('shot', flat=True)[:limit])
+
+
+class LocalTimelineStore:
+    '''
+    프로세스 메모리에 저장 ({유저 id: shot id 오름차순 리스트})
+    '''
+    def __init__(self):
+        self.timelines = {}
+        self.lock = threading.Lock()
+
+    def push(self, user_ids, shot_id):
+        with self.lock:
+            for user_id in user_ids:
+                self._insert(user_id, [shot_id])
+
+    def push_many(self, user_id, shot_ids):
+        with self.lock:
+            self._insert(user_id, shot_ids)
+
+    def _insert(self, user_id, shot_ids):
+        timeline = self.timelines.setdefault(user_id, [])
+        for shot_id in shot_ids:
+            index = bisect.bisect_left(timeline, shot_id)
+            if index == len(timeline) or timeline[index] != shot_id:
+                timeline.insert(index, shot_id)
+        del timeline[:-TIMELINE_SIZE]
+
+    def remove_author(self, user_id, author_id):
+        shot_ids = set(Shot.objects.filter(user_id=author_id).values_list('pk', flat=True))
+        with self.lock:
+            timeline = self.timelines.get(user_id, [])
+            timeline[:] = [shot_id for shot_id in timeline if shot_id not in shot_ids]
+
+    def discard(self, shot_id):
+        with self.lock:
+            for timeline in self.timelines.values():
+                index = bisect.bisect_left(timeline, shot_id)
+                if index < len(timeline) and timeline[index] == shot_id:
+                    del timeline[index]
+
+    def page(self, user_id, before, limit):
+        timeline = self.timelines.get(user_id, [])
+        end = len(timeline) if before is None else bisect.bisect_left(timeline, before)
+        return timeline[max(end - limit, 0):end][::-1]
+
+
+def enabled():
+    return getattr(settings, 'SHOT_TIMELINE_ENABLED', False)
+
+
+STORES = {
+    'db': DBTimelineStore,
+    'local': LocalTimelineStore,
+}
+store = STORES[TIMELINE_STORE]()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=TIMELINE_WORKERS, thread_name_prefix='shot-timeline'
+            )
+    return _executor
+
+
+def follower_ids(user_id):
+    follows = get_user_model().followings.through.objects.filter(to_user_id=user_id)
+    return follows.values_list('from_user_id', flat=True)
+
+
+def fan_out(shot_id, author_id):
+    '''
+    shot 을 팔로워들의 timeline 에 넣는다.
+    '''
+    batch = []
+    for user_id in follower_ids(author_id).order_by('from_user_id').iterator():
+        batch.append(user_id)
+        if len(batch) == TIMELINE_BATCH:
+            store.push(batch, shot_id)
+            batch = []
+    if batch:
+        store.push(batch, shot_id)
+
+
+def _fan_out_in_thread(shot_id, author_id):
+    try:
+        fan_out(shot_id, author_id)
+    except Exception:
+        logger.exception('timeline fan-out 실패 %s', shot_id)
+    finally:
+        # thread 에서 연 DB 연결 정리
+        connection.close()
+
+
+def schedule_fan_out(shot):
+    '''
+    트랜잭션 commit 후 fan-out 실행 (SHOT_TIMELINE_ASYNC 면 thread pool 에서)
+    '''
+    def run():
+        if getattr(settings, 'SHOT_TIMELINE_ASYNC', True):
+            get_executor().submit(_fan_out_in_thread, shot.pk, shot.user_id)
+        else:
+            fan_out(shot.pk, shot.user_id)
+    transaction.on_commit(run)
+
+
+def backfill(user_id, followee_id):
+    '''
+    새로 팔로우한 유저의 최신 shot 을 timeline 에 채운다.
+    '''
+    shot_ids = Shot.objects.filter(user_id=followee_id)\
+        .order_by('-pk').values_list('pk', flat=True)[:TIMELINE_SIZE]
+    store.push_many(user_id, list(shot_ids))
+
+
+def unfollow(user_id, followee_id):
+    '''
+    언팔로우한 유저의 shot 을 timeline 에서 뺀다.
+    '''
+    store.remove_author(user_id, followee_id)
+
+
+def timeline_page(user, before, limit):
+    '''
+    user 의 timeline 에서 before 보다 오래된 shot 을 최신순으로 limit 개
+
+    return (shot 리스트, next_before)
+    '''
+    shot_ids = store.page(user.pk, before, limit)
+    shots = Shot.objects.for_feed().in_bulk(shot_ids)
+    shots = [shots[shot_id] for shot_id in shot_ids if shot_id in shots]
+    next_before = shot_ids[-1] if len(shot_ids) == limit else None
+    return shots, next_before
@@ -0,0 +1,123 @@
+'''
+shot 이미지를 요청이 끝난 뒤 storage 에 저장
+
+* shot_create / shot_update 는 이미지 없이 shot 을 저장하고 image_status = processing 으로 응답
+* 업로드 파일은 spool 디렉토리로 옮겨두고 (config/uploads.py)
+  트랜잭션 commit 후 이미지 thread pool 에서 storage 에 올린다.
+    - rollback 되면 spool 파일은 지워진다. (SpooledFile)
+    - 업로드마다 image_token 을 새로 저장하고, 저장이 끝났을 때 token 이 그대로인 경우만 반영
+      (같은 shot 을 동시에 수정하면 마지막 요청의 이미지를 사용)
+    - 저장이 끝나면 image, image_status = ready 를 저장하고 이어서 variant 생성
+    - 실패하면 image_status = failed
+* IMAGE_PROCESSING_ASYNC = False 면 commit 후 바로 실행
+* commit 후 저장이 끝나기 전에 프로세스가 종료되면 shot 이 processing 으로 남는다.
+    - process_images 명령의 recover_stale() 이 spool 파일 (이름 = image_token) 이 남아있으면
+      다시 저장하고, 없으면 failed 로 바꾼다.
+'''
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+
+from config import dedup, images
+from config.uploads import remove_file, spool, spooled_files
+from .models import Shot
+
+logger = logging.getLogger(__name__)
+
+
+def save_shot(serializer, **kwargs):
+    '''
+    serializer 의 이미지를 빼고 shot 을 저장한 뒤 이미지 저장을 예약
+    '''
+    image = serializer.validated_data.pop('image', None)
+    if image:
+        kwargs['image_status'] = Shot.IMAGE_PROCESSING
+        kwargs['image_token'] = uuid.uuid4()
+    shot = serializer.save(**kwargs)
+    if image:
+        token = shot.image_token
+        # 중단된 저장을 다시 처리할 때 token 으로 spool 파일을 찾는다.
+        spooled = spool(image, name=token.hex)
+        transaction.on_commit(lambda: schedule_store(shot.pk, spooled.detach(), image.name, token))
+    return shot
+
+
+def schedule_store(shot_id, path, name, token):
+    if getattr(settings, 'IMAGE_PROCESSING_ASYNC', True):
+        images.get_executor().submit(_store_in_thread, shot_id, path, name, token)
+    else:
+        store(shot_id, path, name, token)
+
+
+def store(shot_id, path, name, token):
+    field = Shot._meta.get_field('image')
+    # 이 업로드 이후에 shot 이 삭제되거나 다시 수정되었으면 반영하지 않는다.
+    pending = Shot.objects.filter(pk=shot_id, image_token=token, image_status=Shot.IMAGE_PROCESSING)
+    try:
+        with open(path, 'rb') as f:
+            name = field.storage.save(field.generate_filename(None, name), File(f, name=name))
+        with transaction.atomic():
+            # 반영하지 않는 경우 저장한 파일은 reclaim_images 로 정리
+            row = pending.select_for_update().values('image', 'image_variants').first()
+            updated = row is not None
+            if updated:
+                Shot.objects.filter(pk=shot_id).update(image=name, image_status=Shot.IMAGE_READY)
+                # 수정이면 이전 이미지의 참조 수를 줄인다. (config/dedup.py)
+                old = dedup.referenced_names(row['image'], row['image_variants'])
+                dedup.acquire({name} - old)
+                dedup.release(field.storage, old - {name})
+    except Exception:
+        logger.exception('shot 이미지 저장 실패 %s', shot_id)
+        pending.update(image_status=Shot.IMAGE_FAILED)
+        return
+    finally:
+        remove_file(path)
+    if updated:
+        # save() 를 쓰지 않아서 post_save signal 대신 바로 variant 생성
+        images.process(Shot._meta.label, shot_id, 'image', 'image_variants')
+
+
+def _store_in_thread(*args):
+    try:
+        store(*args)
+    except Exception:
+        logger.exception('shot 이미지 변환 실패 %s', args)
+    finally:
+        connection.close()
+
+
+def recover_stale(before):
+    '''
+    before 전부터 processing 인 shot 의 이미지를 다시 저장하거나 failed 로 바꾸고,
+    before 보다 오래된 spool 파일 중 저장을 기다리는 shot 이 없는 파일 삭제
+
+    return {'stored': 다시 저장한 수, 'failed': 실패 처리한 수, 'removed': 삭제한 spool 파일 수}
+    '''
+    files = spooled_files()
+    result = {'stored': 0, 'failed': 0, 'removed': 0}
+    stale = Shot.objects.filter(image_status=Shot.IMAGE_PROCESSING, updated_at__lt=before)\
+        .values_list('pk', 'image_token')
+    for shot_id, token in stale:
+        path = files.pop(token.hex, None) if token else None
+        if path:
+            store(shot_id, path, os.path.basename(path), token)
+            result['stored'] += 1
+        else:
+            result['failed'] += Shot.objects.filter(
+                pk=shot_id, image_token=token, image_status=Shot.IMAGE_PROCESSING,
+            ).update(image_status=Shot.IMAGE_FAILED)
+
+    # rollback 후 지우지 못했거나 반영되지 않은 업로드의 파일
+    pending = {
+        token.hex for token in Shot.objects.filter(image_status=Shot.IMAGE_PROCESSING)
+            .exclude(image_token=None).values_list('image_token', flat=True)
+    }
+    for name, path in files.items():
+        if name not in pending and os.path.getmtime(path) < before.timestamp():
+            remove_file(path)
+            result['removed'] += 1
+    return result
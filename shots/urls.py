@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     path('', views.shot_create),
     path('page/<int:page>/', views.shots),
+    path('feed/', views.shot_feed),
+    path('feed/following/', views.shot_following_feed),
     path('detail/<int:shot_id>/', views.shot_detail),
     path('<int:shot_id>/', views.shot_update_or_delete),
     path('<int:shot_id>/likes/', views.shot_likes),
@@ -1,18 +1,29 @@
 from xml.etree.ElementTree import Comment
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from .models import Shot, ShotComment
-from movies.models import Movie
+from movies.autocomplete import get_index
 from .serializers.shot import ShotSerializer, ShotListSerializer
 from .serializers.shot_comment import ShotCommentSerializer
-from django.db.models import Count
+from django.db import transaction
+from config.db import update_counters
+from config.likes import METHOD_ACTIONS, change_like
+from config.pagination import paginate
+from config.uploads import ImageUploadParser
+from movies.models import Movie
+from .feed import attach_feed_data, feed_page, following_shots, parse_feed_params
+from . import timeline
+from .uploads import save_shot
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, FormParser, ImageUploadParser])
 def shot_create(request):
     '''
     shot_create
@@ -22,17 +33,19 @@ def shot_create(request):
     * title
     * content
     * movie_char
-    * image
+    * image (JPEG, PNG, GIF, WebP / 기본 최대 10MB, IMAGE_UPLOAD_MAX_SIZE)
+
+    이미지는 응답 후 저장됩니다. image_status 가 processing 이면 저장 중이고
+    ready 가 되면 image, image_variants 를 사용할 수 있습니다. (failed : 저장 실패)
 
     '''
     serializer = ShotSerializer(data=request.data)
     if serializer.is_valid(raise_exception=True):
-        title = request.data['movie_char']
-        if Movie.objects.all().filter(title__exact=title).exists():
-            movie = Movie.objects.get(title=title)
-            serializer.save(user=request.user, movie=movie)
-        else:
-            serializer.save(user=request.user)
+        # movie_char 와 제목이 일치하는 영화를 자동완성 색인에서 찾기
+        movie_id = get_index().resolve(request.data.get('movie_char', ''))
+        with transaction.atomic():
+            save_shot(serializer, user=request.user, movie_id=movie_id)
+            update_counters(Movie, movie_id, shot_cnt=1)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -44,28 +57,83 @@ def shots(request, page):
     ---
     [GET] get shots
 
+    각 shot 에는 좋아요/댓글 수와 최신 댓글 3개만 포함됩니다.
+    (전체 댓글은 shot_detail 에서 조회)
+
+    ?cursor= 쿼리스트링을 주면 page 대신 next_cursor 로 다음 페이지를 조회합니다.
+
     '''
-    shots = Shot.objects.all().annotate(like_cnt=Count('like_users')).order_by('-pk')
-    max_page = round(len(shots)/20)
-    
-    shots = shots[page*20:page*20+20]
-    
-    is_liked = [False * len(shots)]
-    # AnonymousUser 에러 해결을 위해 
-    # request.user.id 값이 있는지 없는지를 검사
-    # AnonymousUser 일때 id 값이 None 이기 때문에 TypeError 발생
-    if request.user.id:
-        is_liked = [shot.like_users.filter(pk=request.user.id).exists() for shot in shots]
+    shots = Shot.objects.all().order_by('-pk')
+    shots, max_page, next_cursor = paginate(request, shots.for_feed(), page, 20)
+
+    # 좋아요 여부와 미리보기 댓글을 페이지 단위로 한 번에 조회
+    attach_feed_data(shots, request.user)
         
     serializer = ShotListSerializer(shots, many=True)
     data = {
         "max_page"  : max_page, 
+        "next_cursor" : next_cursor,
         "shots"    : serializer.data,
-        "is_liked" : is_liked,
+        "is_liked" : [shot.is_liked for shot in shots],
+    }
+    return Response(data)
+
+
+
+@api_view(['GET'])
+def shot_feed(request):
+    '''
+    shot_feed
+
+    ---
+    [GET] 무한 스크롤용 shot 목록 (최신순)
+
+    * before : 이 id 보다 오래된 shot 부터 조회 (첫 요청은 생략, 이후에는 next_before 값)
+    * limit : 개수 (기본 20, 최대 50)
+
+    return { "shots": [...], "next_before": 123 } (마지막이면 next_before 는 null)
+
+    '''
+    before, limit = parse_feed_params(request)
+    shots, next_before = feed_page(Shot.objects.for_feed(), before, limit)
+    attach_feed_data(shots, request.user)
+
+    serializer = ShotListSerializer(shots, many=True)
+    data = {
+        'shots': serializer.data,
+        'next_before': next_before,
     }
     return Response(data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def shot_following_feed(request):
+    '''
+    shot_following_feed
+
+    ---
+    [GET] 내가 팔로우하는 유저들의 shot 목록 (최신순)
+
+    * before, limit : shot_feed 와 같음
+
+    SHOT_TIMELINE_ENABLED 설정 시 미리 만들어둔 timeline 에서 조회합니다. (shots/timeline.py)
+
+    '''
+    before, limit = parse_feed_params(request)
+    if timeline.enabled():
+        shots, next_before = timeline.timeline_page(request.user, before, limit)
+    else:
+        shots, next_before = feed_page(following_shots(request.user).for_feed(), before, limit)
+    attach_feed_data(shots, request.user)
+
+    serializer = ShotListSerializer(shots, many=True)
+    data = {
+        'shots': serializer.data,
+        'next_before': next_before,
+    }
+    return Response(data)
+
 
 @api_view(['GET'])
 def shot_detail(request, shot_id):
@@ -96,6 +164,7 @@ def shot_detail(request, shot_id):
 
 @api_view(['PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, FormParser, ImageUploadParser])
 def shot_update_or_delete(request, shot_id):
     '''
     shot_update_or_delete
@@ -104,7 +173,7 @@ def shot_update_or_delete(request, shot_id):
     [PUT] 
     - title
     - content
-    - image
+    - image (shot_create 와 같이 응답 후 저장)
 
     [DELETE]
     - title
@@ -118,12 +187,14 @@ def shot_update_or_delete(request, shot_id):
         if request.user == shot.user:
             serializer = ShotSerializer(instance=shot, data=request.data)
             if serializer.is_valid(raise_exception=True):
-                serializer.save()
+                save_shot(serializer)
                 return Response(serializer.data)
 
     def shot_delete():
         if request.user == shot.user:
-            shot.delete()
+            with transaction.atomic():
+                shot.delete()
+                update_counters(Movie, shot.movie_id, shot_cnt=-1)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     if request.method == 'PUT':
@@ -132,28 +203,30 @@ def shot_update_or_delete(request, shot_id):
         return shot_delete()
 
 
-@api_view(['POST'])
+@api_view(['POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def shot_likes(request, shot_id):
     '''
     shot_likes
 
     ---
-    [POST]
+    [POST] 좋아요 토글
+
+    [PUT] 좋아요 (이미 좋아요 상태면 그대로)
+
+    [DELETE] 좋아요 취소 (좋아요 상태가 아니면 그대로)
 
     return { "is_like": true, "like_cnt": 1 }
 
     '''
-    shot = get_object_or_404(Shot, pk=shot_id)
-    if shot.like_users.filter(pk=request.user.pk).exists():
-        shot.like_users.remove(request.user)
-        is_like = False
-    else:
-        shot.like_users.add(request.user)
-        is_like = True
+    if not Shot.objects.filter(pk=shot_id).exists():
+        raise Http404
+    is_like, like_cnt = change_like(
+        Shot, shot_id, request.user, METHOD_ACTIONS[request.method]
+    )
     data = {
         'is_like': is_like,
-        'like_cnt': shot.like_users.count()
+        'like_cnt': like_cnt,
     }
     return Response(data)
 
@@ -172,7 +245,10 @@ def shot_comment_create(request, shot_id):
     shot = get_object_or_404(Shot, pk=shot_id)
     serializer = ShotCommentSerializer(data=request.data)
     if serializer.is_valid(raise_exception=True):
-        serializer.save(shot=shot, user=request.user)
+        with transaction.atomic():
+            serializer.save(shot=shot, user=request.user)
+            update_counters(Shot, shot.pk, comments_cnt=1)
+        shot.refresh_from_db(fields=['comments_cnt'])
         res = ShotSerializer(shot)
         return Response(res.data['comments'], status=status.HTTP_201_CREATED)
 
@@ -201,7 +277,9 @@ def shot_comment_update_or_delete(request, shot_id, comment_id):
             return Response(res.data['comments'])
 
     def comment_delete():
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            update_counters(Shot, comment.shot_id, comments_cnt=-1)
         shot = get_object_or_404(Shot, pk=shot_id)
         res = ShotSerializer(shot)
         return Response(res.data['comments'])